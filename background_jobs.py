@@ -0,0 +1,148 @@
+# background_jobs.py
+# Run slow work (parsing, rendering, saving) off the Tk main thread
+
+import queue
+import threading
+import traceback
+
+class JobCancelled(Exception):
+    """Raised inside a job function when the job has been cancelled."""
+
+class Job:
+    """
+    Handle passed to a running job function.
+    
+    The job function calls progress() between its steps; that reports the
+    step to the UI and is also where a cancelled job stops (JobCancelled is
+    raised), so cancelling takes effect at the next step.
+    """
+    
+    def __init__(self, name):
+        self.name = name
+        self._cancel_event = threading.Event()
+        self._messages = queue.Queue()
+    
+    def cancel(self):
+        """Ask the job to stop at its next progress() call."""
+        self._cancel_event.set()
+    
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+    
+    def check_cancelled(self):
+        """Raise JobCancelled if the job has been cancelled."""
+        if self._cancel_event.is_set():
+            raise JobCancelled(self.name)
+    
+    def progress(self, message, fraction=None, cancellable=True):
+        """
+        Report progress from the worker thread.
+        
+        Parameters:
+        - message: Short description of the step that is starting
+        - fraction: Optional overall progress between 0 and 1
+        - cancellable: False for steps past the point where the job can be
+          stopped (e.g. after it changed data in place)
+        """
+        if cancellable:
+            self.check_cancelled()
+        self._messages.put(('progress', message, fraction))
+
+class JobRunner:
+    """
+    Runs one job at a time on a background thread.
+    
+    Progress, the result and errors are queued by the worker and delivered to
+    the callbacks on the Tk main thread by polling with root.after, so the
+    callbacks can safely update widgets and show message boxes. The job
+    function itself must not touch Tk.
+    """
+    
+    def __init__(self, root, poll_ms=50):
+        self.root = root
+        self.poll_ms = poll_ms
+        self.job = None
+        self._callbacks = {}
+    
+    @property
+    def busy(self):
+        return self.job is not None
+    
+    def start(self, name, func, *args, on_done=None, on_error=None, on_progress=None,
+              on_cancelled=None):
+        """
+        Run func(job, *args) on a background thread.
+        
+        Parameters:
+        - name: Job name (for messages)
+        - func: Job function; gets the Job handle first
+        - on_done: Called with func's return value
+        - on_error: Called with the exception if func raised
+        - on_progress: Called with (message, fraction) for each progress() call
+        - on_cancelled: Called if the job stopped because it was cancelled
+        
+        Returns:
+        - The Job handle
+        """
+        if self.busy:
+            raise RuntimeError(f"Job '{self.job.name}' is still running")
+        
+        self.job = Job(name)
+        self._callbacks = {'done': on_done, 'error': on_error,
+                           'progress': on_progress, 'cancelled': on_cancelled}
+        worker = threading.Thread(target=self._run, args=(self.job, func, args), daemon=True)
+        worker.start()
+        self.root.after(self.poll_ms, self._poll)
+        return self.job
+    
+    def cancel(self):
+        """Cancel the running job, if any."""
+        if self.job is not None:
+            self.job.cancel()
+    
+    def _run(self, job, func, args):
+        """Worker thread body: run the job and queue how it ended."""
+        try:
+            result = func(job, *args)
+        except JobCancelled:
+            job._messages.put(('cancelled',))
+        except Exception as e:
+            traceback.print_exc()
+            job._messages.put(('error', e))
+        else:
+            job._messages.put(('done', result))
+    
+    def _poll(self):
+        """Deliver queued messages on the main thread; keep polling until the job ends."""
+        job = self.job
+        if job is None:
+            return
+        
+        while True:
+            try:
+                message = job._messages.get_nowait()
+            except queue.Empty:
+                break
+            
+            kind = message[0]
+            if kind == 'progress':
+                self._call('progress', message[1], message[2])
+                continue
+            
+            # The job has finished; clear it before the callback so it can start another
+            self.job = None
+            if kind == 'done':
+                self._call('done', message[1])
+            elif kind == 'error':
+                self._call('error', message[1])
+            else:
+                self._call('cancelled')
+            return
+        
+        self.root.after(self.poll_ms, self._poll)
+    
+    def _call(self, kind, *args):
+        callback = self._callbacks.get(kind)
+        if callback is not None:
+            callback(*args)
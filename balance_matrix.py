@@ -0,0 +1,391 @@
+# balance_matrix.py
+# Builds the date x account balance matrix used by daily cash balance charts
+
+import pandas as pd
+import numpy as np
+
+# How to combine several rows for the same account on the same day
+DUPLICATE_POLICIES = ('sum', 'last', 'first')
+
+# Policy used by every daily cash balance entry point (loader, append, chart)
+# so the same input always gives the same totals
+DEFAULT_DUPLICATES = 'sum'
+
+# How to fill a day with no row for an account:
+# 'ffill' carries the last known balance, 'zero' counts it as 0, None leaves a gap
+FILL_METHODS = ('ffill', 'zero', None)
+
+def _reduce_rows(date_keys, codes, values, duplicates):
+    """
+    Collapse rows that share the same (date, account code).
+    
+    Groups are found by hashing (pd.factorize) rather than sorting, so this is
+    linear in the number of rows.
+    
+    Parameters:
+    - date_keys: int64 array of dates (nanoseconds since epoch)
+    - codes: int64 array of account codes
+    - values: float64 array of balances
+    - duplicates: 'sum', 'last' or 'first'; 'last'/'first' follow input order
+    
+    Returns:
+    - Tuple (date_keys, codes, values) with one row per (date, account),
+      in order of first appearance
+    """
+    if len(values) == 0:
+        return date_keys, codes, values
+    
+    # One int64 key per (date, account): dense date number * account count + code
+    date_idx, unique_dates = pd.factorize(date_keys)
+    n_codes = int(codes.max()) + 1
+    groups, unique_keys = pd.factorize(date_idx.astype(np.int64) * n_codes + codes)
+    
+    if duplicates == 'sum':
+        reduced = np.bincount(groups, weights=values, minlength=len(unique_keys))
+    else:
+        grouped = pd.Series(values).groupby(groups)
+        reduced = (grouped.first() if duplicates == 'first' else grouped.last()).to_numpy()
+    return unique_dates[unique_keys // n_codes], unique_keys % n_codes, reduced
+
+class BalanceMatrixBuilder:
+    """
+    Accumulates Date/Account/Balance rows into a date x account matrix.
+    
+    Rows can be added in chunks (e.g. from pd.read_csv(chunksize=...)); each
+    chunk is reduced to one value per (date, account) straight away, so memory
+    stays proportional to one chunk plus the output rather than the whole input.
+    """
+    
+    def __init__(self, duplicates=DEFAULT_DUPLICATES):
+        """
+        Parameters:
+        - duplicates: How to combine rows for the same account and day:
+          'sum', 'last' (latest row wins) or 'first'
+        """
+        if duplicates not in DUPLICATE_POLICIES:
+            raise ValueError(f"duplicates must be one of {DUPLICATE_POLICIES}")
+        self.duplicates = duplicates
+        self.accounts = []
+        self._account_codes = {}
+        self._parts = []
+        self._compacted_size = 0
+        self._pending_size = 0
+        self.rows_read = 0
+    
+    def add(self, dates, accounts, balances):
+        """
+        Add a chunk of rows.
+        
+        Parameters:
+        - dates: Dates (anything pd.to_datetime understands)
+        - accounts: Account names
+        - balances: Numeric balances; rows with a missing balance are skipped
+        """
+        dates = pd.Series(dates)
+        if not pd.api.types.is_datetime64_any_dtype(dates):
+            dates = pd.to_datetime(dates)
+        dates = dates.to_numpy(dtype='datetime64[ns]')
+        balances = np.asarray(balances, dtype=np.float64)
+        self.rows_read += len(balances)
+        
+        # Map this chunk's accounts onto the global account codes
+        local_codes, uniques = pd.factorize(pd.Series(accounts))
+        mapping = np.empty(len(uniques), dtype=np.int64)
+        for i, account in enumerate(uniques):
+            code = self._account_codes.get(account)
+            if code is None:
+                code = len(self.accounts)
+                self._account_codes[account] = code
+                self.accounts.append(account)
+            mapping[i] = code
+        codes = mapping[local_codes] if len(uniques) else np.empty(0, dtype=np.int64)
+        
+        keep = ~np.isnan(balances) & ~np.isnat(dates) & (local_codes >= 0)
+        part = _reduce_rows(dates[keep].view(np.int64), codes[keep], balances[keep], self.duplicates)
+        self._parts.append(part)
+        self._pending_size += len(part[2])
+        
+        # Fold the chunks together once they outgrow what's already been reduced
+        if self._pending_size > max(self._compacted_size, 1):
+            self._compact()
+    
+    def _compact(self):
+        """Reduce all accumulated parts into one."""
+        if len(self._parts) > 1:
+            date_keys = np.concatenate([p[0] for p in self._parts])
+            codes = np.concatenate([p[1] for p in self._parts])
+            values = np.concatenate([p[2] for p in self._parts])
+            self._parts = [_reduce_rows(date_keys, codes, values, self.duplicates)]
+        self._compacted_size = len(self._parts[0][2]) if self._parts else 0
+        self._pending_size = 0
+    
+    def result(self):
+        """
+        Build the matrix.
+        
+        Returns:
+        - Tuple (dates, accounts, matrix): sorted datetime64[ns] dates, account
+          names in first-seen order, and a float64 matrix of shape
+          (len(dates), len(accounts)) with NaN where an account has no row
+        """
+        self._compact()
+        if not self._parts:
+            return np.array([], dtype='datetime64[ns]'), list(self.accounts), np.empty((0, len(self.accounts)))
+        date_keys, codes, values = self._parts[0]
+        date_idx, unique_dates = pd.factorize(date_keys, sort=True)
+        matrix = np.full((len(unique_dates), len(self.accounts)), np.nan)
+        matrix[date_idx, codes] = values
+        return unique_dates.view('datetime64[ns]'), list(self.accounts), matrix
+    
+    def to_frame(self):
+        """Return the reduced rows as a long Date/Account/Balance DataFrame sorted by date."""
+        self._compact()
+        if not self._parts:
+            return pd.DataFrame({'Date': pd.Series([], dtype='datetime64[ns]'),
+                                 'Account': pd.Categorical([], categories=self.accounts),
+                                 'Balance': pd.Series([], dtype=np.float64)})
+        date_keys, codes, values = self._parts[0]
+        order = np.argsort(date_keys, kind='stable')
+        date_keys, codes, values = date_keys[order], codes[order], values[order]
+        return pd.DataFrame({
+            'Date': date_keys.view('datetime64[ns]'),
+            'Account': pd.Categorical.from_codes(codes, categories=self.accounts),
+            'Balance': values
+        })
+
+class GrowableArray:
+    """
+    A 1-D array with spare room at the end, for data that keeps growing.
+    
+    The buffer doubles when it fills up, so appending k values costs O(k)
+    amortized instead of copying everything that's already there. values is
+    a view of the filled part; that view is what goes into the dataset.
+    """
+    
+    def __init__(self, values, dtype=np.float64):
+        """
+        Parameters:
+        - values: Initial contents (copied into the buffer)
+        - dtype: Element type of the buffer
+        """
+        values = np.asarray(values, dtype=dtype)
+        self._buffer = np.empty(max(2 * len(values), 16), dtype=dtype)
+        self._buffer[:len(values)] = values
+        self.size = len(values)
+        self.values = self._buffer[:self.size]
+    
+    def extend(self, new_values):
+        """Append values and return the new view of the filled part."""
+        new_values = np.asarray(new_values, dtype=self._buffer.dtype)
+        end = self.size + len(new_values)
+        if end > len(self._buffer):
+            buffer = np.empty(max(2 * len(self._buffer), end), dtype=self._buffer.dtype)
+            buffer[:self.size] = self.values
+            self._buffer = buffer
+        self._buffer[self.size:end] = new_values
+        self.size = end
+        self.values = self._buffer[:end]
+        return self.values
+
+def matrix_to_dataset(dates, accounts, matrix, client_name=None):
+    """
+    Turn a balance matrix into the dataset dict used by DailyCashBalanceChart.
+    
+    Returns:
+    - Dictionary with dates, accounts, account_data, total_balance
+      (and client_name if given)
+    """
+    dataset = {
+        'dates': pd.Series(dates, name='Date'),
+        'accounts': list(accounts),
+        'account_data': {account: matrix[:, i] for i, account in enumerate(accounts)},
+        # Missing accounts don't count towards the total (same as pandas sum)
+        'total_balance': np.nansum(matrix, axis=1) if matrix.size else np.zeros(len(dates))
+    }
+    if client_name is not None:
+        dataset['client_name'] = client_name
+    return dataset
+
+# Name of the series rollup_small_accounts merges the small accounts into
+OTHER_ACCOUNTS = 'Other accounts'
+
+def rollup_small_accounts(dataset, threshold, other_label=OTHER_ACCOUNTS):
+    """
+    Merge the accounts whose balance never reaches a given magnitude into a
+    single "Other accounts" series.
+    
+    An account is small when its largest absolute balance over the whole
+    period is below threshold. The merged series is the sum of the small
+    accounts (missing where all of them are missing); the total is unchanged.
+    
+    Parameters:
+    - dataset: Daily balance dataset (see matrix_to_dataset)
+    - threshold: Balance magnitude an account must reach to keep its own line
+    - other_label: Name of the merged series
+    
+    Returns:
+    - A new dataset (the input when fewer than two accounts are small)
+    """
+    accounts = list(dataset['accounts'])
+    if threshold is None or not accounts:
+        return dataset
+    
+    # Date x account matrix, and each account's peak magnitude
+    matrix = np.column_stack([np.asarray(dataset['account_data'][account], dtype=np.float64)
+                              for account in accounts])
+    with np.errstate(invalid='ignore'):
+        peak = np.fmax.reduce(np.abs(matrix), axis=0)
+    small = ~(peak >= threshold)  # all-missing accounts count as small
+    if small.sum() < 2:
+        return dataset
+    
+    merged = np.nansum(matrix[:, small], axis=1)
+    merged[np.isnan(matrix[:, small]).all(axis=1)] = np.nan
+    
+    rolled = dict(dataset)
+    rolled['accounts'] = [account for account, is_small in zip(accounts, small) if not is_small]
+    rolled['account_data'] = {account: dataset['account_data'][account] for account in rolled['accounts']}
+    # An existing account with the same name absorbs the merged ones
+    if other_label in rolled['account_data']:
+        rolled['account_data'][other_label] = np.nansum(
+            [np.asarray(rolled['account_data'][other_label], dtype=np.float64), merged], axis=0)
+    else:
+        rolled['accounts'].append(other_label)
+        rolled['account_data'][other_label] = merged
+    return rolled
+
+def stream_csv_balances(source, chunksize=100000, duplicates=DEFAULT_DUPLICATES, date_col="Date",
+                        account_col="Account", balance_col="Balance", sep=',', parse_balance=None):
+    """
+    Read a Date/Account/Balance CSV in chunks into a BalanceMatrixBuilder.
+    
+    Only the three needed columns are parsed and only one chunk is held in
+    memory at a time.
+    
+    Parameters:
+    - source: File path or file-like object
+    - chunksize: Rows per chunk
+    - duplicates: Duplicate policy passed to BalanceMatrixBuilder
+    - date_col, account_col, balance_col: Column names in the file
+    - sep: Field delimiter
+    - parse_balance: Function turning a chunk's balance column into floats
+      (defaults to pd.to_numeric with unreadable values as NaN)
+    
+    Returns:
+    - The filled BalanceMatrixBuilder
+    """
+    if parse_balance is None:
+        parse_balance = lambda col: pd.to_numeric(col, errors='coerce')
+    builder = BalanceMatrixBuilder(duplicates=duplicates)
+    reader = pd.read_csv(source, sep=sep, chunksize=chunksize,
+                         usecols=[date_col, account_col, balance_col])
+    for chunk in reader:
+        builder.add(chunk[date_col],
+                    chunk[account_col],
+                    parse_balance(chunk[balance_col]))
+    print(f"Streamed {builder.rows_read} rows into {len(builder.accounts)} accounts")
+    return builder
+
+def forward_fill(matrix):
+    """
+    Forward-fill NaN gaps down each column of a balance matrix.
+    
+    Values before an account's first row stay NaN.
+    
+    Returns:
+    - A new matrix with each gap filled by the column's last known value
+    """
+    if matrix.size == 0:
+        return matrix.copy()
+    n_rows = matrix.shape[0]
+    # Row index of the last non-NaN value at or above each cell
+    last_valid = np.where(~np.isnan(matrix), np.arange(n_rows)[:, None], 0)
+    np.maximum.accumulate(last_valid, axis=0, out=last_valid)
+    # Leading gaps point at row 0, which is NaN for those columns, so they stay NaN
+    return matrix[last_valid, np.arange(matrix.shape[1])]
+
+def align_calendar(dates, matrix, freq='D'):
+    """
+    Reindex a balance matrix onto a full calendar ('D') or business-day ('B') range.
+    
+    Days in the data that aren't on the calendar (e.g. a weekend posting with
+    'B') are kept, so no balances are dropped. Added days are NaN until filled.
+    
+    Parameters:
+    - dates: Sorted datetime64[ns] dates of the matrix rows
+    - matrix: Balance matrix (dates x accounts)
+    - freq: 'D' for every calendar day, 'B' for business days, None to leave as is
+    
+    Returns:
+    - Tuple (dates, matrix) on the full range
+    """
+    if freq is None or len(dates) == 0:
+        return dates, matrix
+    calendar = pd.date_range(dates[0], dates[-1], freq=freq).to_numpy(dtype='datetime64[ns]')
+    all_dates = np.union1d(calendar, dates)
+    if len(all_dates) == len(dates):
+        return dates, matrix
+    aligned = np.full((len(all_dates), matrix.shape[1]), np.nan)
+    aligned[np.searchsorted(all_dates, dates)] = matrix
+    return all_dates, aligned
+
+def fill_gaps(accounts, matrix, fill='ffill'):
+    """
+    Fill days without a balance, per account.
+    
+    Accounts are grouped by fill method and each group is filled with one
+    array operation, so the cost doesn't grow with a Python loop per account.
+    
+    Parameters:
+    - accounts: Account names, one per matrix column
+    - matrix: Balance matrix (dates x accounts) with NaN for missing days
+    - fill: A method from FILL_METHODS for every account, or a dict of
+      {account: method}; accounts missing from the dict use 'ffill'
+    
+    Returns:
+    - A new filled matrix
+    """
+    if isinstance(fill, dict):
+        methods = [fill.get(account, 'ffill') for account in accounts]
+    else:
+        methods = [fill] * len(accounts)
+    for method in methods:
+        if method not in FILL_METHODS:
+            raise ValueError(f"fill must be one of {FILL_METHODS}, got {method!r}")
+    
+    methods = np.array(methods, dtype=object)
+    filled = matrix.copy()
+    ffill_cols = methods == 'ffill'
+    if ffill_cols.any():
+        filled[:, ffill_cols] = forward_fill(matrix[:, ffill_cols])
+    zero_cols = methods == 'zero'
+    if zero_cols.any():
+        filled[:, zero_cols] = np.nan_to_num(matrix[:, zero_cols], nan=0.0)
+    return filled
+
+def build_balance_matrix(dates, accounts, balances, duplicates=DEFAULT_DUPLICATES, fill='ffill', freq=None):
+    """
+    Build the date x account balance matrix from Date/Account/Balance columns.
+    
+    This is the one engine behind FinancialDataManager.load_daily_cash_balance_data
+    and DailyCashBalanceChart.process_data: accounts are factorized to integer
+    codes, duplicates are reduced and the matrix is filled in a single
+    vectorized pass (no pivot_table).
+    
+    Parameters:
+    - dates: Dates (anything pd.to_datetime understands)
+    - accounts: Account names
+    - balances: Numeric balances; rows with a missing balance are skipped
+    - duplicates: 'sum', 'last' or 'first' for several rows per account and day
+    - fill: How to fill days without a row (see fill_gaps), for all accounts
+      or per account
+    - freq: Optional calendar to align to first ('D' or 'B', see align_calendar)
+    
+    Returns:
+    - Tuple (dates, accounts, matrix) as from BalanceMatrixBuilder.result()
+    """
+    builder = BalanceMatrixBuilder(duplicates=duplicates)
+    builder.add(dates, accounts, balances)
+    dates, accounts, matrix = builder.result()
+    dates, matrix = align_calendar(dates, matrix, freq)
+    return dates, accounts, fill_gaps(accounts, matrix, fill)
@@ -0,0 +1,208 @@
+# batch_report.py
+# Render charts for every client and dataset in parallel (e.g. the month-end run)
+#
+# Usage:
+#   python batch_report.py                       # all clients in client_data/, all cores
+#   python batch_report.py --workers 4 --clients acme_corp beta_llc
+#   python batch_report.py --sqlite client_data/clients.db --dpi 150
+#   python batch_report.py --force               # redraw even charts that haven't changed
+#   python batch_report.py --top-categories 10   # merge smaller expense categories into "Other"
+#   python batch_report.py --min-account-balance 1000  # merge minor accounts into "Other accounts"
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Worker state, set up once per process by _init_worker
+_worker = {}
+
+def _init_worker(data_dir, sqlite_path, output_dir, dpi, force=False, top_categories=None,
+                 min_account_balance=None):
+    """
+    Warm up a worker process: load matplotlib on the Agg backend, open the
+    client store and draw one throwaway chart of each type so fonts, caches
+    and imports are ready before the first real job arrives.
+    
+    The store is only read: the parent indexed the clients and hands each job
+    its client file, so workers never scan the directory or write the manifest.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import numpy as np
+    import pandas as pd
+    from storage import JSONFileStorage, SQLiteStorage
+    from charts.stacked_bar import StackedBarIncomeChart
+    from charts.daily_cash_line import DailyCashBalanceChart
+    from balance_matrix import matrix_to_dataset
+    
+    _worker['storage'] = SQLiteStorage(sqlite_path) if sqlite_path else JSONFileStorage(data_dir)
+    _worker['output_dir'] = output_dir
+    _worker['dpi'] = dpi
+    _worker['force'] = force
+    
+    # One headless chart per type, reused for every job in this process
+    _worker['stacked_bar'] = StackedBarIncomeChart(headless=True, top_n_categories=top_categories)
+    _worker['daily_cash'] = DailyCashBalanceChart(headless=True, min_account_balance=min_account_balance)
+    
+    _worker['stacked_bar'].plot({
+        'months': ['Jan', 'Feb'], 'income_values': [1.0, 2.0],
+        'expense_data': {'Warm-up': [0.5, 1.0]}, 'expense_colors': {'Warm-up': '#4169E1'},
+        'net_income_values': [0.5, 1.0]})
+    _worker['stacked_bar'].fig.canvas.draw()
+    _worker['daily_cash'].plot(matrix_to_dataset(
+        pd.date_range('2024-01-01', periods=2).to_numpy(), ['Warm-up'], np.ones((2, 1))))
+    _worker['daily_cash'].fig.canvas.draw()
+
+def chart_type_for(dataset):
+    """Return 'daily_cash' for daily balance datasets and 'stacked_bar' for monthly ones."""
+    return 'daily_cash' if 'dates' in dataset else 'stacked_bar'
+
+def output_path_for(output_dir, client_id, dataset_name):
+    """Build the output file name the same way the clipboard tool does."""
+    safe_filename = dataset_name.replace(' ', '_').lower()
+    return os.path.join(output_dir, f"{client_id}_{safe_filename}.png")
+
+def render_client(client_id, file_path, dataset_names):
+    """
+    Render every dataset of one client (runs inside a worker process).
+    
+    The client is read once, all of its charts are drawn, and it is then
+    dropped from memory so long runs don't accumulate clients. Charts whose
+    output is already up to date (same data and settings) are skipped unless
+    the run was started with force.
+    
+    Parameters:
+    - client_id: Client to render
+    - file_path: The client's JSON file (None for SQLite storage)
+    - dataset_names: Datasets to render
+    
+    Returns:
+    - List of (client_id, dataset_name, output_path or None, status, error message or None)
+      where status is 'rendered', 'unchanged' or 'failed'
+    """
+    storage = _worker['storage']
+    results = []
+    try:
+        client_data = storage.read_client(file_path) if file_path else storage.load_client(client_id)
+    except Exception as e:
+        return [(client_id, name, None, 'failed', f"could not load client: {e}") for name in dataset_names]
+    
+    for dataset_name in dataset_names:
+        try:
+            dataset = dict(client_data['datasets'][dataset_name])
+            dataset.setdefault('client_name', client_data.get('name', client_id))
+            chart = _worker[chart_type_for(dataset)]
+            path = output_path_for(_worker['output_dir'], client_id, dataset_name)
+            if _worker['force']:
+                chart.plot(dataset)
+                chart.save_chart(path, dpi=_worker['dpi'], use_cache=False)
+                rendered = True
+            else:
+                rendered = chart.render(dataset, path, dpi=_worker['dpi'])
+            results.append((client_id, dataset_name, path, 'rendered' if rendered else 'unchanged', None))
+        except Exception as e:
+            results.append((client_id, dataset_name, None, 'failed', str(e)))
+    
+    return results
+
+def collect_jobs(data_mgr, client_ids=None):
+    """
+    List the work: one job per client with its file and the names of its datasets.
+    
+    Uses the storage index only, so no client files are read here. The file
+    is None for storage without per-client files (SQLite).
+    """
+    jobs = []
+    client_path = getattr(data_mgr.storage, 'client_path', None)
+    for client_id, info in data_mgr.list_clients().items():
+        if client_ids and client_id not in client_ids:
+            continue
+        if info['datasets']:
+            jobs.append((client_id, client_path(client_id) if client_path else None, list(info['datasets'])))
+    return jobs
+
+def run_batch(data_dir="client_data", output_dir="output", workers=None, client_ids=None,
+              sqlite_path=None, dpi=300, force=False, top_categories=None,
+              min_account_balance=None):
+    """
+    Render charts for every client and dataset across a pool of processes.
+    
+    Parameters:
+    - data_dir: Client data directory (JSON storage)
+    - output_dir: Where the PNG files go
+    - workers: Number of worker processes (default: all cores); 1 runs in this process
+    - client_ids: Optional list of client ids to limit the run to
+    - sqlite_path: Read clients from this SQLite database instead of data_dir
+    - dpi: Output resolution
+    - force: Redraw every chart even if its output is up to date
+    - top_categories: Keep this many expense categories per monthly chart and
+      merge the rest into "Other"
+    - min_account_balance: Draw accounts that never reach this balance as one
+      "Other accounts" line in daily charts
+    
+    Returns:
+    - List of (client_id, dataset_name, output_path or None, status, error message or None)
+    """
+    from data_loader import FinancialDataManager
+    from storage import SQLiteStorage
+    
+    os.makedirs(output_dir, exist_ok=True)
+    storage = SQLiteStorage(sqlite_path) if sqlite_path else None
+    jobs = collect_jobs(FinancialDataManager(data_dir=data_dir, storage=storage), client_ids)
+    total = sum(len(names) for _, _, names in jobs)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs) or 1))
+    print(f"Rendering {total} charts for {len(jobs)} clients with {workers} worker(s)")
+    
+    init_args = (data_dir, sqlite_path, output_dir, dpi, force, top_categories, min_account_balance)
+    results = []
+    if workers == 1:
+        _init_worker(*init_args)
+        for client_id, file_path, names in jobs:
+            results.extend(render_client(client_id, file_path, names))
+            print(f"  {len(results)}/{total} done")
+    else:
+        # Biggest clients first so one large client doesn't finish last on its own
+        jobs.sort(key=lambda job: len(job[2]), reverse=True)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=init_args) as pool:
+            futures = [pool.submit(render_client, client_id, file_path, names)
+                       for client_id, file_path, names in jobs]
+            for future in as_completed(futures):
+                results.extend(future.result())
+                print(f"  {len(results)}/{total} done")
+    return results
+
+def main(argv=None):
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Render charts for every client and dataset.")
+    parser.add_argument("--data-dir", default="client_data", help="client data directory (default: client_data)")
+    parser.add_argument("--sqlite", default=None, help="read clients from this SQLite database instead")
+    parser.add_argument("--output", default="output", help="output directory (default: output)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--clients", nargs="*", default=None, help="only these client ids")
+    parser.add_argument("--dpi", type=int, default=300, help="output resolution (default: 300)")
+    parser.add_argument("--force", action="store_true", help="redraw charts even if they haven't changed")
+    parser.add_argument("--top-categories", type=int, default=None,
+                        help="keep the N largest expense categories, merge the rest into Other")
+    parser.add_argument("--min-account-balance", type=float, default=None,
+                        help="draw accounts that never reach this balance as one 'Other accounts' line")
+    args = parser.parse_args(argv)
+    
+    start = time.perf_counter()
+    results = run_batch(data_dir=args.data_dir, output_dir=args.output, workers=args.workers,
+                        client_ids=args.clients, sqlite_path=args.sqlite, dpi=args.dpi,
+                        force=args.force, top_categories=args.top_categories,
+                        min_account_balance=args.min_account_balance)
+    
+    failures = [r for r in results if r[3] == 'failed']
+    unchanged = sum(1 for r in results if r[3] == 'unchanged')
+    for client_id, dataset_name, _, _, error in failures:
+        print(f"Failed {client_id}/{dataset_name}: {error}")
+    print(f"Rendered {len(results) - len(failures) - unchanged} of {len(results)} charts "
+          f"({unchanged} unchanged) in {time.perf_counter() - start:.1f}s")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,23 +1,61 @@
 # charts/base.py
 # Base class for chart generation
 
+import io
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from charts.render_cache import render_key, read_cache_key, write_cache_key, remove_cache_key
 
 class BaseChart:
-    """Base class for all chart types."""
+    """
+    Base class for all chart types.
     
-    def __init__(self, title=None, xlabel=None, ylabel=None, figsize=(15, 8)):
-        """Initialize chart with basic properties."""
+    Charts can be used as context managers; the figure is closed on exit:
+        
+        with DailyCashBalanceChart(headless=True) as chart:
+            chart.plot(dataset)
+            chart.save_chart("output/chart.png")
+    
+    Saved charts get a small .cachekey file next to them holding a hash of the
+    dataset and chart settings; saving the same chart again is skipped, and
+    render() skips the plotting too.
+    """
+    
+    def __init__(self, title=None, xlabel=None, ylabel=None, figsize=(15, 8), headless=False):
+        """
+        Initialize chart with basic properties.
+        
+        Parameters:
+        - headless: Render straight to an Agg canvas without pyplot, so no GUI
+          backend is needed and nothing is kept in pyplot's global figure list.
+          The chart reuses its figure on every plot() call, which keeps memory
+          flat when rendering many charts in one process.
+        """
         self.title = title
         self.xlabel = xlabel
         self.ylabel = ylabel
         self.figsize = figsize
+        self.headless = headless
         self.fig = None
         self.ax = None
+        # Data passed to the last plot() call (used for the render cache key)
+        self.dataset = None
     
     def create_figure(self):
-        """Create the matplotlib figure and axis."""
-        self.fig, self.ax = plt.subplots(figsize=self.figsize)
+        """Create the matplotlib figure and axis (reusing this chart's figure when headless)."""
+        if self.headless:
+            if self.fig is None:
+                self.fig = Figure(figsize=self.figsize)
+                FigureCanvasAgg(self.fig)
+            else:
+                self.fig.clear()
+                self.fig.set_size_inches(self.figsize)
+            self.ax = self.fig.add_subplot()
+        else:
+            # Don't leave the previous pyplot figure of this chart open
+            self.close()
+            self.fig, self.ax = plt.subplots(figsize=self.figsize)
         return self.fig, self.ax
     
     def add_styling(self):
@@ -30,15 +68,108 @@ class BaseChart:
             self.ax.set_ylabel(self.ylabel)
         self.ax.grid(axis='y', linestyle='--', alpha=0.7)
     
-    def save_chart(self, filename, dpi=300):
-        """Save the chart to a file."""
+    def resolve_title(self, dataset):
+        """Return the title plot() will use for this dataset."""
+        return self.title
+    
+    def cache_options(self):
+        """Chart settings that change the rendered image (subclasses add their own)."""
+        return {
+            'xlabel': self.xlabel,
+            'ylabel': self.ylabel,
+            'figsize': tuple(self.figsize)
+        }
+    
+    def render_key(self, dataset, dpi=300):
+        """Hash of everything that affects the saved image of this dataset."""
+        options = self.cache_options()
+        options['title'] = self.resolve_title(dataset)
+        options['dpi'] = dpi
+        return render_key(type(self).__name__, dataset, options)
+    
+    def is_up_to_date(self, dataset, filename, dpi=300):
+        """Return True if filename already holds this chart of this dataset at this dpi."""
+        return read_cache_key(filename) == self.render_key(dataset, dpi)
+    
+    def save_chart(self, filename, dpi=300, use_cache=True):
+        """
+        Save the chart to a file.
+        
+        Parameters:
+        - use_cache: Skip writing when filename already holds the same chart
+          (the key of the written chart is stored either way)
+        
+        Returns:
+        - True if the file was written, False if it was already up to date
+        """
+        key = self.render_key(self.dataset, dpi) if self.dataset is not None else None
+        if use_cache and key is not None and read_cache_key(filename) == key:
+            print(f"{filename} is up to date, not saving again")
+            return False
         self.fig.savefig(filename, dpi=dpi, bbox_inches='tight')
+        if key is not None:
+            write_cache_key(filename, key)
+        else:
+            # Don't leave the key of a previous chart next to this one
+            remove_cache_key(filename)
+        return True
+    
+    def render_to_bytes(self, format='png', dpi=300):
+        """
+        Render the chart into memory instead of a file.
+        
+        Parameters:
+        - format: Any format savefig supports ('png', 'svg', 'pdf', ...)
+        - dpi: Resolution (ignored by vector formats)
+        
+        Returns:
+        - BytesIO positioned at the start; use .getbuffer() for a zero-copy
+          memoryview or .getvalue() for a bytes copy
+        """
+        if self.fig is None:
+            raise RuntimeError("Nothing to render; call plot() first")
+        buffer = io.BytesIO()
+        self.fig.savefig(buffer, format=format, dpi=dpi, bbox_inches='tight')
+        buffer.seek(0)
+        return buffer
+    
+    def render(self, dataset, filename, dpi=300):
+        """
+        Plot and save a dataset, skipping both when filename is already up to date.
+        
+        Returns:
+        - True if the chart was rendered, False if it was skipped
+        """
+        if self.is_up_to_date(dataset, filename, dpi):
+            print(f"{filename} is up to date, skipping")
+            return False
+        self.plot(dataset)
+        return self.save_chart(filename, dpi=dpi, use_cache=True)
     
     def show_chart(self):
         """Display the chart."""
-        plt.tight_layout()
+        if self.headless:
+            raise RuntimeError("Headless charts can't be shown; use save_chart() instead")
+        self.fig.tight_layout()
         plt.show()
     
+    def close(self):
+        """Release the figure. Safe to call more than once."""
+        if self.fig is not None:
+            if self.headless:
+                self.fig.clear()
+            else:
+                plt.close(self.fig)
+        self.fig = None
+        self.ax = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+    
     def plot(self, data):
         """Abstract method to be implemented by child classes."""
         raise NotImplementedError("Subclasses must implement plot()")
@@ -2,11 +2,17 @@
 # Daily Cash Balance Visualization - Line chart showing daily cash balances for multiple accounts
 
 from charts.base import BaseChart
+from charts.downsample import downsample
 import matplotlib.pyplot as plt
 import pandas as pd
 import matplotlib.dates as mdates
+from matplotlib.ticker import FuncFormatter
+from matplotlib.collections import LineCollection
+from matplotlib.lines import Line2D
 from datetime import datetime
 import numpy as np
+from balance_matrix import (build_balance_matrix, stream_csv_balances, matrix_to_dataset, align_calendar,
+                            fill_gaps, rollup_small_accounts)
 
 class DailyCashBalanceChart(BaseChart):
     """
@@ -16,20 +22,44 @@ class DailyCashBalanceChart(BaseChart):
     
     def __init__(self, title="Daily Cash Balance", 
                  xlabel="Date", ylabel="Balance ($)",
-                 figsize=(15, 8), client_name=None):
-        """Initialize the daily cash balance line chart."""
+                 figsize=(15, 8), client_name=None, level_of_detail=True,
+                 collection_threshold=10, min_account_balance=None, headless=False):
+        """
+        Initialize the daily cash balance line chart.
+        
+        Parameters:
+        - level_of_detail: Draw long series min/max-decimated to the plot's pixel
+          width (extremes kept); set False to draw every point
+        - collection_threshold: With more accounts than this, draw all account
+          lines as a single LineCollection instead of one line each (None to never)
+        - min_account_balance: If set, accounts whose balance never reaches this
+          magnitude are drawn as one "Other accounts" line (see rollup_small_accounts)
+        - headless: Render without pyplot (see BaseChart)
+        """
         # Add client name to title if provided
         if client_name:
             title = f"{client_name}: {title}"
-        super().__init__(title, xlabel, ylabel, figsize)
+        super().__init__(title, xlabel, ylabel, figsize, headless=headless)
         self.client_name = client_name
-        
-    def process_data(self, data):
+        self.level_of_detail = level_of_detail
+        self.collection_threshold = collection_threshold
+        self.min_account_balance = min_account_balance
+        # Artists of the last plot(), so update_series() can change their data
+        self.account_lines = {}
+        self.account_segments = None
+        self.account_collection = None
+        self.total_line = None
+        self.threshold_lines = {}
+        
+    def process_data(self, data, freq=None, fill='ffill'):
         """
         Process raw data into a format suitable for plotting.
         
         Expected input format:
         - data: DataFrame with columns [Date, Account, Balance]
+        - freq: Optional calendar to align to ('D' every day, 'B' business days)
+        - fill: How to fill days an account didn't report ('ffill', 'zero',
+          None, or a dict of per-account methods)
         
         Returns:
         - Dictionary with processed data ready for plotting
@@ -43,45 +73,27 @@ class DailyCashBalanceChart(BaseChart):
             if col not in data.columns:
                 raise ValueError(f"Input data must contain '{col}' column")
         
-        # Convert dates to datetime if they aren't already
-        if not pd.api.types.is_datetime64_any_dtype(data['Date']):
-            data['Date'] = pd.to_datetime(data['Date'])
-            
-        # Ensure Balance is numeric
-        data['Balance'] = pd.to_numeric(data['Balance'], errors='coerce')
-        
-        # Sort by date
-        data = data.sort_values('Date')
-        
-        # Get unique dates and accounts
-        dates = data['Date'].unique()
-        accounts = data['Account'].unique()
-        
-        # Group by date and account to handle multiple entries for the same account on the same day
-        # This ensures we only have one data point per account per day
-        grouped_data = data.groupby(['Date', 'Account']).agg({'Balance': 'last'}).reset_index()
-        
-        # Create a pivot table: dates as index, accounts as columns
-        pivot_data = grouped_data.pivot_table(
-            index='Date', 
-            columns='Account', 
-            values='Balance',
-            aggfunc='last'  # Use the last value for each day
-        ).reset_index()
-        
-        # Fill any missing values with the previous day's value
-        pivot_data = pivot_data.fillna(method='ffill')
-        
-        # Calculate total balance across all accounts for each date
-        pivot_data['Total'] = pivot_data.iloc[:, 1:].sum(axis=1)
-        
-        return {
-            'dates': pivot_data['Date'],
-            'accounts': accounts,
-            'account_data': {account: pivot_data[account].values for account in accounts},
-            'total_balance': pivot_data['Total'].values
-        }
-        
+        # Build the date x account matrix with the same engine (and duplicate
+        # rule) as FinancialDataManager; gaps are filled with the previous day's value
+        dates, accounts, matrix = build_balance_matrix(data['Date'], data['Account'],
+                                                       pd.to_numeric(data['Balance'], errors='coerce'),
+                                                       fill=fill, freq=freq)
+        return matrix_to_dataset(dates, accounts, matrix)
+        
+    def resolve_title(self, dataset):
+        """Return the title plot() will use for this dataset."""
+        if isinstance(dataset, dict) and dataset.get('client_name') and not self.client_name:
+            return f"{dataset['client_name']}: Daily Cash Balance"
+        return self.title
+    
+    def cache_options(self):
+        """Chart settings that change the rendered image."""
+        options = super().cache_options()
+        options['level_of_detail'] = self.level_of_detail
+        options['collection_threshold'] = self.collection_threshold
+        options['min_account_balance'] = self.min_account_balance
+        return options
+    
     def plot(self, data):
         """
         Generate the daily cash balance line chart.
@@ -91,11 +103,17 @@ class DailyCashBalanceChart(BaseChart):
             1. A pandas DataFrame with columns [Date, Account, Balance]
             2. A dictionary with processed data (output from process_data)
         """
+        self.dataset = data
+        
         # Process data if it's a DataFrame
         if isinstance(data, pd.DataFrame):
             dataset = self.process_data(data)
         else:
             dataset = data
+        
+        # Merge the minor accounts into a single line for large clients
+        if self.min_account_balance is not None:
+            dataset = rollup_small_accounts(dataset, self.min_account_balance)
             
         # Extract data from the dataset
         dates = dataset['dates']
@@ -104,12 +122,10 @@ class DailyCashBalanceChart(BaseChart):
         total_balance = dataset['total_balance']
         
         # If client name is in dataset and we didn't already set it in constructor
-        if 'client_name' in dataset and dataset['client_name'] and not self.client_name:
-            client_name = dataset['client_name']
-            self.title = f"{client_name}: Daily Cash Balance"
+        self.title = self.resolve_title(dataset)
         
         # Create the figure with extra space for labels
-        self.fig, self.ax = plt.subplots(figsize=self.figsize)
+        self.create_figure()
         
         # Set the updated title
         self.ax.set_title(self.title, fontsize=14, pad=20)
@@ -117,17 +133,34 @@ class DailyCashBalanceChart(BaseChart):
         # Color palette for different accounts
         colors = plt.cm.tab10.colors  # Using a colormap for consistent colors
         
+        # Level of detail: one min/max bin per pixel of plot width, so the number
+        # of vertices stays bounded however long the history is
+        date_values = pd.to_datetime(dates).to_numpy()
+        n_bins = int(self.ax.get_window_extent().width) if self.level_of_detail else 0
+        
+        self.date_values = date_values
+        self.n_bins = n_bins
+        self.plotted_accounts = list(accounts)
+        self.account_lines = {}
+        self.account_segments = None
+        self.account_collection = None
+        
         # Plot line for each account
-        for i, account in enumerate(accounts):
-            values = account_data[account]
-            self.ax.plot(dates, values, linestyle='-', marker='', 
-                        color=colors[i % len(colors)], linewidth=1.5, 
-                        label=account, alpha=0.7)
+        if self.collection_threshold is not None and len(accounts) > self.collection_threshold:
+            self.account_collection = self.plot_account_collection(date_values, accounts, account_data,
+                                                                   colors, n_bins)
+        else:
+            for i, account in enumerate(accounts):
+                x, values = downsample(date_values, account_data[account], n_bins)
+                self.account_lines[account], = self.ax.plot(x, values, linestyle='-', marker='', 
+                                                            color=colors[i % len(colors)], linewidth=1.5, 
+                                                            label=account, alpha=0.7)
         
         # Plot total balance with thicker line
-        self.ax.plot(dates, total_balance, linestyle='-', marker='', 
-                    color='black', linewidth=2.5, 
-                    label='Total Balance')
+        x, values = downsample(date_values, total_balance, n_bins)
+        self.total_line, = self.ax.plot(x, values, linestyle='-', marker='', 
+                                         color='black', linewidth=2.5, 
+                                         label='Total Balance')
         
         # Format x-axis with dates - improve date formatting
         date_format = mdates.DateFormatter('%b %d')  # Format as 'Jan 01'
@@ -135,7 +168,10 @@ class DailyCashBalanceChart(BaseChart):
         
         # Set appropriate date locator based on date range
         date_range = (dates.max() - dates.min()).days
-        if date_range > 180:  # More than 6 months
+        if date_range > 730:  # More than 2 years - keep the tick count bounded too
+            self.ax.xaxis.set_major_locator(mdates.AutoDateLocator(maxticks=12))
+            self.ax.xaxis.set_major_formatter(mdates.DateFormatter('%b %Y'))
+        elif date_range > 180:  # More than 6 months
             self.ax.xaxis.set_major_locator(mdates.MonthLocator())
             self.ax.xaxis.set_minor_locator(mdates.WeekdayLocator())
         elif date_range > 30:  # More than a month
@@ -146,48 +182,190 @@ class DailyCashBalanceChart(BaseChart):
         # Rotate date labels for better readability
         plt.setp(self.ax.get_xticklabels(), rotation=45, ha='right')
         
-        # Add lower threshold line if provided (red dashed line)
+        # Add threshold lines if provided
+        self.threshold_lines = {}
+        self.draw_thresholds(dataset)
+        
+        # Add styling
+        self.add_styling()
+        
+        # Add legend to the right outside the plot area
+        self.add_legend()
+        
+        # Add grid for better readability
+        self.ax.grid(True, linestyle='--', alpha=0.7)
+        
+        # Format y-axis with dollar signs and commas
+        self.ax.yaxis.set_major_formatter(FuncFormatter(lambda x, _: f'${x:,.2f}'))
+        
+        # Add more padding to avoid cutoff
+        self.fig.subplots_adjust(bottom=0.15, right=0.8)
+        
+        # Adjust layout
+        self.fig.tight_layout()
+        
+        return self.fig, self.ax
+    
+    def threshold_specs(self, dataset):
+        """
+        Threshold lines the dataset asks for.
+        
+        Returns:
+        - Dictionary {kind: (y value, color, label)} with kind 'lower', 'upper'
+          or 'threshold' (older datasets)
+        """
+        specs = {}
+        
+        # Lower threshold line (red dashed line)
         if 'lower_threshold' in dataset:
             threshold = dataset['lower_threshold']
             threshold_name = dataset.get('lower_threshold_name', f'Minimum (${threshold:,.2f})')
-            self.ax.axhline(y=threshold, color='red', linestyle='--', alpha=0.7, 
-                           label=threshold_name)
+            specs['lower'] = (threshold, 'red', threshold_name)
         
-        # Add upper threshold line if provided (green dashed line)
+        # Upper threshold line (green dashed line)
         if 'upper_threshold' in dataset:
             threshold = dataset['upper_threshold']
             threshold_name = dataset.get('upper_threshold_name', f'Target (${threshold:,.2f})')
-            self.ax.axhline(y=threshold, color='green', linestyle='--', alpha=0.7, 
-                           label=threshold_name)
+            specs['upper'] = (threshold, 'green', threshold_name)
         
         # Backward compatibility for older datasets with just 'threshold'
         elif 'threshold' in dataset:
             threshold = dataset['threshold']
-            self.ax.axhline(y=threshold, color='red', linestyle='--', alpha=0.7, 
-                           label=f'Threshold (${threshold:,.2f})')
+            specs['threshold'] = (threshold, 'red', f'Threshold (${threshold:,.2f})')
         
-        # Add styling
-        self.add_styling()
+        return specs
+    
+    def draw_thresholds(self, dataset):
+        """
+        Add, move or remove the dashed threshold lines to match the dataset.
         
-        # Add legend to the right outside the plot area
+        Returns:
+        - True if lines were added, removed or relabelled (the legend is stale)
+        """
+        specs = self.threshold_specs(dataset)
+        legend_changed = False
+        
+        for kind in [kind for kind in self.threshold_lines if kind not in specs]:
+            self.threshold_lines.pop(kind).remove()
+            legend_changed = True
+        
+        for kind, (threshold, color, label) in specs.items():
+            line = self.threshold_lines.get(kind)
+            if line is None:
+                self.threshold_lines[kind] = self.ax.axhline(y=threshold, color=color, linestyle='--',
+                                                             alpha=0.7, label=label)
+                legend_changed = True
+            else:
+                line.set_ydata([threshold, threshold])
+                if line.get_label() != label:
+                    line.set_label(label)
+                    legend_changed = True
+        return legend_changed
+    
+    def set_thresholds(self, dataset):
+        """
+        Update the threshold lines of the plotted chart in place (e.g. while the
+        user is typing a threshold), refreshing the legend only when needed.
+        """
+        if self.draw_thresholds(dataset):
+            self.add_legend()
+        self.rescale()
+    
+    def add_legend(self):
+        """Add (or rebuild) the legend to the right outside the plot area."""
         self.ax.legend(loc='center left', bbox_to_anchor=(1.05, 0.5), frameon=True, 
                        fancybox=True, shadow=True)
+    
+    def rescale(self):
+        """Fit the axes to the current line data (relim doesn't look at collections)."""
+        self.ax.relim()
+        if self.account_collection is not None:
+            points = np.concatenate(self.account_segments)
+            self.ax.update_datalim(points[np.isfinite(points).all(axis=1)])
+        self.ax.autoscale_view()
+    
+    def plot_account_collection(self, date_values, accounts, account_data, colors, n_bins):
+        """
+        Draw every account line as one LineCollection (many accounts).
         
-        # Add grid for better readability
-        self.ax.grid(True, linestyle='--', alpha=0.7)
+        Styled like the per-account lines; the legend gets one proxy line per
+        account since a collection only has a single label.
         
-        # Format y-axis with dollar signs and commas
-        self.ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, _: f'${x:,.2f}'))
+        Parameters:
+        - date_values: datetime64 array of the dates
+        - accounts: Account names, in plotting order
+        - account_data: Dictionary of account name -> balances
+        - colors: Palette cycled over the accounts
+        - n_bins: Level of detail bins (0 draws every point)
+        """
+        # The collection takes plain numbers, so put the axis in date units first
+        self.ax.xaxis_date()
+        
+        segments = []
+        for account in accounts:
+            x, values = downsample(date_values, account_data[account], n_bins)
+            segments.append(np.column_stack([mdates.date2num(x), values]))
+        self.account_segments = segments
+        
+        account_colors = [colors[i % len(colors)] for i in range(len(accounts))]
+        collection = LineCollection(segments, colors=account_colors, linewidths=1.5,
+                                    linestyles='-', alpha=0.7)
+        self.ax.add_collection(collection, autolim=True)
+        self.ax.autoscale_view()
+        
+        # Legend proxies: one line per account, added ahead of the other legend entries
+        for account, color in zip(accounts, account_colors):
+            self.ax.add_line(Line2D([], [], color=color, linewidth=1.5, alpha=0.7,
+                                    label=account))
+        return collection
+    
+    def update_series(self, dataset, changed=None):
+        """
+        Redraw the lines for corrected balances without re-plotting the chart.
         
-        # Add more padding to avoid cutoff
-        self.fig.subplots_adjust(bottom=0.15, right=0.8)
+        Only the data of the changed accounts' lines and the total line is
+        replaced; axes, legend and thresholds are kept. If the dataset no
+        longer has the plotted dates and accounts, the chart is re-plotted.
         
-        # Adjust layout
-        self.fig.tight_layout()
+        Parameters:
+        - dataset: The updated dataset (see process_data)
+        - changed: Accounts whose balances changed, e.g. the dict returned by
+          FinancialDataManager.update_daily_cash_balances (None = all accounts)
         
-        return self.fig, self.ax
+        Returns:
+        - True if the lines were updated in place, False if the chart was re-plotted
+        """
+        shown = dataset
+        if self.min_account_balance is not None:
+            shown = rollup_small_accounts(dataset, self.min_account_balance)
+            changed = None  # merged accounts share one line
+        
+        same_layout = (self.fig is not None and self.total_line is not None
+                       and list(shown['accounts']) == self.plotted_accounts
+                       and np.array_equal(pd.to_datetime(shown['dates']).to_numpy(), self.date_values))
+        if not same_layout:
+            self.plot(dataset)
+            return False
+        
+        self.dataset = dataset
+        for account in (self.plotted_accounts if changed is None else changed):
+            x, values = downsample(self.date_values, shown['account_data'][account], self.n_bins)
+            if self.account_collection is not None:
+                i = self.plotted_accounts.index(account)
+                self.account_segments[i] = np.column_stack([mdates.date2num(x), values])
+            else:
+                self.account_lines[account].set_data(x, values)
+        if self.account_collection is not None:
+            self.account_collection.set_segments(self.account_segments)
+        
+        x, values = downsample(self.date_values, shown['total_balance'], self.n_bins)
+        self.total_line.set_data(x, values)
+        
+        # Rescale to the new values
+        self.rescale()
+        return True
     
-    def load_from_csv(self, csv_path):
+    def load_from_csv(self, csv_path, chunksize=None, freq=None, fill='ffill'):
         """
         Load data from a CSV file.
         
@@ -197,10 +375,24 @@ class DailyCashBalanceChart(BaseChart):
         2023-01-01,Savings,10000.00
         ...
         
+        Parameters:
+        - csv_path: Path to the CSV file
+        - chunksize: If set, stream the file this many rows at a time and return
+          the processed dataset instead of the raw DataFrame (for huge files)
+        - freq, fill: Calendar alignment and gap filling when streaming (see process_data)
+        
         Returns:
-        - DataFrame with the loaded data
+        - DataFrame with the loaded data, or the processed dataset when streaming
+          (both can be passed to plot())
         """
         try:
+            if chunksize:
+                builder = stream_csv_balances(csv_path, chunksize=chunksize)
+                dates, accounts, matrix = builder.result()
+                # Same as process_data: align to the calendar and fill the gaps
+                dates, matrix = align_calendar(dates, matrix, freq)
+                return matrix_to_dataset(dates, accounts, fill_gaps(accounts, matrix, fill),
+                                         client_name=self.client_name)
             data = pd.read_csv(csv_path)
             return data
         except Exception as e:
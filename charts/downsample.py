@@ -0,0 +1,66 @@
+# charts/downsample.py
+# Level-of-detail decimation so long daily series draw in bounded time
+
+import numpy as np
+
+def minmax_indices(values, n_bins):
+    """
+    Pick which points of a series to draw so it looks the same n_bins pixels wide.
+    
+    The series is split into n_bins equal runs of points. From each run we keep
+    the lowest and highest value (so extremes and threshold breaches stay
+    visible) and the first missing value (so gaps still break the line), plus
+    the first and last point of the series. At most about 3 * n_bins points are
+    kept no matter how long the series is.
+    
+    Parameters:
+    - values: 1-D array of values (NaN for missing days)
+    - n_bins: Number of bins, usually the plot width in pixels
+    
+    Returns:
+    - Sorted int array of indices into values
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    if n_bins <= 0 or n <= 2 * n_bins:
+        return np.arange(n)
+    
+    # Lay the series out as n_bins rows (the last row is padded with NaN)
+    per_bin = -(-n // n_bins)
+    padded = np.full(n_bins * per_bin, np.nan)
+    padded[:n] = values
+    blocks = padded.reshape(-1, per_bin)
+    missing = np.isnan(blocks)
+    
+    # Missing values never win the min/max
+    lows = np.where(missing, np.inf, blocks).argmin(axis=1)
+    highs = np.where(missing, -np.inf, blocks).argmax(axis=1)
+    gaps = missing.argmax(axis=1)
+    
+    starts = np.arange(len(blocks)) * per_bin
+    has_value = ~missing.all(axis=1)
+    has_gap = missing.any(axis=1)
+    picks = np.concatenate([(starts + lows)[has_value], (starts + highs)[has_value],
+                            (starts + gaps)[has_gap], [0, n - 1]])
+    picks = np.unique(picks)
+    # Drop padding
+    return picks[picks < n]
+
+def downsample(x, y, n_bins):
+    """
+    Min/max-decimate one line for drawing.
+    
+    Parameters:
+    - x: X values (e.g. dates), same length as y
+    - y: Y values
+    - n_bins: Number of bins, usually the plot width in pixels
+    
+    Returns:
+    - Tuple (x, y) with only the points that matter at that width
+    """
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=np.float64)
+    idx = minmax_indices(y, n_bins)
+    if len(idx) == len(y):
+        return x, y
+    return x[idx], y[idx]
@@ -0,0 +1,87 @@
+# charts/render_cache.py
+# Content hashes for rendered charts, so unchanged charts aren't saved again
+
+import hashlib
+import json
+import os
+import numpy as np
+import pandas as pd
+import matplotlib
+
+# Bump when chart drawing code changes in a way that should invalidate old output
+RENDER_CACHE_VERSION = 1
+CACHE_KEY_SUFFIX = ".cachekey"
+
+def _update_hash(h, obj):
+    """Feed a dataset value into a hash, recursing through dicts and lists."""
+    if isinstance(obj, dict):
+        # Insertion order matters (e.g. expense stacking order), so keys aren't sorted
+        h.update(b"{")
+        for key, value in obj.items():
+            _update_hash(h, str(key))
+            _update_hash(h, value)
+        h.update(b"}")
+    elif isinstance(obj, pd.DataFrame):
+        h.update(b"frame")
+        _update_hash(h, [str(col) for col in obj.columns])
+        for col in obj.columns:
+            _update_hash(h, obj[col].to_numpy())
+    elif isinstance(obj, (pd.Series, pd.Index)):
+        _update_hash(h, obj.to_numpy())
+    elif isinstance(obj, np.ndarray):
+        if obj.dtype == object:
+            _update_hash(h, obj.tolist())
+        else:
+            h.update(f"array{obj.dtype.str}{obj.shape}".encode())
+            h.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, (list, tuple)):
+        h.update(b"[")
+        for item in obj:
+            _update_hash(h, item)
+        h.update(b"]")
+    else:
+        h.update(f"{type(obj).__name__}:{obj!r};".encode())
+
+def render_key(chart_class, dataset, options):
+    """
+    Build a stable hash of everything that affects a rendered chart.
+    
+    Parameters:
+    - chart_class: Name of the chart class
+    - dataset: The dataset being plotted (thresholds and client name included)
+    - options: Dict of chart settings (title, labels, figsize, dpi, ...)
+    
+    Returns:
+    - Hex digest string
+    """
+    h = hashlib.sha256()
+    _update_hash(h, [RENDER_CACHE_VERSION, matplotlib.__version__, chart_class])
+    _update_hash(h, options)
+    _update_hash(h, dataset)
+    return h.hexdigest()
+
+def cache_key_path(filename):
+    """Path of the sidecar file holding the key of a rendered chart."""
+    return filename + CACHE_KEY_SUFFIX
+
+def read_cache_key(filename):
+    """Return the stored key for a rendered chart, or None if it has none (or the chart is missing)."""
+    if not os.path.exists(filename):
+        return None
+    try:
+        with open(cache_key_path(filename), "r") as f:
+            return json.load(f).get("key")
+    except (OSError, ValueError):
+        return None
+
+def write_cache_key(filename, key):
+    """Store the key next to a freshly rendered chart."""
+    with open(cache_key_path(filename), "w") as f:
+        json.dump({"key": key}, f)
+
+def remove_cache_key(filename):
+    """Forget the stored key of a chart (e.g. one saved without a known dataset)."""
+    try:
+        os.remove(cache_key_path(filename))
+    except FileNotFoundError:
+        pass
@@ -2,7 +2,13 @@
 # Stacked bar chart with net income line - refactored from monthly_chart_template.py
 
 from charts.base import BaseChart
+from money import parse_money
+from monthly_data import rollup_expense_categories
 import matplotlib.pyplot as plt
+from matplotlib.patches import Patch
+from matplotlib.collections import PolyCollection
+from matplotlib.colors import to_rgba_array
+import numpy as np
 import tkinter as tk
 import tkinter.messagebox as messagebox
 
@@ -14,18 +20,50 @@ class StackedBarIncomeChart(BaseChart):
     
     def __init__(self, title="Income vs. Stacked Expenses with Net Income", 
                  xlabel="Month", ylabel="Amount ($)",
-                 figsize=(15, 8), highlight_last_month=True, client_name=None):
-        """Initialize the stacked bar chart."""
+                 figsize=(15, 8), highlight_last_month=True, client_name=None,
+                 top_n_categories=None, rollup_by='total', headless=False):
+        """
+        Initialize the stacked bar chart.
+        
+        Parameters:
+        - top_n_categories: If set, draw only the N largest expense categories and
+          merge the rest into "Other" (see rollup_expense_categories)
+        - rollup_by: Rank categories by their 'total' or by the 'last' month
+        - headless: Render without pyplot (see BaseChart)
+        """
         # Add client name to title if provided
         if client_name:
             title = f"{client_name}: {title}"
-        super().__init__(title, xlabel, ylabel, figsize)
+        super().__init__(title, xlabel, ylabel, figsize, headless=headless)
         self.highlight_last_month = highlight_last_month
         self.bar_width = 0.35
         self.client_name = client_name
+        self.top_n_categories = top_n_categories
+        self.rollup_by = rollup_by
+    
+    def resolve_title(self, dataset):
+        """Return the title plot() will use for this dataset."""
+        if dataset.get('client_name') and not self.client_name:
+            return f"{dataset['client_name']}: Income vs. Stacked Expenses with Net Income"
+        return self.title
+    
+    def cache_options(self):
+        """Chart settings that change the rendered image."""
+        options = super().cache_options()
+        options['highlight_last_month'] = self.highlight_last_month
+        options['bar_width'] = self.bar_width
+        options['top_n_categories'] = self.top_n_categories
+        options['rollup_by'] = self.rollup_by
+        return options
     
     def plot(self, dataset):
         """Generate the stacked bar chart based on the dataset."""
+        self.dataset = dataset
+        
+        # Merge the small expense categories into "Other" for wide datasets
+        if self.top_n_categories is not None:
+            dataset = rollup_expense_categories(dataset, self.top_n_categories, by=self.rollup_by)
+        
         # Extract data from the dataset
         months = dataset['months']
         income_vals = dataset['income_values']
@@ -34,9 +72,7 @@ class StackedBarIncomeChart(BaseChart):
         net_income_vals = dataset['net_income_values']
         
         # If client name is in dataset and we didn't already set it in constructor
-        if 'client_name' in dataset and dataset['client_name'] and not self.client_name:
-            client_name = dataset['client_name']
-            self.title = f"{client_name}: Income vs. Stacked Expenses with Net Income"
+        self.title = self.resolve_title(dataset)
         
         # Create the figure
         self.create_figure()
@@ -45,35 +81,52 @@ class StackedBarIncomeChart(BaseChart):
         self.ax.set_title(self.title)
         
         # Define x locations for the bars
-        x = range(len(months))
+        x = np.arange(len(months))
         
         # Plot income bars
-        self.ax.bar([i - self.bar_width/2 for i in x], income_vals, 
-                   width=self.bar_width, label='Income', color='#90EE90')
-        
-        # Plot stacked expenses with labels on the last month if requested
-        bottoms = [0] * len(months)
-        last_month_index = len(months) - 1 if self.highlight_last_month else None
-        
-        # This part is from your original code - maintaining the stacked bars functionality
-        for category, color in expense_colors.items():
-            values = expense_data[category]
-            self.ax.bar([i + self.bar_width/2 for i in x], values, 
-                       width=self.bar_width, label=category, 
-                       bottom=bottoms, color=color)
-            
-            # Add labels for the last month if values are positive
-            if last_month_index is not None and values[last_month_index] > 0:
-                height = bottoms[last_month_index] + values[last_month_index] / 2
-                self.ax.text(last_month_index + self.bar_width/2 + 0.05, 
-                            height, category, va='center', fontsize=10)
-            
-            # Update bottoms for next category
-            bottoms = [bottoms[j] + values[j] for j in range(len(values))]
+        income_bars = self.ax.bar(x - self.bar_width/2, income_vals, 
+                                  width=self.bar_width, label='Income', color='#90EE90')
+        legend_handles = [income_bars]
+        
+        # Stack the expenses: one row per category, bottoms from a cumulative sum
+        categories = list(expense_colors)
+        colors = [expense_colors[category] for category in categories]
+        values = np.array([expense_data[category] for category in categories],
+                          dtype=np.float64).reshape(len(categories), len(months))
+        tops = np.cumsum(values, axis=0)
+        bottoms = tops - values
+        
+        if len(categories):
+            # Draw every expense segment as one collection of rectangles
+            # (a single artist instead of one Rectangle per category per month)
+            left = np.broadcast_to(x, values.shape)
+            right = left + self.bar_width
+            corners = np.stack([np.stack([left, bottoms], axis=-1),
+                                np.stack([left, tops], axis=-1),
+                                np.stack([right, tops], axis=-1),
+                                np.stack([right, bottoms], axis=-1)], axis=-2)
+            segments = PolyCollection(corners.reshape(-1, 4, 2), closed=True, edgecolors='none',
+                                      facecolors=np.repeat(to_rgba_array(colors), len(months), axis=0))
+            # Keep bars sitting on the x-axis like ax.bar does
+            segments.sticky_edges.y.append(0)
+            self.ax.add_collection(segments, autolim=True)
+            self.ax.autoscale_view()
+            # One legend entry per category
+            legend_handles += [Patch(facecolor=color, label=category)
+                               for category, color in zip(categories, colors)]
+        
+        # Add labels for the last month if values are positive
+        if self.highlight_last_month and len(months):
+            last = len(months) - 1
+            label_heights = bottoms[:, last] + values[:, last] / 2
+            for i in np.flatnonzero(values[:, last] > 0):
+                self.ax.text(last + self.bar_width/2 + 0.05, 
+                            label_heights[i], categories[i], va='center', fontsize=10)
         
         # Plot net income dotted line
-        self.ax.plot(x, net_income_vals, linestyle='dotted', marker='o', 
-                    color='red', linewidth=2, label='Net Income')
+        net_income_line, = self.ax.plot(x, net_income_vals, linestyle='dotted', marker='o', 
+                                        color='red', linewidth=2, label='Net Income')
+        legend_handles.insert(0, net_income_line)
         
         # Set x-axis labels with more space for rotation
         self.ax.set_xticks(x)
@@ -81,11 +134,11 @@ class StackedBarIncomeChart(BaseChart):
         
         # Add styling
         self.add_styling()
-        self.ax.legend(loc='upper left', bbox_to_anchor=(1, 1))
+        self.ax.legend(handles=legend_handles, loc='upper left', bbox_to_anchor=(1, 1))
         
         # Adjust layout to prevent cut-off month labels
-        plt.tight_layout()
-        plt.subplots_adjust(bottom=0.15)
+        self.fig.tight_layout()
+        self.fig.subplots_adjust(bottom=0.15)
         
         return self.fig, self.ax
 
@@ -132,23 +185,17 @@ class StackedBarIncomeChart(BaseChart):
                     # Split the line into parts
                     parts = re.split(r'\t+|\s{2,}', line.strip())
                     
-                    # Get category name (first column)
-                    category = parts[0]
-                    # Handle multi-word categories
-                    i = 1
-                    while i < len(parts) and not self._is_likely_number(parts[i]):
-                        category += " " + parts[i]
-                        i += 1
+                    # Parse the whole row at once; text and empty cells come back as NaN
+                    amounts, invalid = parse_money(parts, empty_value=np.nan)
+                    is_number = ~np.isnan(amounts)
+                    is_number[0] = False
+                    
+                    # Get category name (first column plus any words before the first number)
+                    i = int(np.argmax(is_number)) if is_number.any() else len(parts)
+                    category = " ".join(parts[:i])
                     
-                    # Convert remaining parts to numbers
-                    values = []
-                    for val in parts[i:]:
-                        try:
-                            # Handle commas in numbers
-                            num_val = float(val.replace(',', '')) if val.strip() else 0.0
-                            values.append(num_val)
-                        except ValueError:
-                            values.append(0.0)
+                    # Remaining parts are the values (unreadable cells count as 0)
+                    values = np.nan_to_num(amounts[i:], nan=0.0).tolist()
                     
                     # Categorize the row
                     category = category.strip().upper()
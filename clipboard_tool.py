@@ -1,14 +1,19 @@
 # clipboard_tool.py
 # A simple tool to test the clipboard data loading functionality
 
+import time
+_STARTED = time.perf_counter()
+
+# Only cheap imports here so the window comes up right away. pandas and
+# matplotlib (data_loader, the chart modules, the data editor) take about a
+# second to import; they are imported where they are used, and pre-imported
+# by the startup job in the background (see ClipboardToolApp._startup_job).
 import tkinter as tk
-from tkinter import messagebox, filedialog
-import matplotlib.pyplot as plt
-from data_loader import FinancialDataManager
-from charts.stacked_bar import StackedBarIncomeChart
-from charts.daily_cash_line import DailyCashBalanceChart
+from tkinter import messagebox, filedialog, ttk
+from background_jobs import JobRunner, JobCancelled
 import re
 import csv
+import io
 import os
 import json
 
@@ -16,7 +21,7 @@ class ClipboardToolApp:
     def __init__(self, root):
         self.root = root
         self.root.title("Financial Chart - Clipboard Tool")
-        self.root.geometry("600x500")
+        self.root.geometry("1300x700")
         
         # Ensure directories exist
         if not os.path.exists("client_data"):
@@ -26,20 +31,8 @@ class ClipboardToolApp:
             os.makedirs("output")
             print("Created output directory")
         
-        # Test direct file creation to ensure permissions are correct
-        test_file = os.path.join("client_data", "test_file.txt")
-        try:
-            with open(test_file, 'w') as f:
-                f.write("This is a test file to verify write permissions.")
-            print(f"Successfully created test file: {test_file}")
-        except Exception as e:
-            print(f"ERROR: Cannot write to client_data directory: {e}")
-        
-        # Initialize the data manager (but don't create default client)
-        self.data_mgr = FinancialDataManager()
-        
-        # Migrate any legacy data
-        self.migrate_legacy_data()
+        # The data manager is created by the startup job (see _startup_job)
+        self.data_mgr = None
         
         # Initialize chart type
         self.chart_type = tk.StringVar(value="stacked_bar")
@@ -56,9 +49,53 @@ class ClipboardToolApp:
         # Track the current dataset for editing
         self.current_dataset = None
         self.current_df = None
+        self.data_editor = None
+        
+        # Embedded chart preview: one chart and figure kept alive and updated in
+        # place; the full-resolution file is only written by Export Chart
+        self.preview_chart = None
+        self.preview_canvas = None
+        self.preview_dataset = None
+        self.preview_key = None
+        self.preview_output_path = None
+        self._preview_after_id = None
+        
+        # Parsing, rendering and saving run in the background so the window
+        # stays responsive; results come back to the main thread via root.after
+        self.jobs = JobRunner(self.root)
         
         # Create widgets
         self.create_widgets()
+        
+        # Load the clients and import the data/chart modules in the background;
+        # the buttons that need them are enabled once that's done
+        self.start_job("Starting up", self._startup_job, error_title="Error loading clients",
+                       show_result=self.show_startup_result)
+        self.cancel_btn.config(state=tk.DISABLED)  # startup can't be cancelled
+    
+    def _startup_job(self, job):
+        """Worker thread: load the client index, migrate legacy data and pre-import modules."""
+        job.progress("Loading clients", 0.1, cancellable=False)
+        from data_loader import FinancialDataManager
+        
+        # Initialize the data manager (but don't create default client)
+        self.data_mgr = FinancialDataManager()
+        
+        # Migrate any legacy data
+        self.migrate_legacy_data()
+        
+        # Import what the first chart needs now rather than on the first click
+        job.progress("Loading chart modules", 0.5, cancellable=False)
+        import charts.stacked_bar
+        import charts.daily_cash_line
+        import data_editor
+        import matplotlib.backends.backend_tkagg
+        
+        return {'message': f"Ready ({len(self.data_mgr.clients)} clients)"}
+    
+    def show_startup_result(self, result):
+        print(f"Startup finished in {time.perf_counter() - _STARTED:.2f}s")
+        self.status_text.set(result['message'])
     
     def migrate_legacy_data(self):
         """Migrate data from legacy clipboard_client.json if it exists."""
@@ -82,6 +119,8 @@ class ClipboardToolApp:
                     
                     # Copy all datasets
                     self.data_mgr.clients[client_id]["datasets"] = legacy_data.get("datasets", {})
+                    for dataset_name in self.data_mgr.clients[client_id]["datasets"]:
+                        self.data_mgr.mark_dirty(client_id, dataset_name)
                     
                     # Save the new client data
                     self.data_mgr.save_data()
@@ -118,6 +157,12 @@ class ClipboardToolApp:
                         print(f"Cannot remove problematic legacy file: {remove_err}")
     
     def create_widgets(self):
+        # Chart preview on the right, the form on the left
+        self.preview_frame = tk.LabelFrame(self.root, text="Chart Preview", padx=5, pady=5)
+        self.preview_frame.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=10, pady=10)
+        self.preview_placeholder = tk.Label(self.preview_frame, text="Process some data to preview its chart here.")
+        self.preview_placeholder.pack(expand=True)
+        
         # Instructions label
         instructions = """Copy data from Excel/Google Sheets and paste below.
         
@@ -249,6 +294,31 @@ First column = months, second = income, rest = expense categories"""
                                  font=("Arial", 10, "bold"))
         self.save_btn.pack(side=tk.LEFT, padx=5)
         
+        # Add Export Chart button (saves the previewed chart at full resolution)
+        self.export_btn = tk.Button(button_frame, text="Export Chart",
+                                    command=self.export_chart,
+                                    state=tk.DISABLED)  # Enabled once there is a preview
+        self.export_btn.pack(side=tk.LEFT, padx=5)
+        
+        # Progress of the background job, with a button to cancel it
+        status_frame = tk.Frame(self.root)
+        status_frame.pack(fill=tk.X, padx=10, pady=(0, 10))
+        
+        self.status_text = tk.StringVar(value="Ready")
+        tk.Label(status_frame, textvariable=self.status_text, anchor=tk.W).pack(side=tk.LEFT, fill=tk.X, expand=True)
+        
+        self.cancel_btn = tk.Button(status_frame, text="Cancel", command=self.jobs.cancel,
+                                    state=tk.DISABLED)
+        self.cancel_btn.pack(side=tk.RIGHT, padx=5)
+        
+        self.progress_bar = ttk.Progressbar(status_frame, length=200, maximum=100)
+        self.progress_bar.pack(side=tk.RIGHT, padx=5)
+        
+        # Move the preview's threshold lines as the settings are edited
+        for var in (self.use_lower_threshold, self.lower_threshold_value, self.lower_threshold_name,
+                    self.use_upper_threshold, self.upper_threshold_value, self.upper_threshold_name):
+            var.trace_add('write', lambda *args: self.schedule_preview_update())
+        
         # Initial UI update
         self.update_ui()
     
@@ -290,18 +360,300 @@ CSV format with headers: Date, Account, Balance"""
         self.instructions_text.set(instructions)
     
     def process_data(self):
-        """Process the clipboard data and generate a chart."""
+        """Process the clipboard data and generate a chart (in the background)."""
         clipboard_text = self.text_area.get("1.0", tk.END)
         
         if len(clipboard_text.strip()) < 10:  # Arbitrary minimum length
             messagebox.showerror("Error", "Please paste some data first!")
             return
         
-        # Get client name and generate a safe client ID
+        self.start_job("Processing data", self._process_data_job, clipboard_text, self.get_job_params(),
+                       error_title="Error processing data")
+    
+    def _process_data_job(self, job, clipboard_text, params):
+        """Worker thread: parse the pasted data (the chart is drawn in the preview)."""
+        client_id = params['client_id']
+        client_name = params['client_name']
+        dataset_name = params['dataset_name'] or "clipboard_data"
+        
+        job.progress("Loading client", 0.05)
+        self._select_client(client_id, client_name)
+        previous = self._snapshot_dataset(client_id, dataset_name)
+        result = {}
+        
+        try:
+            job.progress("Parsing data", 0.1)
+            
+            # Process the data based on chart type
+            if params['chart_type'] == "stacked_bar":
+                # Process as stacked bar chart data
+                dataset = self.data_mgr.load_clipboard_data(clipboard_text, dataset_name)
+                
+                if not dataset:
+                    raise ValueError("Could not process the data. Check the format.")
+                
+                # Add client name to dataset
+                dataset['client_name'] = client_name
+            
+            else:  # daily_cash
+                # Sniff the layout once, then parse the clipboard text a single time
+                import pandas as pd
+                from data_loader import sniff_table
+                fmt = sniff_table(clipboard_text)
+                try:
+                    df = pd.read_csv(io.StringIO(clipboard_text), sep=fmt['delimiter'] or ',')
+                except Exception:
+                    raise ValueError("Could not parse the data as CSV. Please check the format.")
+                
+                # Process daily cash balance data
+                dataset = self.data_mgr.load_daily_cash_balance_data(df, dataset_name)
+                
+                # Add threshold lines if enabled
+                dataset.update(params['thresholds'])
+                
+                # Keep the DataFrame for editing
+                result['df'] = df
+            
+            job.progress("Finishing", 0.9)
+        except JobCancelled:
+            self._restore_dataset(client_id, dataset_name, previous)
+            raise
+        
+        result.update(self._chart_result(params, client_id, dataset_name, dataset))
+        return result
+    
+    def _chart_result(self, params, client_id, dataset_name, dataset):
+        """The part of a job result the preview and Export Chart need."""
+        # Save with client name in the filename
+        output_path = self._output_path(client_id, dataset_name)
+        return {'dataset': dataset,
+                'chart_type': params['chart_type'],
+                'chart_key': (client_id, dataset_name),
+                'output_path': output_path,
+                'message': f"Chart ready. Click Export Chart to save it to {output_path}"}
+    
+    def get_job_params(self):
+        """
+        Read the form into a plain dictionary for a background job.
+        
+        Tk widgets and variables may only be used on the main thread, so jobs
+        get their inputs from here instead of reading the widgets themselves.
+        """
         client_name = self.client_entry.get()
-        # Create a safe client ID from the name (lowercase, replace spaces with underscores)
-        client_id = client_name.lower().replace(' ', '_').replace('-', '_')
+        return {
+            'client_name': client_name,
+            # Create a safe client ID from the name (lowercase, replace spaces with underscores)
+            'client_id': client_name.lower().replace(' ', '_').replace('-', '_'),
+            'dataset_name': self.dataset_entry.get(),
+            'chart_type': self.chart_type.get(),
+            'thresholds': self.get_thresholds()
+        }
+    
+    def get_thresholds(self):
+        """Threshold line settings for the dataset (only the enabled, valid ones)."""
+        thresholds = {}
+        if self.use_lower_threshold.get():
+            try:
+                thresholds['lower_threshold'] = float(self.lower_threshold_value.get())
+                thresholds['lower_threshold_name'] = self.lower_threshold_name.get()
+            except ValueError:
+                print("Invalid lower threshold value, ignoring")
         
+        if self.use_upper_threshold.get():
+            try:
+                thresholds['upper_threshold'] = float(self.upper_threshold_value.get())
+                thresholds['upper_threshold_name'] = self.upper_threshold_name.get()
+            except ValueError:
+                print("Invalid upper threshold value, ignoring")
+        
+        return thresholds
+    
+    def start_job(self, name, func, *args, error_title="Error", show_result=None):
+        """
+        Run func(job, *args) in the background with progress shown in the status bar.
+        
+        When it finishes, its result is shown with show_result (default
+        show_job_result); errors are shown as "<error_title>: <message>".
+        """
+        if self.jobs.busy:
+            messagebox.showinfo("Busy", "Please wait for the current job to finish, or cancel it.")
+            return
+        
+        show_result = show_result or self.show_job_result
+        
+        def on_done(result):
+            self.set_busy(False, "Done")
+            show_result(result)
+        
+        def on_error(error):
+            self.set_busy(False, "Failed")
+            messagebox.showerror("Error", f"{error_title}: {error}")
+        
+        self.set_busy(True, f"{name}...")
+        self.jobs.start(name, func, *args, on_done=on_done, on_error=on_error,
+                        on_progress=self.show_progress,
+                        on_cancelled=lambda: self.set_busy(False, "Cancelled"))
+    
+    def set_busy(self, busy, status):
+        """Disable the buttons that start jobs while one is running and show the status."""
+        state = tk.DISABLED if busy else tk.NORMAL
+        for button in (self.process_btn, self.upload_btn, self.save_btn):
+            button.config(state=state)
+        if busy or self.current_df is None:
+            self.edit_data_btn.config(state=tk.DISABLED)
+        else:
+            self.edit_data_btn.config(state=tk.NORMAL)
+        if busy or self.preview_dataset is None:
+            self.export_btn.config(state=tk.DISABLED)
+        else:
+            self.export_btn.config(state=tk.NORMAL)
+        self.cancel_btn.config(state=tk.NORMAL if busy else tk.DISABLED)
+        self.status_text.set(status)
+        if not busy:
+            self.progress_bar['value'] = 0
+    
+    def show_progress(self, message, fraction):
+        """Progress callback of the running job (main thread)."""
+        self.status_text.set(f"{message}...")
+        if fraction is not None:
+            self.progress_bar['value'] = fraction * 100
+    
+    def show_job_result(self, result):
+        """Show the outcome of a finished job (main thread): messages, then the preview."""
+        # Show the loaded data for review
+        if 'preview_text' in result:
+            self.text_area.delete("1.0", tk.END)
+            self.text_area.insert("1.0", result['preview_text'])
+        
+        # Store the current dataset and DataFrame for editing
+        if 'df' in result:
+            self.current_dataset = result['dataset']
+            self.current_df = result['df']
+            self.edit_data_btn.config(state=tk.NORMAL)  # Enable the edit button
+        
+        if result.get('warning'):
+            messagebox.showwarning("Warning", result['warning'])
+        
+        # Close the editor window
+        if result.get('close_editor') and self.data_editor is not None:
+            self.data_editor.close()
+            self.data_editor = None
+        
+        self.show_preview(result)
+        self.status_text.set(result['message'])
+    
+    def show_preview(self, result):
+        """
+        Draw a job's dataset in the embedded preview (main thread).
+        
+        The preview chart and its figure stay alive between jobs: a new dataset
+        is plotted into the same figure at screen resolution, and corrected
+        balances of the dataset already shown only replace the edited lines
+        (update_series). Nothing is written to disk here; see export_chart.
+        """
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from charts.stacked_bar import StackedBarIncomeChart
+        from charts.daily_cash_line import DailyCashBalanceChart
+        
+        if result['chart_type'] == "daily_cash":
+            chart_class = DailyCashBalanceChart
+        else:
+            chart_class = StackedBarIncomeChart
+        
+        # Preview the current threshold settings without changing the stored data
+        dataset = dict(result['dataset'])
+        if chart_class is DailyCashBalanceChart:
+            self._apply_thresholds(dataset)
+        
+        chart = self.preview_chart
+        if (isinstance(chart, chart_class) and self.preview_key == result['chart_key']
+                and result.get('changed') is not None):
+            chart.update_series(dataset, result['changed'])
+            chart.set_thresholds(dataset)
+        else:
+            if not isinstance(chart, chart_class):
+                # First preview, or the chart type changed: new chart and canvas
+                if self.preview_canvas is not None:
+                    self.preview_canvas.get_tk_widget().destroy()
+                    chart.close()
+                else:
+                    self.preview_placeholder.destroy()
+                chart = chart_class(headless=True)
+                chart.create_figure()
+                self.preview_canvas = FigureCanvasTkAgg(chart.fig, master=self.preview_frame)
+                self.preview_canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+                self.preview_chart = chart
+                self.root.update_idletasks()  # let the canvas take its size
+            
+            # Plot at the size of the preview (not the 15x8in export size)
+            widget = self.preview_canvas.get_tk_widget()
+            if widget.winfo_width() > 1 and widget.winfo_height() > 1:
+                dpi = chart.fig.dpi
+                chart.figsize = (widget.winfo_width() / dpi, widget.winfo_height() / dpi)
+            chart.plot(dataset)
+            chart.fig.tight_layout()
+        
+        self.preview_canvas.draw_idle()
+        self.preview_dataset = dataset
+        self.preview_key = result['chart_key']
+        self.preview_output_path = result['output_path']
+        self.export_btn.config(state=tk.NORMAL)
+    
+    def _apply_thresholds(self, dataset):
+        """Replace a dataset's threshold lines with the current settings."""
+        for key in ('lower_threshold', 'lower_threshold_name', 'upper_threshold', 'upper_threshold_name'):
+            dataset.pop(key, None)
+        dataset.update(self.get_thresholds())
+    
+    def schedule_preview_update(self, delay_ms=300):
+        """
+        Update the preview's threshold lines once the settings stop changing.
+        
+        Called on every keystroke in the threshold fields; each call restarts
+        the timer, so typing a value redraws the preview once, not per digit.
+        """
+        if self._preview_after_id is not None:
+            self.root.after_cancel(self._preview_after_id)
+        self._preview_after_id = self.root.after(delay_ms, self.update_preview_thresholds)
+    
+    def update_preview_thresholds(self):
+        """Move the threshold lines of the previewed daily cash chart (main thread)."""
+        self._preview_after_id = None
+        # Only daily cash charts have threshold lines
+        if not hasattr(self.preview_chart, 'set_thresholds') or self.preview_dataset is None:
+            return
+        self._apply_thresholds(self.preview_dataset)
+        self.preview_chart.set_thresholds(self.preview_dataset)
+        self.preview_canvas.draw_idle()
+    
+    def export_chart(self):
+        """Save the previewed chart at full resolution (in the background)."""
+        if self.preview_dataset is None:
+            messagebox.showinfo("No Chart", "Process some data first.")
+            return
+        
+        self.start_job("Exporting chart", self._export_job, type(self.preview_chart),
+                       dict(self.preview_dataset), self.preview_output_path,
+                       error_title="Error exporting chart", show_result=self.show_export_result)
+    
+    def _export_job(self, job, chart_class, dataset, output_path):
+        """Worker thread: draw the chart at full size and save it (skipped if unchanged)."""
+        # Create output directory if it doesn't exist
+        if not os.path.exists("output"):
+            os.makedirs("output")
+            print("Created output directory")
+        
+        job.progress("Rendering chart", 0.3)
+        with chart_class(headless=True) as chart:
+            chart.render(dataset, output_path)
+        return {'message': f"Chart saved to {output_path}"}
+    
+    def show_export_result(self, result):
+        self.status_text.set(result['message'])
+        messagebox.showinfo("Success", result['message'])
+    
+    def _select_client(self, client_id, client_name):
+        """Create the client if needed, update its name and make it the current client."""
         # Check if this is a new client
         if client_id not in self.data_mgr.clients:
             print(f"Creating new client: {client_name} with ID: {client_id}")
@@ -310,107 +662,37 @@ CSV format with headers: Date, Account, Balance"""
             # Update existing client name if changed
             if client_name != self.data_mgr.clients[client_id].get("name"):
                 self.data_mgr.clients[client_id]["name"] = client_name
+                self.data_mgr.mark_dirty(client_id)
                 print(f"Updated client name for {client_id} to {client_name}")
         
         # Set as current client
         self.data_mgr.current_client = client_id
-        
-        # Process the data based on chart type
-        dataset_name = self.dataset_entry.get() or "clipboard_data"
-        
-        if self.chart_type.get() == "stacked_bar":
-            # Process as stacked bar chart data
-            dataset = self.data_mgr.load_clipboard_data(clipboard_text, dataset_name)
-            
-            if not dataset:
-                messagebox.showerror("Error", "Could not process the data. Check the format.")
-                return
-            
-            # Add client name to dataset
-            dataset['client_name'] = client_name
-            
-            # Create and save the chart
-            chart = StackedBarIncomeChart()
-            chart.plot(dataset)
-            
-            # Save with client name in the filename
-            safe_filename = dataset_name.replace(' ', '_').lower()
-            output_path = f"output/{client_id}_{safe_filename}.png"
-            chart.save_chart(output_path)
-            
-            # Show success message with file path
-            messagebox.showinfo("Success", f"Chart saved to {output_path}")
-            
-            # Display the chart
-            chart.show_chart()
-        
-        else:  # daily_cash
-            try:
-                # For daily cash data, process it as CSV
-                import io
-                import pandas as pd
-                
-                # Try to parse the clipboard text as CSV
-                try:
-                    # First try comma separator
-                    df = pd.read_csv(io.StringIO(clipboard_text))
-                except:
-                    # If that fails, try tab separator
-                    try:
-                        df = pd.read_csv(io.StringIO(clipboard_text), sep='\t')
-                    except:
-                        # If that also fails, show error
-                        messagebox.showerror("Error", "Could not parse the data as CSV. Please check the format.")
-                        return
-                
-                # Process daily cash balance data
-                dataset = self.data_mgr.load_daily_cash_balance_data(df, dataset_name)
-                
-                # Store the current dataset and DataFrame for editing
-                self.current_dataset = dataset
-                self.current_df = df
-                self.edit_data_btn.config(state=tk.NORMAL)  # Enable the edit button
-                
-                # Add threshold lines if enabled
-                if self.use_lower_threshold.get():
-                    try:
-                        value = float(self.lower_threshold_value.get())
-                        dataset['lower_threshold'] = value
-                        dataset['lower_threshold_name'] = self.lower_threshold_name.get()
-                    except ValueError:
-                        print("Invalid lower threshold value, ignoring")
-                
-                if self.use_upper_threshold.get():
-                    try:
-                        value = float(self.upper_threshold_value.get())
-                        dataset['upper_threshold'] = value
-                        dataset['upper_threshold_name'] = self.upper_threshold_name.get()
-                    except ValueError:
-                        print("Invalid upper threshold value, ignoring")
-                
-                # Import the chart if not already imported
-                from charts.daily_cash_line import DailyCashBalanceChart
-                
-                # Create and save the chart
-                chart = DailyCashBalanceChart(client_name=client_name)
-                chart.plot(dataset)
-                
-                # Save with client name in the filename
-                safe_filename = dataset_name.replace(' ', '_').lower()
-                output_path = f"output/{client_id}_{safe_filename}.png"
-                chart.save_chart(output_path)
-                
-                # Show success message with file path
-                messagebox.showinfo("Success", f"Daily cash balance chart saved to {output_path}")
-                
-                # Display the chart
-                chart.show_chart()
-                
-            except Exception as e:
-                import traceback
-                traceback.print_exc()
-                messagebox.showerror("Error", f"Error processing daily cash balance data: {str(e)}")
-                return
+    
+    def _snapshot_dataset(self, client_id, dataset_name):
+        """The dataset and its raw rows as they are before a job replaces them."""
+        client_data = self.data_mgr.clients[client_id]
+        return (client_data['datasets'].get(dataset_name),
+                client_data.get('raw_data', {}).get(dataset_name))
+    
+    def _restore_dataset(self, client_id, dataset_name, previous):
+        """
+        Put back the dataset (and raw rows) a cancelled job replaced, or remove
+        the ones it added, so the stored dataset always matches its raw rows.
+        """
+        client_data = self.data_mgr.clients[client_id]
+        dataset, raw_df = previous
+        for items, value in ((client_data['datasets'], dataset),
+                             (client_data.setdefault('raw_data', {}), raw_df)):
+            if value is not None:
+                items[dataset_name] = value
+            else:
+                items.pop(dataset_name, None)
+        print(f"Cancelled, kept the previous '{dataset_name}' data for {client_id}")
+    
+    def _output_path(self, client_id, dataset_name):
+        """Chart file name for a client's dataset."""
+        safe_filename = dataset_name.replace(' ', '_').lower()
+        return f"output/{client_id}_{safe_filename}.png"
     
     def clear_text(self):
         """Clear the text area."""
@@ -457,9 +739,19 @@ CSV format with headers: Date, Account, Balance"""
         
         if lines:
             debug_text.insert(tk.END, f"First line: {lines[0]}\n")
-            debug_text.insert(tk.END, f"Contains tabs: {'\\t' in lines[0]}\n")
+            has_tabs = '\t' in lines[0]
+            debug_text.insert(tk.END, f"Contains tabs: {has_tabs}\n")
             debug_text.insert(tk.END, f"Contains pipes: {'|' in lines[0]}\n")
-            debug_text.insert(tk.END, f"Split by spaces: {len(lines[0].split())}\n\n")
+            debug_text.insert(tk.END, f"Split by spaces: {len(lines[0].split())}\n")
+            
+            # Show what the loaders will detect
+            from data_loader import sniff_table
+            fmt = sniff_table(clipboard_text)
+            delimiter_names = {'\t': 'tab', ',': 'comma', ';': 'semicolon', None: 'none'}
+            debug_text.insert(tk.END, f"Detected delimiter: {delimiter_names[fmt['delimiter']]}\n")
+            debug_text.insert(tk.END, f"Orientation: {'months as columns' if fmt['orientation'] == 'columns' else 'months as rows'}\n")
+            debug_text.insert(tk.END, f"Type row: {fmt['has_type_row']}\n")
+            debug_text.insert(tk.END, f"Shape: {fmt['shape']}\n\n")
             
             # Try to identify column headers
             headers = re.split(r'\t+|\s{2,}', lines[0].strip())
@@ -507,37 +799,31 @@ CSV format with headers: Date, Account, Balance"""
         debug_window.update_idletasks()
 
     def process_with_fixed_format(self, text):
-        """Process data with explicitly fixed format for this specific data"""
+        """Process data with explicitly fixed format for this specific data (in the background)"""
+        if not text.strip():
+            messagebox.showerror("Error", "No data found")
+            return
+        
+        self.start_job("Processing data", self._fixed_format_job, text, self.get_job_params(),
+                       error_title="Error processing data")
+    
+    def _fixed_format_job(self, job, text, params):
+        """Worker thread: parse data in the fixed format and save the client."""
+        import numpy as np
+        import pandas as pd
+        from money import parse_money
+        
+        lines = text.strip().split('\n')
+        client_id = params['client_id']
+        client_name = params['client_name']
+        dataset_name = params['dataset_name'] or "clipboard_data"
+        
+        job.progress("Loading client", 0.05)
+        self._select_client(client_id, client_name)
+        previous = self._snapshot_dataset(client_id, dataset_name)
+        
         try:
-            lines = text.strip().split('\n')
-            if not lines:
-                messagebox.showerror("Error", "No data found")
-                return
-            
-            # Get client name and generate a safe client ID
-            client_name = self.client_entry.get()
-            # Create a safe client ID from the name (lowercase, replace spaces with underscores)
-            client_id = client_name.lower().replace(' ', '_').replace('-', '_')
-            
-            # Check if this is a new client
-            if client_id not in self.data_mgr.clients:
-                print(f"Creating new client: {client_name} with ID: {client_id}")
-                self.data_mgr.add_client(client_id, client_name)
-            else:
-                # Update existing client name if changed
-                if client_name != self.data_mgr.clients[client_id].get("name"):
-                    self.data_mgr.clients[client_id]["name"] = client_name
-                    print(f"Updated client name for {client_id} to {client_name}")
-            
-            # Set as current client
-            self.data_mgr.current_client = client_id
-            
-            # Force save client data to ensure it exists even before processing
-            try:
-                self.data_mgr.save_data()
-                print(f"Saved initial client data for {client_id}")
-            except Exception as e:
-                print(f"Error saving initial client data: {e}")
+            job.progress("Parsing data", 0.1)
             
             # Debugging: Print the raw lines
             print("Raw lines:", lines)
@@ -608,11 +894,9 @@ CSV format with headers: Date, Account, Balance"""
             
             print(f"Expense categories: {list(expense_data.keys())}")
             
-            # Process data rows
+            # Split the data rows; rows with fewer than 3 cells are skipped
             months = []
-            income_values = []
-            net_income_values = []
-            
+            rows = []
             for line in lines[data_start_line:]:
                 if not line.strip():
                     continue
@@ -625,53 +909,39 @@ CSV format with headers: Date, Account, Balance"""
                     continue
                 
                 months.append(values[0])
-                
-                try:
-                    income_str = values[income_idx].replace(',', '')
-                    income = float(income_str)
-                    income_values.append(income)
-                except (ValueError, IndexError) as e:
-                    print(f"Income value error in line: {line}, error: {e}")
-                    income_values.append(0.0)
-                
-                for idx, header in expense_columns:
-                    try:
-                        if idx < len(values) and values[idx].strip():
-                            # Ensure we're converting a string to float
-                            expense_str = str(values[idx]).replace(',', '')
-                            value = float(expense_str)
-                            expense_data[header].append(value)
-                        else:
-                            expense_data[header].append(0.0)
-                    except (ValueError, IndexError) as e:
-                        print(f"Error parsing expense {header} in line: {line}, error: {e}")
-                        expense_data[header].append(0.0)
-                
-                if net_income_idx is not None and net_income_idx < len(values):
-                    try:
-                        value = str(values[net_income_idx]).strip()
-                        if value and value.lower() != 'nan':
-                            net_income = float(value.replace(',', ''))
-                            net_income_values.append(net_income)
-                            print(f"Parsed net income: {net_income}")
-                        else:
-                            total_expenses = sum(expense_data[cat][-1] for cat in expense_data)
-                            net_income = income_values[-1] - total_expenses
-                            net_income_values.append(net_income)
-                    except (ValueError, IndexError) as e:
-                        print(f"Error parsing net income in line: {line} - {e}")
-                        total_expenses = sum(expense_data[cat][-1] for cat in expense_data)
-                        net_income = income_values[-1] - total_expenses
-                        net_income_values.append(net_income)
+                rows.append(values)
             
-            # Check if net income values are empty, calculate them if needed
-            if not net_income_values:
+            # Pad the rows into one table and parse every amount in a single pass
+            width = max([len(values) for values in rows] + [len(headers)])
+            table = np.full((len(rows), width), '', dtype=object)
+            for i, values in enumerate(rows):
+                table[i, :len(values)] = values
+            amounts, invalid = parse_money(table)
+            invalid[:, 0] = False  # first column holds the months, not amounts
+            for row, col in np.argwhere(invalid):
+                print(f"Could not parse '{table[row, col]}' in row {months[row]}, column {col}; using 0")
+            amounts[invalid] = 0.0
+            
+            # Income (missing column -> 0.0)
+            if income_idx is not None and income_idx < width:
+                income = amounts[:, income_idx]
+            else:
+                income = np.zeros(len(rows))
+            income_values = income.tolist()
+            
+            for idx, header in expense_columns:
+                expense_data[header] = amounts[:, idx].tolist()
+            
+            # Net income: use the pasted value where there is one, otherwise income - expenses
+            expense_idx = [idx for idx, header in expense_columns]
+            calculated = income - amounts[:, expense_idx].sum(axis=1)
+            if net_income_idx is not None and net_income_idx < width:
+                net_cells = pd.Series(table[:, net_income_idx]).astype(str).str.strip().str.lower()
+                provided = ~net_cells.isin(['', 'nan']).to_numpy() & ~invalid[:, net_income_idx]
+                net_income_values = np.where(provided, amounts[:, net_income_idx], calculated).tolist()
+            else:
                 print("Net income values missing, calculating automatically")
-                for i in range(len(months)):
-                    total_expenses = sum(expense_data[cat][i] for cat in expense_data)
-                    net_income = income_values[i] - total_expenses
-                    net_income_values.append(net_income)
-                    print(f"Calculated net income for {months[i]}: {net_income}")
+                net_income_values = calculated.tolist()
             
             # Create color palette
             color_palette = [
@@ -683,8 +953,6 @@ CSV format with headers: Date, Account, Balance"""
             for i, category in enumerate(expense_data.keys()):
                 expense_colors[category] = color_palette[i % len(color_palette)]
             
-            dataset_name = self.dataset_entry.get() or "clipboard_data"
-            
             print(f"\nFinal data prepared for charting:")
             print(f"Client: {client_name} (ID: {client_id})")
             print(f"Months: {months}")
@@ -704,39 +972,28 @@ CSV format with headers: Date, Account, Balance"""
             
             # Explicitly assign the dataset to the client's datasets dictionary
             self.data_mgr.clients[client_id]["datasets"][dataset_name] = dataset
+            self.data_mgr.mark_dirty(client_id, dataset_name)
             
             # Verify the dataset was added and print contents for debugging
             print(f"Dataset '{dataset_name}' added to client '{client_id}' with {len(dataset['months'])} months of data")
             print(f"Client now has {len(self.data_mgr.clients[client_id]['datasets'])} datasets")
             
-            # Create output directory if it doesn't exist
-            if not os.path.exists("output"):
-                os.makedirs("output")
-                print("Created output directory")
-            
-            chart = StackedBarIncomeChart(client_name=client_name)
-            chart.plot(dataset)
-            chart.save_chart(f"output/{client_id}_{dataset_name}.png")
-            chart.show_chart()
-            
-            # Save data to file for persistence
-            try:
-                print(f"Saving data to disk for client {client_id} with datasets: {list(self.data_mgr.clients[client_id]['datasets'].keys())}")
-                self.data_mgr.save_data()
-                print("Data saved successfully")
-            except Exception as save_error:
-                print(f"Error saving data: {save_error}")
-                messagebox.showwarning("Warning", 
-                                     f"Chart was generated but data could not be saved: {save_error}")
-            
-            messagebox.showinfo("Success", 
-                               f"Chart generated successfully and saved to 'output/{client_id}_{dataset_name}.png'")
-        except Exception as e:
-            print(f"Error processing data: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            messagebox.showerror("Error", f"Error processing data: {str(e)}\n\nPlease check the data format.")
-            return False
+            job.progress("Saving data", 0.9)
+        except JobCancelled:
+            self._restore_dataset(client_id, dataset_name, previous)
+            raise
+        
+        # Save data to file for persistence (this also creates a new client's file)
+        result = self._chart_result(dict(params, chart_type="stacked_bar"), client_id, dataset_name, dataset)
+        try:
+            print(f"Saving data to disk for client {client_id} with datasets: {list(self.data_mgr.clients[client_id]['datasets'].keys())}")
+            self.data_mgr.save_data()
+            print("Data saved successfully")
+        except Exception as save_error:
+            print(f"Error saving data: {save_error}")
+            result['warning'] = f"Chart is ready but data could not be saved: {save_error}"
+        
+        return result
 
     def _is_likely_month(self, text):
         """Check if text is likely a month."""
@@ -745,7 +1002,7 @@ CSV format with headers: Date, Account, Balance"""
         return any(pattern in text for pattern in month_patterns)
 
     def upload_csv(self):
-        """Upload and process a CSV file."""
+        """Upload and process a CSV file (in the background)."""
         # Ask user to select a CSV file
         file_path = filedialog.askopenfilename(
             title="Select CSV file",
@@ -755,115 +1012,63 @@ CSV format with headers: Date, Account, Balance"""
         if not file_path:
             return  # User cancelled
         
+        self.start_job("Loading CSV", self._upload_csv_job, file_path, self.get_job_params(),
+                       error_title="Error processing CSV file")
+    
+    def _upload_csv_job(self, job, file_path, params):
+        """Worker thread: load a CSV file (the chart is drawn in the preview)."""
+        client_id = params['client_id']
+        client_name = params['client_name']
+        
+        # Get dataset name
+        dataset_name = params['dataset_name'] or os.path.basename(file_path).replace(".csv", "")
+        
+        job.progress("Loading client", 0.05)
+        self._select_client(client_id, client_name)
+        previous = self._snapshot_dataset(client_id, dataset_name)
+        result = {}
+        
         try:
-            # Get client name and generate a safe client ID
-            client_name = self.client_entry.get()
-            # Create a safe client ID from the name (lowercase, replace spaces with underscores)
-            client_id = client_name.lower().replace(' ', '_').replace('-', '_')
-            
-            # Check if this is a new client
-            if client_id not in self.data_mgr.clients:
-                print(f"Creating new client: {client_name} with ID: {client_id}")
-                self.data_mgr.add_client(client_id, client_name)
-            else:
-                # Update existing client name if changed
-                if client_name != self.data_mgr.clients[client_id].get("name"):
-                    self.data_mgr.clients[client_id]["name"] = client_name
-                    print(f"Updated client name for {client_id} to {client_name}")
-            
-            # Set as current client
-            self.data_mgr.current_client = client_id
-            
-            # Get dataset name
-            dataset_name = self.dataset_entry.get() or os.path.basename(file_path).replace(".csv", "")
+            job.progress("Reading file", 0.1)
             
             # Process based on chart type
-            if self.chart_type.get() == "stacked_bar":
+            if params['chart_type'] == "stacked_bar":
                 # Load as stacked bar chart data
                 dataset = self.data_mgr.load_csv_data(file_path, dataset_name)
                 
                 if not dataset:
-                    messagebox.showerror("Error", "Could not process the CSV file. Check the format.")
-                    return
+                    raise ValueError("Could not process the CSV file. Check the format.")
                 
                 # Add client name to dataset
                 dataset['client_name'] = client_name
                 
-                # Create and save the chart
-                chart = StackedBarIncomeChart()
-                chart.plot(dataset)
-                
-                # Save with client name in the filename
-                safe_filename = dataset_name.replace(' ', '_').lower()
-                output_path = f"output/{client_id}_{safe_filename}.png"
-                chart.save_chart(output_path)
-                
-                # Show success message with file path
-                messagebox.showinfo("Success", f"Chart saved to {output_path}")
-                
-                # Display the chart
-                chart.show_chart()
-                
             else:  # daily_cash
-                # Import pandas to read the CSV
-                import pandas as pd
-                
-                # Read the CSV file
-                df = pd.read_csv(file_path)
+                # Read the CSV file once, with the sniffed delimiter; the same
+                # DataFrame feeds the preview, the dataset and the data editor
+                from data_loader import read_sniffed_csv
+                df = read_sniffed_csv(file_path)
                 
                 # Load into the text area for review
-                header = ",".join(df.columns)
-                sample_rows = "\n".join([",".join(map(str, row)) for row in df.values[:10]])
-                self.text_area.delete("1.0", tk.END)
-                self.text_area.insert("1.0", f"{header}\n{sample_rows}\n...\n({len(df)} rows total)")
+                sample_rows = df.head(10).to_csv(index=False)
+                result['preview_text'] = f"{sample_rows}...\n({len(df)} rows total)"
                 
                 # Process daily cash balance data
-                dataset = self.data_mgr.load_daily_cash_balance_data(file_path, dataset_name)
-                
-                # Store the current dataset and DataFrame for editing
-                self.current_dataset = dataset
-                self.current_df = df
-                self.edit_data_btn.config(state=tk.NORMAL)  # Enable the edit button
+                job.progress("Processing balances", 0.3)
+                dataset = self.data_mgr.load_daily_cash_balance_data(df, dataset_name)
                 
                 # Add threshold lines if enabled
-                if self.use_lower_threshold.get():
-                    try:
-                        value = float(self.lower_threshold_value.get())
-                        dataset['lower_threshold'] = value
-                        dataset['lower_threshold_name'] = self.lower_threshold_name.get()
-                    except ValueError:
-                        print("Invalid lower threshold value, ignoring")
-                
-                if self.use_upper_threshold.get():
-                    try:
-                        value = float(self.upper_threshold_value.get())
-                        dataset['upper_threshold'] = value
-                        dataset['upper_threshold_name'] = self.upper_threshold_name.get()
-                    except ValueError:
-                        print("Invalid upper threshold value, ignoring")
-                
-                # Import the chart if not already imported
-                from charts.daily_cash_line import DailyCashBalanceChart
-                
-                # Create and save the chart
-                chart = DailyCashBalanceChart(client_name=client_name)
-                chart.plot(dataset)
-                
-                # Save with client name in the filename
-                safe_filename = dataset_name.replace(' ', '_').lower()
-                output_path = f"output/{client_id}_{safe_filename}.png"
-                chart.save_chart(output_path)
-                
-                # Show success message with file path
-                messagebox.showinfo("Success", f"Daily cash balance chart saved to {output_path}")
+                dataset.update(params['thresholds'])
                 
-                # Display the chart
-                chart.show_chart()
+                # Keep the DataFrame for editing
+                result['df'] = df
             
-        except Exception as e:
-            import traceback
-            traceback.print_exc()
-            messagebox.showerror("Error", f"Error processing CSV file: {str(e)}")
+            job.progress("Finishing", 0.9)
+        except JobCancelled:
+            self._restore_dataset(client_id, dataset_name, previous)
+            raise
+        
+        result.update(self._chart_result(params, client_id, dataset_name, dataset))
+        return result
 
     def save_current_data(self):
         """Manually save the current data."""
@@ -925,123 +1130,76 @@ CSV format with headers: Date, Account, Balance"""
             messagebox.showinfo("No Data", "Please process data first before editing.")
             return
         
-        # Create a new window for data editing
-        editor_window = tk.Toplevel(self.root)
-        editor_window.title("Data Editor")
-        editor_window.geometry("800x600")
-        
-        # Create a frame for the table
-        table_frame = tk.Frame(editor_window)
-        table_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-        
-        # Create scrollbars
-        y_scrollbar = tk.Scrollbar(table_frame)
-        y_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        
-        x_scrollbar = tk.Scrollbar(table_frame, orient=tk.HORIZONTAL)
-        x_scrollbar.pack(side=tk.BOTTOM, fill=tk.X)
-        
-        # Create a Text widget for displaying and editing data
-        self.edit_text = tk.Text(table_frame, wrap=tk.NONE, 
-                                yscrollcommand=y_scrollbar.set,
-                                xscrollcommand=x_scrollbar.set)
-        self.edit_text.pack(fill=tk.BOTH, expand=True)
-        
-        y_scrollbar.config(command=self.edit_text.yview)
-        x_scrollbar.config(command=self.edit_text.xview)
-        
-        # Format the DataFrame as CSV and insert into the Text widget
-        csv_data = self.current_df.to_csv(index=False)
-        self.edit_text.insert(tk.END, csv_data)
-        
-        # Add control buttons at the bottom
-        buttons_frame = tk.Frame(editor_window)
-        buttons_frame.pack(fill=tk.X, padx=10, pady=10)
-        
-        # Validate and save button
-        save_button = tk.Button(buttons_frame, text="Apply Changes", 
-                               command=lambda: self.apply_data_changes(self.edit_text.get("1.0", tk.END)))
-        save_button.pack(side=tk.LEFT, padx=5)
-        
-        # Cancel button
-        cancel_button = tk.Button(buttons_frame, text="Cancel", command=editor_window.destroy)
-        cancel_button.pack(side=tk.LEFT, padx=5)
+        # Only one editor at a time; bring an open one to the front
+        if self.data_editor is not None and self.data_editor.window.winfo_exists():
+            self.data_editor.window.lift()
+            return
         
-        # Add helper text
-        help_text = tk.Label(editor_window, text="Edit the CSV data directly. Make sure to keep the header row intact.", 
-                            justify=tk.LEFT, padx=10, pady=5)
-        help_text.pack(side=tk.BOTTOM, fill=tk.X)
+        # The grid only draws the visible rows, so this opens instantly for large files
+        from data_editor import DataEditor
+        self.data_editor = DataEditor(self.root, self.current_df, self.apply_data_changes)
     
-    def apply_data_changes(self, text_data):
-        """Apply changes made in the data editor."""
-        try:
-            import io
-            import pandas as pd
-            
-            # Parse the modified CSV text
-            new_df = pd.read_csv(io.StringIO(text_data))
-            
-            # Store the updated DataFrame
-            self.current_df = new_df
-            
-            # Re-process the data
-            client_id = self.data_mgr.current_client
-            dataset_name = self.dataset_entry.get() or "clipboard_data"
+    def apply_data_changes(self, changes):
+        """Apply the edits made in the data editor (in the background)."""
+        self.start_job("Applying changes", self._apply_changes_job, changes, self.get_job_params(),
+                       error_title="Error applying changes")
+    
+    def _apply_changes_job(self, job, changes, params):
+        """
+        Worker thread: apply the edited cells to the stored dataset.
+        
+        Balance corrections are applied as a delta: only the edited accounts are
+        recomputed (update_daily_cash_balances) and the preview only redraws
+        their lines (update_series). Anything else falls back to re-processing
+        all the data.
+        """
+        job.progress("Applying edits", 0.1)
+        
+        # Write just the edited cells into a copy of the data (no CSV round-trip)
+        new_df = changes.apply()
+        rows = changes.changed_rows()
+        
+        client_id = self.data_mgr.current_client
+        dataset_name = params['dataset_name'] or "clipboard_data"
+        params = dict(params, chart_type="daily_cash")
+        
+        # Delta update of the stored dataset (can't be cancelled once it has started)
+        job.progress("Updating balances", 0.2)
+        update = self.data_mgr.update_daily_cash_balances(dataset_name, changes.df.iloc[rows],
+                                                          new_df.iloc[rows])
+        if update is not None:
+            dataset, changed = update
+            dataset.update(params['thresholds'])
             
+            result = self._chart_result(params, client_id, dataset_name, dataset)
+            result.update({'changed': changed, 'df': new_df, 'close_editor': True})
+            result['message'] = "Data updated. " + result['message']
+            return result
+        
+        # The edits couldn't be matched to the stored data: re-process everything
+        previous = self._snapshot_dataset(client_id, dataset_name)
+        try:
             # Process the updated data
+            job.progress("Processing balances", 0.3)
             dataset = self.data_mgr.load_daily_cash_balance_data(new_df, dataset_name)
             
             # Add threshold lines if enabled
-            if self.use_lower_threshold.get():
-                try:
-                    value = float(self.lower_threshold_value.get())
-                    dataset['lower_threshold'] = value
-                    dataset['lower_threshold_name'] = self.lower_threshold_name.get()
-                except ValueError:
-                    print("Invalid lower threshold value, ignoring")
-            
-            if self.use_upper_threshold.get():
-                try:
-                    value = float(self.upper_threshold_value.get())
-                    dataset['upper_threshold'] = value
-                    dataset['upper_threshold_name'] = self.upper_threshold_name.get()
-                except ValueError:
-                    print("Invalid upper threshold value, ignoring")
-            
-            # Update the current dataset
-            self.current_dataset = dataset
-            
-            # Create and save the chart
-            client_name = self.client_entry.get()
-            chart = DailyCashBalanceChart(client_name=client_name)
-            chart.plot(dataset)
-            
-            # Save with client name in the filename
-            safe_filename = dataset_name.replace(' ', '_').lower()
-            output_path = f"output/{client_id}_{safe_filename}.png"
-            chart.save_chart(output_path)
-            
-            # Show success message with file path
-            messagebox.showinfo("Success", "Data updated and chart regenerated.\n" +
-                               f"Chart saved to {output_path}")
-            
-            # Display the chart
-            chart.show_chart()
-            
-            # Close the editor window
-            for widget in self.root.winfo_children():
-                if isinstance(widget, tk.Toplevel) and widget.title() == "Data Editor":
-                    widget.destroy()
-                    break
-                    
-        except Exception as e:
-            import traceback
-            traceback.print_exc()
-            messagebox.showerror("Error", f"Error applying changes: {str(e)}")
+            dataset.update(params['thresholds'])
+            job.progress("Finishing", 0.9)
+        except JobCancelled:
+            self._restore_dataset(client_id, dataset_name, previous)
+            raise
+        
+        result = self._chart_result(params, client_id, dataset_name, dataset)
+        result.update({'df': new_df, 'close_editor': True})
+        result['message'] = "Data updated. " + result['message']
+        return result
 
 def main():
     root = tk.Tk()
     app = ClipboardToolApp(root)
+    # Startup target: the window is up within 0.3s (everything else loads behind it)
+    root.after_idle(lambda: print(f"Window shown in {time.perf_counter() - _STARTED:.2f}s"))
     root.mainloop()
 
 if __name__ == "__main__":
@@ -0,0 +1,313 @@
+# data_editor.py
+# Spreadsheet-style editor for large DataFrames (only the visible rows are drawn)
+
+import tkinter as tk
+from tkinter import ttk, messagebox
+import numpy as np
+import pandas as pd
+from money import parse_money
+
+class ChangeSet:
+    """
+    Sparse set of cell edits to a DataFrame.
+    
+    Edits are kept as {(row position, column name): value} and only applied
+    to the DataFrame when apply() is called, so editing a few cells of a huge
+    table never copies or re-parses the whole thing.
+    """
+    
+    def __init__(self, df):
+        self.df = df
+        self.edits = {}
+    
+    def __len__(self):
+        return len(self.edits)
+    
+    def __contains__(self, cell):
+        return cell in self.edits
+    
+    def parse_value(self, column, text):
+        """
+        Convert the text typed into a cell to the column's type.
+        
+        Raises:
+        - ValueError if the text doesn't fit the column (e.g. a bad amount)
+        """
+        dtype = self.df[column].dtype
+        text = text.strip()
+        if pd.api.types.is_datetime64_any_dtype(dtype):
+            try:
+                return pd.Timestamp(text)
+            except ValueError:
+                raise ValueError(f"'{text}' is not a date")
+        if pd.api.types.is_numeric_dtype(dtype):
+            amounts, invalid = parse_money([text], empty_value=np.nan)
+            if invalid[0]:
+                raise ValueError(f"'{text}' is not an amount")
+            return float(amounts[0])
+        return text
+    
+    def set(self, row, column, text):
+        """
+        Record an edit of one cell (row is a position, not an index label).
+        
+        Setting a cell back to its original value drops the edit.
+        
+        Returns:
+        - The parsed value
+        """
+        value = self.parse_value(column, text)
+        original = self.df[column].iat[row]
+        if value == original or (pd.isna(value) and pd.isna(original)):
+            self.edits.pop((row, column), None)
+        else:
+            self.edits[(row, column)] = value
+        return value
+    
+    def value(self, row, column):
+        """Current value of a cell, edited or not."""
+        if (row, column) in self.edits:
+            return self.edits[(row, column)]
+        return self.df[column].iat[row]
+    
+    def changed_rows(self):
+        """Sorted positions of the rows that have at least one edit."""
+        return np.unique(np.fromiter((row for row, _ in self.edits), dtype=np.int64,
+                                     count=len(self.edits)))
+    
+    def apply(self, df=None):
+        """
+        Return a copy of the DataFrame with the edits applied.
+        
+        Each edited column is updated with a single positional assignment.
+        """
+        result = (self.df if df is None else df).copy()
+        by_column = {}
+        for (row, column), value in self.edits.items():
+            by_column.setdefault(column, ([], []))
+            by_column[column][0].append(row)
+            by_column[column][1].append(value)
+        
+        for column, (rows, values) in by_column.items():
+            col_idx = result.columns.get_loc(column)
+            if pd.api.types.is_integer_dtype(result[column].dtype):
+                values = np.asarray(values, dtype=np.float64)
+                if np.isnan(values).any() or (values != np.round(values)).any():
+                    # The edits don't fit an integer column any more
+                    result[column] = result[column].astype(np.float64)
+                else:
+                    values = values.astype(result[column].dtype)
+            result.iloc[rows, col_idx] = values
+        return result
+
+class DataEditor:
+    """
+    Editor window for a DataFrame, usable with hundreds of thousands of rows.
+    
+    The grid is a ttk.Treeview holding just one screenful of rows; scrolling
+    swaps in the rows for the new position from the DataFrame. Double-click
+    a cell to edit it. Edits are collected in a ChangeSet and handed to
+    on_apply when "Apply Changes" is pressed.
+    """
+    
+    def __init__(self, parent, df, on_apply, title="Data Editor", visible_rows=30):
+        """
+        Open the editor.
+        
+        Parameters:
+        - parent: Parent Tk widget
+        - df: DataFrame to edit (not modified)
+        - on_apply: Called with the ChangeSet when the user applies the changes
+        - visible_rows: Number of rows drawn at a time
+        """
+        self.df = df
+        self.on_apply = on_apply
+        self.changes = ChangeSet(df)
+        self.visible_rows = visible_rows
+        self.first_row = 0
+        self.columns = list(df.columns)
+        self._cell_editor = None
+        
+        # Create a new window for data editing
+        self.window = tk.Toplevel(parent)
+        self.window.title(title)
+        self.window.geometry("800x600")
+        
+        # Create a frame for the table
+        table_frame = tk.Frame(self.window)
+        table_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        # The scrollbar moves through the DataFrame, not through the Treeview
+        self.y_scrollbar = tk.Scrollbar(table_frame, command=self.on_scroll)
+        self.y_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        self.tree = ttk.Treeview(table_frame, columns=['#row'] + self.columns, show='headings',
+                                 height=visible_rows, selectmode='browse')
+        self.tree.heading('#row', text='Row')
+        self.tree.column('#row', width=70, anchor=tk.E, stretch=False)
+        for column in self.columns:
+            self.tree.heading(column, text=str(column))
+            self.tree.column(column, width=150, anchor=tk.W)
+        self.tree.tag_configure('edited', background='#fff3c4')
+        self.tree.pack(fill=tk.BOTH, expand=True)
+        
+        # Scroll with the mouse wheel and keyboard too
+        self.tree.bind('<MouseWheel>', lambda e: self.scroll_rows(-3 if e.delta > 0 else 3))
+        self.tree.bind('<Button-4>', lambda e: self.scroll_rows(-3))
+        self.tree.bind('<Button-5>', lambda e: self.scroll_rows(3))
+        self.tree.bind('<Prior>', lambda e: self.scroll_rows(-self.visible_rows))
+        self.tree.bind('<Next>', lambda e: self.scroll_rows(self.visible_rows))
+        self.tree.bind('<Double-1>', self.begin_edit)
+        
+        # Add control buttons at the bottom
+        buttons_frame = tk.Frame(self.window)
+        buttons_frame.pack(fill=tk.X, padx=10, pady=10)
+        
+        tk.Button(buttons_frame, text="Apply Changes", command=self.apply).pack(side=tk.LEFT, padx=5)
+        tk.Button(buttons_frame, text="Discard Edits", command=self.discard).pack(side=tk.LEFT, padx=5)
+        tk.Button(buttons_frame, text="Cancel", command=self.close).pack(side=tk.LEFT, padx=5)
+        
+        self.status_text = tk.StringVar()
+        tk.Label(buttons_frame, textvariable=self.status_text).pack(side=tk.RIGHT, padx=5)
+        
+        # Add helper text
+        help_text = tk.Label(self.window, text="Double-click a cell to edit it. Enter keeps the edit, Escape cancels it.",
+                             justify=tk.LEFT, padx=10, pady=5)
+        help_text.pack(side=tk.BOTTOM, fill=tk.X)
+        
+        self.show_rows(0)
+    
+    def format_value(self, value):
+        """Text shown for a cell value."""
+        if isinstance(value, pd.Timestamp):
+            return value.strftime('%Y-%m-%d') if value == value.normalize() else str(value)
+        if pd.isna(value):
+            return ''
+        return str(value)
+    
+    def show_rows(self, first_row):
+        """
+        Draw the rows starting at first_row (only those fit in the grid).
+        
+        A cell being edited is recorded first; if its value is invalid the
+        grid stays where it is so the edit can be fixed.
+        """
+        if not self.commit_edit():
+            return
+        last_start = max(len(self.df) - self.visible_rows, 0)
+        self.first_row = int(min(max(first_row, 0), last_start))
+        stop = min(self.first_row + self.visible_rows, len(self.df))
+        
+        self.tree.delete(*self.tree.get_children())
+        for row in range(self.first_row, stop):
+            values = [row + 1] + [self.format_value(self.changes.value(row, column))
+                                  for column in self.columns]
+            edited = any((row, column) in self.changes for column in self.columns)
+            self.tree.insert('', tk.END, iid=str(row), values=values,
+                             tags=('edited',) if edited else ())
+        
+        # Position the scrollbar over the whole DataFrame
+        if len(self.df):
+            self.y_scrollbar.set(self.first_row / len(self.df), stop / len(self.df))
+        else:
+            self.y_scrollbar.set(0, 1)
+        self.update_status()
+    
+    def update_status(self):
+        stop = min(self.first_row + self.visible_rows, len(self.df))
+        self.status_text.set(f"Rows {self.first_row + 1:,}-{stop:,} of {len(self.df):,}"
+                             f" | {len(self.changes)} edited cell(s)")
+    
+    def scroll_rows(self, delta):
+        self.show_rows(self.first_row + delta)
+        return 'break'
+    
+    def on_scroll(self, action, amount, unit=None):
+        """Scrollbar command: ('moveto', fraction) or ('scroll', n, 'units'/'pages')."""
+        if action == 'moveto':
+            self.show_rows(round(float(amount) * len(self.df)))
+        elif unit == 'pages':
+            self.scroll_rows(int(amount) * self.visible_rows)
+        else:
+            self.scroll_rows(int(amount))
+    
+    def begin_edit(self, event):
+        """Put an entry box over the double-clicked cell."""
+        row_id = self.tree.identify_row(event.y)
+        column_id = self.tree.identify_column(event.x)
+        if not row_id or column_id in ('', '#0', '#1'):  # '#1' is the row number
+            return
+        
+        if not self.commit_edit():
+            return
+        row = int(row_id)
+        column = self.columns[int(column_id[1:]) - 2]
+        x, y, width, height = self.tree.bbox(row_id, column_id)
+        
+        entry = tk.Entry(self.tree)
+        entry.row, entry.column = row, column
+        entry.original_text = self.format_value(self.changes.value(row, column))
+        entry.insert(0, entry.original_text)
+        entry.select_range(0, tk.END)
+        entry.place(x=x, y=y, width=width, height=height)
+        entry.focus_set()
+        entry.bind('<Return>', lambda e: self.finish_edit())
+        entry.bind('<Escape>', lambda e: self.cancel_edit())
+        entry.bind('<FocusOut>', lambda e: self.finish_edit())
+        self._cell_editor = entry
+    
+    def commit_edit(self):
+        """
+        Record the cell being edited (if any) in the change set.
+        
+        Returns:
+        - True if there was nothing to record or the value was recorded; False
+          if the value is invalid (the error is shown and the entry stays open)
+        """
+        entry = self._cell_editor
+        if entry is None:
+            return True
+        if entry.get() == entry.original_text:
+            # Left without typing anything
+            self.cancel_edit()
+            return True
+        try:
+            self.changes.set(entry.row, entry.column, entry.get())
+        except ValueError as e:
+            self._cell_editor = None  # don't finish twice via FocusOut
+            messagebox.showerror("Invalid value", str(e), parent=self.window)
+            self._cell_editor = entry
+            entry.focus_set()
+            return False
+        self.cancel_edit()
+        return True
+    
+    def finish_edit(self):
+        """Record the edited cell and redraw its row."""
+        if self._cell_editor is not None and self.commit_edit():
+            self.show_rows(self.first_row)
+    
+    def cancel_edit(self):
+        if self._cell_editor is not None:
+            self._cell_editor.destroy()
+            self._cell_editor = None
+    
+    def discard(self):
+        """Forget all edits, including the one being typed."""
+        self.cancel_edit()
+        self.changes = ChangeSet(self.df)
+        self.show_rows(self.first_row)
+    
+    def apply(self):
+        # Include the cell being typed in; don't apply anything if it's invalid
+        if not self.commit_edit():
+            return
+        if not len(self.changes):
+            messagebox.showinfo("No Changes", "No cells have been edited.", parent=self.window)
+            return
+        self.on_apply(self.changes)
+    
+    def close(self):
+        self.cancel_edit()
+        if self.window.winfo_exists():
+            self.window.destroy()
@@ -7,33 +7,287 @@ import os
 import io
 import csv
 import numpy as np
+from collections.abc import MutableMapping
+from storage import JSONFileStorage, SQLiteStorage, PandasJSONEncoder, typed_raw_frame
+from balance_matrix import (BalanceMatrixBuilder, build_balance_matrix, stream_csv_balances,
+                            matrix_to_dataset, align_calendar, fill_gaps, GrowableArray)
+from money import parse_money
+
+# Delimiters the sniffer tries, in order of preference when several fit equally well
+SNIFF_DELIMITERS = ('\t', ';', ',')
+# A whole month label: "Jan", "Jan'24", "January 2024", "Sept. 24", "Jan-24" or "2024-01"
+# (not just a header starting with a month abbreviation, like "Marketing" or "Decor")
+MONTH_PATTERN = (r"^(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?"
+                 r"|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\.?(?:[\s'\u2019-]*\d{2,4})?$"
+                 r"|^\d{4}-\d{2}$")
+
+def _head_lines(text, n):
+    """Return the first n lines of text without splitting the rest of it."""
+    end = -1
+    for _ in range(n):
+        end = text.find('\n', end + 1)
+        if end == -1:
+            return text.splitlines()
+    return text[:end].splitlines()
+
+def _read_sample(file_path, size=65536):
+    """Read the first few KB of a text file for sniffing."""
+    with open(file_path, 'r', newline='') as f:
+        return f.read(size)
+
+def read_sniffed_csv(file_path):
+    """
+    Read a CSV file with the delimiter sniffed from its first few KB.
+    
+    The file itself is parsed once; only the sample is read twice.
+    """
+    return pd.read_csv(file_path, sep=sniff_table(_read_sample(file_path))['delimiter'] or ',')
+
+def sniff_table(text, sample_lines=20):
+    """
+    Work out the layout of pasted or uploaded table text from its first lines.
+    
+    Only a bounded sample is inspected, so the full text is parsed exactly once
+    afterwards with the detected settings.
+    
+    Parameters:
+    - text: The table as text (clipboard paste or the start of a file)
+    - sample_lines: How many lines to inspect
+    
+    Returns:
+    - Dictionary with:
+      - delimiter: '\\t', ';', ',' or None if the lines don't split
+      - header: First-row cells
+      - orientation: 'columns' when months run across the header
+        (categories in rows), otherwise 'rows' (one month per row)
+      - has_type_row: True if the second row labels column types
+      - types: Upper-cased cells of the Type row (empty if there isn't one)
+      - shape: 'daily' for Date/Account/Balance data, otherwise 'monthly'
+    """
+    fmt = {'delimiter': None, 'header': [], 'orientation': 'rows',
+           'has_type_row': False, 'types': [], 'shape': 'monthly'}
+    lines = [line for line in _head_lines(text.lstrip('\r\n'), sample_lines) if line.strip()]
+    if not lines:
+        return fmt
+    
+    # Pick the delimiter that splits the most lines into as many fields as the header
+    best_score = 0
+    rows = [[lines[0]]]
+    for delimiter in SNIFF_DELIMITERS:
+        candidate = list(csv.reader(lines, delimiter=delimiter))
+        width = len(candidate[0])
+        if width < 2:
+            continue
+        score = sum(len(row) == width for row in candidate) / len(candidate)
+        if score > best_score:
+            best_score = score
+            fmt['delimiter'] = delimiter
+            rows = candidate
+    
+    header = [cell.strip() for cell in rows[0]]
+    fmt['header'] = header
+    
+    # Daily balance data has Date/Account/Balance columns
+    lowered = {cell.lower() for cell in header}
+    if {'date', 'balance'} <= lowered:
+        fmt['shape'] = 'daily'
+    
+    # Months across the header (in most of its cells) means categories are in rows
+    months = pd.Series(header[1:], dtype=object).str.lower().str.contains(MONTH_PATTERN, regex=True)
+    if len(months) and months.sum() > len(months) / 2:
+        fmt['orientation'] = 'columns'
+    
+    # A Type row labels each column as Income/Expense/Net Income
+    if len(rows) > 1 and rows[1] and 'type' in rows[1][0].lower():
+        fmt['has_type_row'] = True
+        fmt['types'] = [cell.strip().upper() for cell in rows[1]]
+    
+    return fmt
+
+class LazyClientDict(MutableMapping):
+    """
+    Dictionary of clients that only reads a client's file on first access.
+    
+    Client ids known from the manifest are registered as "pending"; membership
+    tests and iteration use the ids alone, and the client body is loaded the
+    first time it is looked up with clients[client_id].
+    """
+    
+    def __init__(self, loader):
+        """
+        Parameters:
+        - loader: Callable taking a client id and returning the client dict
+        """
+        self._loader = loader
+        self._loaded = {}
+        self._pending = set()
+    
+    def register(self, client_id):
+        """Register a client that exists on disk but has not been loaded yet."""
+        if client_id not in self._loaded:
+            self._pending.add(client_id)
+    
+    def is_loaded(self, client_id):
+        """Return True if the client body is already in memory."""
+        return client_id in self._loaded
+    
+    def loaded_items(self):
+        """Iterate over (client_id, client_data) for loaded clients only."""
+        return list(self._loaded.items())
+    
+    def unload(self, client_id):
+        """Drop a loaded client from memory; it is read again on next access."""
+        if client_id in self._loaded:
+            del self._loaded[client_id]
+            self._pending.add(client_id)
+    
+    def __getitem__(self, client_id):
+        if client_id in self._loaded:
+            return self._loaded[client_id]
+        if client_id in self._pending:
+            client_data = self._loader(client_id)
+            self._pending.discard(client_id)
+            self._loaded[client_id] = client_data
+            return client_data
+        raise KeyError(client_id)
+    
+    def __setitem__(self, client_id, client_data):
+        self._pending.discard(client_id)
+        self._loaded[client_id] = client_data
+    
+    def __delitem__(self, client_id):
+        if client_id in self._loaded:
+            del self._loaded[client_id]
+        elif client_id in self._pending:
+            self._pending.discard(client_id)
+        else:
+            raise KeyError(client_id)
+    
+    def __contains__(self, client_id):
+        return client_id in self._loaded or client_id in self._pending
+    
+    def __iter__(self):
+        yield from list(self._loaded)
+        yield from [c for c in list(self._pending) if c not in self._loaded]
+    
+    def __len__(self):
+        return len(self._loaded) + len(self._pending)
+
+def concat_raw_frames(frames):
+    """Concatenate typed raw frames whose Account columns may have different categories."""
+    categories = frames[0]['Account'].cat.categories
+    for frame in frames[1:]:
+        categories = categories.union(frame['Account'].cat.categories, sort=False)
+    account_type = pd.CategoricalDtype(categories)
+    return pd.concat([frame.astype({'Account': account_type}) for frame in frames], ignore_index=True)
+
+class RawDataDict(MutableMapping):
+    """
+    Dictionary of raw Date/Account/Balance frames (dataset name -> frame) that
+    keeps appended rows as separate chunks.
+    
+    Appending only stores the new chunk; the chunks are joined into one frame
+    the first time it is looked up (e.g. when the client is saved or edited),
+    so a run of daily appends doesn't copy the whole history each time.
+    """
+    
+    def __init__(self, frames=None):
+        """
+        Parameters:
+        - frames: Existing dataset name -> frame mapping to start from
+        """
+        self._frames = dict(frames or {})
+        self._chunks = {}
+    
+    def append(self, dataset_name, frame):
+        """Add rows to the end of a dataset's raw frame without copying it."""
+        if dataset_name in self._frames:
+            self._chunks.setdefault(dataset_name, []).append(frame)
+        else:
+            self._frames[dataset_name] = frame
+    
+    def __getitem__(self, dataset_name):
+        chunks = self._chunks.pop(dataset_name, None)
+        if chunks:
+            self._frames[dataset_name] = concat_raw_frames([self._frames[dataset_name]] + chunks)
+        return self._frames[dataset_name]
+    
+    def __setitem__(self, dataset_name, frame):
+        self._chunks.pop(dataset_name, None)
+        self._frames[dataset_name] = frame
+    
+    def __delitem__(self, dataset_name):
+        self._chunks.pop(dataset_name, None)
+        del self._frames[dataset_name]
+    
+    def __contains__(self, dataset_name):
+        return dataset_name in self._frames
+    
+    def __iter__(self):
+        return iter(list(self._frames))
+    
+    def __len__(self):
+        return len(self._frames)
 
 class FinancialDataManager:
     """Manages financial data for multiple clients and time periods."""
     
-    def __init__(self):
-        """Initialize the data manager."""
-        self.clients = {}
+    def __init__(self, data_dir="client_data", columnar=False, storage=None):
+        """
+        Initialize the data manager.
+        
+        Parameters:
+        - data_dir: Directory holding one JSON file per client
+        - columnar: If True, daily cash balance arrays and raw rows are saved to
+          .npz side files referenced from the client JSON instead of inline JSON
+        - storage: Storage backend to use instead of JSON files, e.g.
+          SQLiteStorage("client_data/clients.db")
+        """
+        self.data_dir = data_dir
+        self.columnar = columnar
+        self.storage = storage or JSONFileStorage(data_dir, columnar=columnar)
+        self.clients = LazyClientDict(self.storage.load_client)
         self.current_client = None
         
-        # Try to load any existing clients from saved files
+        # client_id -> set of changed dataset names, for incremental saves
+        self._dirty = {}
+        
+        # (client_id, dataset_name) -> growable buffers behind a daily dataset
+        # that has been appended to (see append_daily_cash_balance_data)
+        self._append_buffers = {}
+        
+        # Index existing clients (bodies are loaded on first access)
         self.load_existing_clients()
     
     def load_existing_clients(self):
-        """Load any existing client data files from the client_data directory."""
-        client_dir = "client_data"
-        if os.path.exists(client_dir):
-            for filename in os.listdir(client_dir):
-                if filename.endswith(".json"):
-                    client_id = filename[:-5]  # Remove .json extension
-                    try:
-                        file_path = os.path.join(client_dir, filename)
-                        with open(file_path, 'r') as f:
-                            client_data = json.load(f)
-                            self.clients[client_id] = client_data
-                            print(f"Loaded client data from {file_path}")
-                    except Exception as e:
-                        print(f"Error loading client data from {filename}: {e}")
+        """
+        Index the clients known to the storage backend.
+        
+        Only the index is read here (for JSON files, the manifest of client ids,
+        names, dataset names, sizes and mtimes); client bodies are loaded lazily
+        through self.clients.
+        """
+        index, preloaded = self.storage.index_clients()
+        for client_id in index:
+            self.clients.register(client_id)
+        for client_id, client_data in preloaded.items():
+            self.clients[client_id] = client_data
+    
+    def list_clients(self):
+        """
+        List known clients without loading their data.
+        
+        Returns:
+        - Dictionary of client_id -> {'name': ..., 'datasets': [...]}
+        """
+        clients = self.storage.list_clients()
+        # Loaded clients may have changes that are not in the index yet
+        for client_id, client_data in self.clients.loaded_items():
+            clients[client_id] = {
+                'name': client_data.get('name', client_id),
+                'datasets': list(client_data.get('datasets', {}).keys())
+            }
+        return clients
     
     def add_client(self, client_id, client_name=None):
         """Add a new client to the system."""
@@ -43,6 +297,7 @@ class FinancialDataManager:
                 'datasets': {}
             }
             self.current_client = client_id
+            self.mark_dirty(client_id)
             return True
         return False
     
@@ -68,6 +323,7 @@ class FinancialDataManager:
         }
         
         self.clients[self.current_client]['datasets'][dataset_name] = dataset
+        self.mark_dirty(self.current_client, dataset_name)
         return dataset
     
     def load_excel_data(self, file_path, sheet_name=0, dataset_name=None):
@@ -83,8 +339,8 @@ class FinancialDataManager:
     def load_csv_data(self, file_path, dataset_name=None):
         """Import data from CSV file."""
         try:
-            # Read CSV file
-            df = pd.read_csv(file_path)
+            # Read CSV file (comma, semicolon or tab separated)
+            df = read_sniffed_csv(file_path)
             return self._process_dataframe(df, dataset_name or os.path.basename(file_path))
         except Exception as e:
             print(f"Error loading CSV file: {e}")
@@ -99,22 +355,39 @@ class FinancialDataManager:
         Jan'24  1000    500     200      ...
         Feb'24  1200    550     220      ...
         ...
+        
+        Tables with months across the header are handed to
+        load_transposed_clipboard_data, and an optional Type row under the
+        header (Income / Expense / Net Income) picks the income and expense columns.
         """
+        # Work out the layout once, then parse the text a single time
+        fmt = sniff_table(clipboard_text)
+        if fmt['shape'] == 'daily':
+            print("This looks like daily balance data (Date/Account/Balance); use load_daily_cash_balance_data")
+            return False
+        if fmt['orientation'] == 'columns':
+            return self.load_transposed_clipboard_data(clipboard_text, dataset_name, fmt=fmt) or False
+        
         try:
             # Convert clipboard text to a dataframe
-            # First, read the pasted text as CSV using StringIO
-            df = pd.read_csv(io.StringIO(clipboard_text), sep='\t')
+            df = pd.read_csv(io.StringIO(clipboard_text), sep=fmt['delimiter'] or '\t',
+                             skiprows=[1] if fmt['has_type_row'] else None)
+            
+            if fmt['has_type_row']:
+                # Put the Income column second and keep only Expense columns after it
+                # (net income is recalculated)
+                types = fmt['types'] + [''] * (len(df.columns) - len(fmt['types']))
+                income = [i for i, t in enumerate(types) if t == 'INCOME']
+                expenses = [i for i, t in enumerate(types) if t == 'EXPENSE']
+                if income:
+                    df = df.iloc[:, [0, income[0]] + expenses]
+            
             return self._process_dataframe(df, dataset_name)
         except Exception as e:
-            # Try another common delimiter (comma) if tab didn't work
-            try:
-                df = pd.read_csv(io.StringIO(clipboard_text), sep=',')
-                return self._process_dataframe(df, dataset_name)
-            except Exception as e2:
-                print(f"Error parsing clipboard data: {e}\nThen: {e2}")
-                return False
+            print(f"Error parsing clipboard data: {e}")
+            return False
     
-    def load_transposed_clipboard_data(self, clipboard_text, dataset_name="transposed_data"):
+    def load_transposed_clipboard_data(self, clipboard_text, dataset_name="transposed_data", fmt=None):
         """
         Load data where categories are in rows and months are in columns
         (the natural spreadsheet export format).
@@ -127,18 +400,15 @@ class FinancialDataManager:
         | PAYROLL       | 300    | 350    | 400    | ...  | 1050  |
         | ...           | ...    | ...    | ...    | ...  | ...   |
         | NET INCOME    | 500    | 600    | 600    | ...  | 1700  |
+        
+        fmt is the result of sniff_table() if the caller has already sniffed the text.
         """
         if self.current_client is None:
             raise ValueError("No client selected. Add a client first.")
         
         try:
-            # Read the pasted text as CSV
-            import io
-            import pandas as pd
-            import numpy as np
-            
             # Try to find the delimiter
-            delimiter = self._detect_delimiter(clipboard_text)
+            delimiter = (fmt or sniff_table(clipboard_text))['delimiter']
             if not delimiter:
                 raise ValueError("Could not detect delimiter in data")
             
@@ -154,29 +424,35 @@ class FinancialDataManager:
             if months[-1].upper() in ['TOTAL', 'SUM', 'TOTALS']:
                 months = months[:-1]  # Remove the TOTAL column
             
-            # Find the rows for income, expense categories, and net income
-            income_row = None
-            net_income_row = None
-            expense_rows = []
-            
-            for idx, row in df.iterrows():
-                category = str(row.iloc[0]).strip().upper()
-                if 'INCOME' in category and 'NET' not in category:
-                    income_row = row
-                elif 'NET' in category and 'INCOME' in category:
-                    net_income_row = row
-                elif category not in ['', 'TOTAL', 'TOTAL EXPENSES']:
-                    # Check if this is not a section header (usually has empty values)
-                    values = row.iloc[1:len(months)+1]
-                    if not values.isna().all() and not (values == '').all():
-                        expense_rows.append(row)
+            # Classify every row at once from its category name
+            categories = df.iloc[:, 0].astype(str).str.strip()
+            upper = categories.str.upper()
+            has_income = upper.str.contains('INCOME', regex=False).to_numpy()
+            has_net = upper.str.contains('NET', regex=False).to_numpy()
+            is_income = has_income & ~has_net
+            is_net_income = has_income & has_net
+            
+            # Convert the whole month block to floats in one go (empty/nan -> 0.0)
+            block = df.iloc[:, 1:len(months)+1]
+            cells = block.to_numpy(dtype=object)
+            values, invalid = parse_money(cells)
+            
+            # Section headers have no values at all
+            no_values = (block.isna().all(axis=1) | (block == '').all(axis=1)).to_numpy()
+            is_expense = (~is_income & ~is_net_income & ~upper.isin(['', 'TOTAL', 'TOTAL EXPENSES']).to_numpy()
+                          & ~no_values)
+            
+            # The last matching row wins for income and net income
+            income_idx = np.flatnonzero(is_income)
+            net_income_idx = np.flatnonzero(is_net_income)
+            expense_idx = np.flatnonzero(is_expense)
+            used = np.concatenate([income_idx[-1:], net_income_idx[-1:], expense_idx])
+            if invalid[used].any():
+                row, col = np.argwhere(invalid[used])[0]
+                raise ValueError(f"could not parse amount: '{cells[used[row], col]}'")
             
             # Extract the data
-            income_values = []
-            if income_row is not None:
-                income_values = income_row.iloc[1:len(months)+1].tolist()
-                income_values = [float(str(v).replace(',', '')) if str(v).strip() not in ['', 'nan'] else 0.0 
-                                for v in income_values]
+            income_values = values[income_idx[-1]].tolist() if len(income_idx) else []
             
             # Extract expense data
             expense_data = {}
@@ -188,33 +464,22 @@ class FinancialDataManager:
                 '#FF00FF', '#FF8000', '#32CD32', '#9370DB', '#008080'
             ]
             
-            for i, row in enumerate(expense_rows):
-                category = str(row.iloc[0]).strip()
-                values = row.iloc[1:len(months)+1].tolist()
-                # Convert to float, replace empty/nan with 0
-                values = [float(str(v).replace(',', '')) if str(v).strip() not in ['', 'nan'] else 0.0 
-                          for v in values]
-                
-                # Add to the expense data dictionary
-                expense_data[category] = values
-                
-                # Assign a color from the palette
-                color_idx = i % len(color_palette)
-                expense_colors[category] = color_palette[color_idx]
+            for i, row_idx in enumerate(expense_idx):
+                category = categories.iloc[row_idx]
+                expense_data[category] = values[row_idx].tolist()
+                expense_colors[category] = color_palette[i % len(color_palette)]
             
             # Extract net income values
-            net_income_values = []
-            if net_income_row is not None:
-                net_income_values = net_income_row.iloc[1:len(months)+1].tolist()
-                net_income_values = [float(str(v).replace(',', '')) if str(v).strip() not in ['', 'nan'] else 0.0 
-                                    for v in net_income_values]
+            if len(net_income_idx):
+                net_income_values = values[net_income_idx[-1]].tolist()
             else:
                 # Calculate net income if not provided
-                net_income_values = []
-                for i in range(len(months)):
-                    income = income_values[i] if i < len(income_values) else 0
-                    expenses = sum(expense_data[cat][i] for cat in expense_data)
-                    net_income_values.append(income - expenses)
+                total_expenses = np.zeros(len(months))
+                for category_values in expense_data.values():
+                    total_expenses += category_values
+                income = np.zeros(len(months))
+                income[:len(income_values)] = income_values[:len(months)]
+                net_income_values = (income - total_expenses).tolist()
             
             # Create the dataset
             dataset = {
@@ -226,6 +491,7 @@ class FinancialDataManager:
             }
             
             self.clients[self.current_client]['datasets'][dataset_name] = dataset
+            self.mark_dirty(self.current_client, dataset_name)
             return dataset
         
         except Exception as e:
@@ -246,8 +512,14 @@ class FinancialDataManager:
             # First column should be months
             months = df.iloc[:, 0].tolist()
             
+            # Parse every amount column in one go; unreadable cells count as 0
+            amounts, invalid = parse_money(df.iloc[:, 1:])
+            if invalid.any():
+                print(f"Warning: {int(invalid.sum())} values could not be read as amounts and were set to 0")
+                amounts[invalid] = 0.0
+            
             # Second column is usually income
-            income_values = df.iloc[:, 1].tolist()
+            income_values = amounts[:, 0].tolist()
             
             # Remaining columns are expense categories
             expense_data = {}
@@ -261,14 +533,11 @@ class FinancialDataManager:
             # Process each expense category
             for i, col in enumerate(df.columns[2:]):
                 category = col.strip()
-                expense_data[category] = df.iloc[:, i+2].tolist()
+                expense_data[category] = amounts[:, i+1].tolist()
                 expense_colors[category] = colors[i % len(colors)]  # Cycle through colors
             
             # Calculate net income
-            net_income_values = []
-            for i, income in enumerate(income_values):
-                total_expense = sum(expense_data[category][i] for category in expense_data)
-                net_income_values.append(income - total_expense)
+            net_income_values = (amounts[:, 0] - amounts[:, 1:].sum(axis=1)).tolist()
             
             # Create the dataset
             dataset = {
@@ -280,6 +549,7 @@ class FinancialDataManager:
             }
             
             self.clients[self.current_client]['datasets'][dataset_name] = dataset
+            self.mark_dirty(self.current_client, dataset_name)
             print(f"Successfully processed data into dataset: {dataset_name}")
             return dataset
             
@@ -290,60 +560,80 @@ class FinancialDataManager:
     def parse_clipboard_format(self, text):
         """
         Helper function to determine the format of clipboard text.
-        Returns the delimiter used.
-        """
-        # Count potential delimiters
-        tabs = text.count('\t')
-        commas = text.count(',')
-        semicolons = text.count(';')
-        
-        # Find the most common delimiter
-        delimiters = {'\t': tabs, ',': commas, ';': semicolons}
-        most_common = max(delimiters, key=delimiters.get)
-        
-        return most_common if delimiters[most_common] > 0 else None
-    
-    def save_data(self, directory="client_data"):
-        """Save client data to JSON files."""
-        if not os.path.exists(directory):
-            os.makedirs(directory)
-            print(f"Created {directory} directory")
-        
-        # Add JSON serialization for pandas objects
-        class PandasJSONEncoder(json.JSONEncoder):
-            def default(self, obj):
-                import pandas as pd
-                import numpy as np
-                
-                # Handle pandas Series
-                if isinstance(obj, pd.Series):
-                    return obj.tolist()
-                
-                # Handle pandas Timestamp
-                if isinstance(obj, pd.Timestamp):
-                    return obj.isoformat()
-                    
-                # Handle numpy arrays
-                if isinstance(obj, np.ndarray):
-                    return obj.tolist()
-                    
-                # Handle numpy numeric types
-                if isinstance(obj, (np.int64, np.int32, np.int16, np.int8)):
-                    return int(obj)
-                if isinstance(obj, (np.float64, np.float32, np.float16)):
-                    return float(obj)
-                    
-                # Let the base class handle other types or raise TypeError
-                return super().default(obj)
-        
-        print(f"Attempting to save data for {len(self.clients)} clients to {directory}")
-        
-        for client, client_data in self.clients.items():
+        Returns the delimiter used (see sniff_table for the full layout).
+        """
+        return sniff_table(text)['delimiter']
+    
+    def mark_dirty(self, client_id=None, dataset_name=None):
+        """
+        Record that a client (or one of its datasets) changed and needs saving.
+        
+        The loaders on this class mark their own changes; call this after
+        editing self.clients[...] directly so the next save_data() picks it up.
+        
+        Parameters:
+        - client_id: Client that changed (default: the current client)
+        - dataset_name: Dataset that changed, or None for client-level fields
+        """
+        client = client_id or self.current_client
+        if client is None:
+            return
+        changed = self._dirty.setdefault(client, set())
+        if dataset_name is not None:
+            changed.add(dataset_name)
+    
+    def is_dirty(self, client_id=None):
+        """Return True if the client (or any client, if none given) has unsaved changes."""
+        if client_id is None:
+            return bool(self._dirty)
+        return client_id in self._dirty
+    
+    def save_data(self, directory=None, force=False):
+        """
+        Save client data through the storage backend.
+        
+        Only clients marked dirty since the last save are written. Passing
+        force=True writes every loaded client. Passing a directory exports every
+        known client to JSON files there instead.
+        
+        Returns:
+        - True if every client was written successfully, False otherwise
+        """
+        # Exporting to another directory writes JSON files there; otherwise use our own storage
+        storage_dir = getattr(self.storage, 'directory', None)
+        export = directory is not None and (storage_dir is None or
+                                            os.path.abspath(directory) != os.path.abspath(storage_dir))
+        storage = JSONFileStorage(directory, columnar=self.columnar) if export else self.storage
+        
+        # Clients that were never loaded are already stored unchanged, so only
+        # loaded clients need writing - unless we're exporting somewhere else
+        if export:
+            clients_to_save = list(self.clients.items())
+        elif force:
+            clients_to_save = self.clients.loaded_items()
+        else:
+            clients_to_save = [(client, client_data) for client, client_data in self.clients.loaded_items()
+                               if client in self._dirty]
+        
+        if not clients_to_save:
+            print("No client changes to save")
+            return True
+        
+        directory = directory or storage_dir or getattr(self.storage, 'path', '')
+        print(f"Attempting to save data for {len(clients_to_save)} clients to {directory}")
+        
+        success = True
+        for client, client_data in clients_to_save:
             try:
-                print(f"Processing client {client} with {len(client_data.get('datasets', {}))} datasets")
+                # Only describe the datasets that actually changed
+                changed = self._dirty.get(client, set())
+                print(f"Processing client {client} with {len(client_data.get('datasets', {}))} datasets "
+                      f"({len(changed)} changed)")
                 
-                # Analyze each dataset
+                # Analyze each changed dataset
                 for dataset_name, dataset in client_data.get('datasets', {}).items():
+                    if dataset_name not in changed:
+                        continue
                     if 'months' in dataset:
                         # This is a stacked bar chart dataset
                         months = dataset.get('months', [])
@@ -365,37 +655,35 @@ class FinancialDataManager:
                             print(f"    Accounts: {list(accounts)}")
                 
                 # Save the client data
-                file_path = os.path.join(directory, f"{client}.json")
-                with open(file_path, 'w') as f:
-                    json.dump(client_data, f, indent=4, cls=PandasJSONEncoder)
+                file_path = storage.save_client(client, client_data, changed,
+                                                rewrite_all=force or export)
                 print(f"Data saved for client {client} to {file_path}")
+                
+                if not export:
+                    self._dirty.pop(client, None)
             except Exception as e:
+                success = False
                 print(f"Error saving data: {e}")
                 # Print the full stack trace for debugging
                 import traceback
                 traceback.print_exc()
                 
-                # Try to save just the basic client info
-                try:
-                    basic_client_data = {
-                        "name": client_data.get("name", client),
-                        "datasets": {}
-                    }
-                    file_path = os.path.join(directory, f"{client}.json")
-                    with open(file_path, 'w') as f:
-                        json.dump(basic_client_data, f, indent=4)
-                    print(f"Saved basic client data for {client}")
-                except Exception as basic_error:
-                    print(f"Could not even save basic client data: {basic_error}")
+                # The failed save left the stored copy as it was (JSON files are
+                # replaced atomically, SQLite rolls back), so don't overwrite it with
+                # a partial client; it stays marked as changed and the next save retries
+                print(f"Kept the previously saved data for {client}")
+        
+        # Keep the storage index (e.g. the JSON manifest) in step
+        storage.flush()
+        
+        return success
     
     def load_saved_data(self, client_id, directory="client_data"):
         """Load client data from a saved JSON file."""
-        file_path = os.path.join(directory, f"{client_id}.json")
         try:
-            with open(file_path, 'r') as f:
-                client_data = json.load(f)
-                self.clients[client_id] = client_data
-                self.current_client = client_id
+            client_data = JSONFileStorage(directory, columnar=self.columnar).load_client(client_id)
+            self.clients[client_id] = client_data
+            self.current_client = client_id
             return True
         except Exception as e:
             print(f"Error loading client data: {e}")
@@ -412,8 +700,63 @@ class FinancialDataManager:
             
         return self.clients[client]['datasets'][dataset_name]
     
+    def get_balances(self, dataset_name, account=None, start=None, end=None, client_id=None):
+        """
+        Get daily balances for one or more accounts over a date range.
+        
+        If the client isn't loaded yet and the storage backend has an index
+        (SQLiteStorage), the query is answered by the backend without loading
+        the client. Otherwise the dataset is filtered in memory.
+        
+        Parameters:
+        - dataset_name: Daily cash balance dataset to query
+        - account: Optional account name or list of account names
+        - start, end: Optional inclusive date bounds
+        - client_id: Client to query (default: the current client)
+        
+        Returns:
+        - DataFrame with Date, Account, Balance columns sorted by date, or None
+          if the dataset doesn't exist
+        """
+        client = client_id or self.current_client
+        if client is None:
+            raise ValueError("No client specified")
+        
+        if not self.clients.is_loaded(client):
+            result = self.storage.query_balances(client, dataset_name, account, start, end)
+            if result is not None:
+                return result
+        
+        dataset = self.get_dataset(dataset_name, client)
+        if dataset is None or 'dates' not in dataset:
+            return None
+        
+        dates = pd.to_datetime(pd.Series(dataset['dates'])).to_numpy()
+        in_range = np.ones(len(dates), dtype=bool)
+        if start is not None:
+            in_range &= dates >= np.datetime64(pd.Timestamp(start))
+        if end is not None:
+            in_range &= dates <= np.datetime64(pd.Timestamp(end))
+        
+        accounts = list(dataset['accounts'])
+        if account is not None:
+            wanted = {account} if isinstance(account, str) else set(account)
+            accounts = [a for a in accounts if a in wanted]
+        
+        frames = []
+        for name in accounts:
+            values = np.asarray(dataset['account_data'][name], dtype=np.float64)[in_range]
+            present = ~np.isnan(values)
+            frames.append(pd.DataFrame({'Date': dates[in_range][present], 'Account': name,
+                                        'Balance': values[present]}))
+        if not frames:
+            return pd.DataFrame(columns=['Date', 'Account', 'Balance'])
+        result = pd.concat(frames, ignore_index=True)
+        return result.sort_values(['Date', 'Account'], kind='stable').reset_index(drop=True)
+    
     def load_daily_cash_balance_data(self, data_source, dataset_name="daily_cash_balance", 
-                                     date_col="Date", account_col="Account", balance_col="Balance"):
+                                     date_col="Date", account_col="Account", balance_col="Balance",
+                                     chunksize=None, freq=None, fill='ffill'):
         """
         Load daily cash balance data from a file or clipboard text.
         
@@ -423,6 +766,16 @@ class FinancialDataManager:
         - date_col: Name of the date column (default: "Date")
         - account_col: Name of the account column (default: "Account")
         - balance_col: Name of the balance column (default: "Balance")
+        - chunksize: If set, CSV files/text are streamed this many rows at a time
+          instead of being read whole (for very large bank exports)
+        - freq: Align to a full calendar first: 'D' (every day), 'B' (business
+          days) or None (only days that appear in the data)
+        - fill: How to fill days an account didn't report: 'ffill' (last known
+          balance), 'zero' or None (leave a gap), or a dict {account: method}
+          for per-account overrides (unlisted accounts use 'ffill')
+        
+        The freq and fill settings are kept with the dataset and reused by
+        append_daily_cash_balance_data.
         
         Expected data format (as CSV):
         Date,Account,Balance
@@ -435,28 +788,333 @@ class FinancialDataManager:
         """
         if self.current_client is None:
             raise ValueError("No client selected. Add a client first.")
+        
+        # Stream large CSV input chunk by chunk
+        if chunksize and isinstance(data_source, str) and not data_source.lower().endswith(('.xlsx', '.xls')):
+            return self._stream_daily_cash_balance_data(data_source, dataset_name, date_col,
+                                                        account_col, balance_col, chunksize,
+                                                        freq=freq, fill=fill)
             
+        df = self._read_daily_frame(data_source, date_col, account_col, balance_col)
+        
+        # Kept as typed columns (datetime64 / category / float64), sorted by date;
+        # written out as JSON records or as a columnar side file depending on self.columnar.
+        # Typing before sorting means account names are hashed once, in file order
+        raw_df = typed_raw_frame(df)
+        if not raw_df["Date"].is_monotonic_increasing:
+            raw_df = raw_df.sort_values("Date", kind='stable', ignore_index=True)
+        
+        # Store the raw data
+        if 'raw_data' not in self.clients[self.current_client]:
+            self.clients[self.current_client]['raw_data'] = {}
+        self.clients[self.current_client]['raw_data'][dataset_name] = raw_df
+        
+        # Build the date x account matrix (duplicates summed, calendar aligned,
+        # gaps filled) with the same engine the chart uses
+        dates, accounts, matrix = build_balance_matrix(raw_df["Date"], raw_df["Account"], raw_df["Balance"],
+                                                       fill=fill, freq=freq)
+        
+        # Create the dataset for the chart
+        dataset = matrix_to_dataset(dates, accounts, matrix,
+                                    client_name=self.clients[self.current_client]['name'])
+        self._set_fill_settings(dataset, freq, fill)
+        
+        # Store the processed dataset
+        self.clients[self.current_client]['datasets'][dataset_name] = dataset
+        self.mark_dirty(self.current_client, dataset_name)
+        
+        return dataset
+
+    def append_daily_cash_balance_data(self, data_source, dataset_name="daily_cash_balance",
+                                       date_col="Date", account_col="Account", balance_col="Balance"):
+        """
+        Merge new daily balance rows into an existing daily cash balance dataset.
+        
+        Meant for daily refreshes: when the new rows are all after the last known
+        date, only they are reduced and filled (continuing each account from its
+        last filled balance), so the history isn't re-sorted or re-pivoted. The
+        dataset's arrays are views of growable buffers and the new raw rows are
+        kept as a separate chunk until the raw data is next read, so a tail
+        append costs O(new rows) rather than copying the history.
+        Rows for days that already exist replace the old balance for that
+        account; in that case the dataset is rebuilt from the merged raw data so
+        later filled-in days pick up the corrected balance. Accounts that
+        weren't in the dataset before are added (NaN on earlier days).
+        If the dataset doesn't exist yet this is the same as load_daily_cash_balance_data.
+        
+        Parameters:
+        - data_source: File path, clipboard text or DataFrame with the new rows
+        - dataset_name: Name of the dataset to update
+        - date_col, account_col, balance_col: Column names in the new data
+        
+        Returns:
+        - The updated dataset
+        """
+        if self.current_client is None:
+            raise ValueError("No client selected. Add a client first.")
+        
+        client_data = self.clients[self.current_client]
+        dataset = client_data['datasets'].get(dataset_name)
+        if dataset is None or 'dates' not in dataset:
+            return self.load_daily_cash_balance_data(data_source, dataset_name, date_col=date_col,
+                                                     account_col=account_col, balance_col=balance_col)
+        
+        new_df = self._read_daily_frame(data_source, date_col, account_col, balance_col)
+        
+        # Reduce the new rows to one balance per account per day (same rule as the loader)
+        builder = BalanceMatrixBuilder()
+        builder.add(new_df["Date"], new_df["Account"], new_df["Balance"])
+        new_dates, new_accounts, new_matrix = builder.result()
+        if len(new_dates) == 0:
+            print("No new balances to append")
+            return dataset
+        
+        old_dates = pd.Series(dataset['dates'])
+        last_date = np.datetime64(pd.Timestamp(old_dates.iloc[-1]), 'ns') if len(old_dates) else None
+        is_tail = last_date is not None and new_dates[0] > last_date
+        freq = dataset.get('freq')
+        fill = dataset.get('fill', 'ffill')
+        
+        # Raw rows go in a RawDataDict, which keeps appended chunks apart until they're read
+        raw_data = client_data.get('raw_data')
+        if not isinstance(raw_data, RawDataDict):
+            raw_data = client_data['raw_data'] = RawDataDict(raw_data)
+        new_raw = typed_raw_frame(new_df)
+        if not new_raw["Date"].is_monotonic_increasing:
+            new_raw = new_raw.sort_values("Date", kind='stable', ignore_index=True)
+        
+        if is_tail:
+            # Usual case: only days after the existing history
+            raw_data.append(dataset_name, new_raw)
+            buffers = self._daily_buffers(dataset_name, dataset)
+            accounts = list(dataset['accounts'])
+            accounts += [account for account in new_accounts if account not in buffers['accounts']]
+            new_codes = {account: i for i, account in enumerate(new_accounts)}
+            
+            # Continue every account from its last filled balance (row 0 is the last known day)
+            tail = np.full((len(new_dates) + 1, len(accounts)), np.nan)
+            for j, account in enumerate(accounts):
+                column = buffers['accounts'].get(account)
+                if column is not None and column.size:
+                    tail[0, j] = column.values[-1]
+                if account in new_codes:
+                    tail[1:, j] = new_matrix[:, new_codes[account]]
+            tail_dates, tail = align_calendar(np.concatenate([[last_date], new_dates]), tail, freq)
+            tail = fill_gaps(accounts, tail, fill)[1:]
+            new_dates = tail_dates[1:]
+            
+            # Write the new days into the buffers; the dataset gets views of them
+            account_data = {}
+            for j, account in enumerate(accounts):
+                column = buffers['accounts'].get(account)
+                if column is None:
+                    column = buffers['accounts'][account] = GrowableArray(np.full(len(old_dates), np.nan))
+                account_data[account] = column.extend(tail[:, j])
+            
+            buffers['dates_series'] = pd.Series(buffers['dates'].extend(new_dates), name='Date', copy=False)
+            dataset['dates'] = buffers['dates_series']
+            dataset['accounts'] = accounts
+            dataset['account_data'] = account_data
+            dataset['total_balance'] = buffers['total'].extend(np.nansum(tail, axis=1))
+        else:
+            # Restated or back-filled days change the fill after them: drop the old rows
+            # the new ones replace and rebuild from the merged raw data
+            old_raw = raw_data.get(dataset_name)
+            if old_raw is None or len(old_raw) == 0:
+                raw_data[dataset_name] = new_raw
+            else:
+                replaced = pd.MultiIndex.from_arrays([old_raw['Date'], old_raw['Account'].astype(str)]).isin(
+                    pd.MultiIndex.from_arrays([new_raw['Date'], new_raw['Account'].astype(str)]))
+                raw_data[dataset_name] = concat_raw_frames([old_raw[~replaced], new_raw])
+            raw_df = raw_data[dataset_name]
+            dates, accounts, matrix = build_balance_matrix(raw_df['Date'], raw_df['Account'].astype(object),
+                                                           raw_df['Balance'], fill=fill, freq=freq)
+            rebuilt = matrix_to_dataset(dates, accounts, matrix)
+            dataset.update(rebuilt)
+            self._append_buffers.pop((self.current_client, dataset_name), None)
+        
+        self.mark_dirty(self.current_client, dataset_name)
+        print(f"Appended {builder.rows_read} rows ({len(new_dates)} days) to {dataset_name}")
+        return dataset
+    
+    def _daily_buffers(self, dataset_name, dataset):
+        """
+        Get the growable buffers behind a daily dataset, for appending to it.
+        
+        The buffers are reused as long as the dataset still holds the views they
+        handed out; the first append (or one after the dataset was reloaded,
+        rebuilt or edited) copies the dataset into new buffers once.
+        
+        Returns:
+        - Dict with 'dates', 'total' and 'accounts' ({account: GrowableArray})
+        """
+        key = (self.current_client, dataset_name)
+        buffers = self._append_buffers.get(key)
+        if (buffers is not None and buffers['dataset'] is dataset
+                and dataset['dates'] is buffers['dates_series']
+                and dataset['total_balance'] is buffers['total'].values
+                and set(dataset['account_data']) == set(buffers['accounts'])
+                and all(dataset['account_data'][account] is column.values
+                        for account, column in buffers['accounts'].items())):
+            return buffers
+        
+        dates = pd.to_datetime(pd.Series(dataset['dates'])).to_numpy(dtype='datetime64[ns]')
+        buffers = {
+            'dataset': dataset,
+            'dates': GrowableArray(dates, dtype='datetime64[ns]'),
+            'dates_series': None,
+            'total': GrowableArray(dataset['total_balance']),
+            'accounts': {account: GrowableArray(values) for account, values in dataset['account_data'].items()}
+        }
+        self._append_buffers[key] = buffers
+        return buffers
+    
+    def update_daily_cash_balances(self, dataset_name, old_rows, new_rows,
+                                   date_col="Date", account_col="Account", balance_col="Balance"):
+        """
+        Apply edited rows to a loaded daily cash balance dataset without
+        rebuilding it from scratch.
+        
+        old_rows and new_rows hold the same rows of the source data before and
+        after editing. Each edited row is matched to its raw row and updated.
+        When only balances changed, just the edited accounts are re-reduced and
+        re-filled (from their own raw rows) and the total is recomputed on the
+        days whose balance changed. Edits that move a row to another date or
+        account rebuild the dataset from the raw data.
+        
+        Parameters:
+        - dataset_name: Name of the dataset to update
+        - old_rows, new_rows: DataFrames with the edited rows before/after the edit
+        - date_col, account_col, balance_col: Column names in the rows
+        
+        Returns:
+        - (dataset, changed): changed maps each account whose line changed to the
+          positions of the days that changed, or is None if the dataset was
+          rebuilt; None instead of the tuple if the edited rows couldn't be
+          matched to the stored raw data (reload the full data then)
+        """
+        if self.current_client is None:
+            raise ValueError("No client selected. Add a client first.")
+        
+        client_data = self.clients[self.current_client]
+        dataset = client_data['datasets'].get(dataset_name)
+        raw_df = client_data.get('raw_data', {}).get(dataset_name)
+        if dataset is None or 'dates' not in dataset or raw_df is None:
+            return None
+        
+        old = typed_raw_frame(self._read_daily_frame(old_rows, date_col, account_col, balance_col))
+        new = typed_raw_frame(self._read_daily_frame(new_rows, date_col, account_col, balance_col))
+        
+        # Find the raw row behind each edited row (same date, account and balance)
+        raw_dates = raw_df['Date'].to_numpy()
+        raw_codes = raw_df['Account'].cat.codes.to_numpy()
+        raw_balances = raw_df['Balance'].to_numpy()
+        categories = raw_df['Account'].cat.categories
+        used = np.zeros(len(raw_df), dtype=bool)
+        positions = []
+        for date, account, balance in zip(old['Date'].to_numpy(), old['Account'].astype(object), old['Balance'].to_numpy()):
+            if account not in categories:
+                return None
+            same_balance = (raw_balances == balance) if not np.isnan(balance) else np.isnan(raw_balances)
+            candidates = np.flatnonzero((raw_dates == date) & (raw_codes == categories.get_loc(account))
+                                        & same_balance & ~used)
+            if len(candidates) == 0:
+                return None
+            used[candidates[0]] = True
+            positions.append(candidates[0])
+        positions = np.asarray(positions, dtype=np.int64)
+        
+        freq = dataset.get('freq')
+        fill = dataset.get('fill', 'ffill')
+        moved = ((old['Date'].to_numpy() != new['Date'].to_numpy())
+                 | (old['Account'].astype(object).to_numpy() != new['Account'].astype(object).to_numpy()))
+        
+        if moved.any():
+            # Rows moved to another day or account: update the raw rows and rebuild
+            missing = new['Account'].cat.categories.difference(categories)
+            if len(missing):
+                raw_df['Account'] = raw_df['Account'].cat.add_categories(missing)
+            raw_df.iloc[positions, raw_df.columns.get_loc('Date')] = new['Date'].to_numpy()
+            raw_df.iloc[positions, raw_df.columns.get_loc('Account')] = new['Account'].astype(object).to_numpy()
+            raw_df.iloc[positions, raw_df.columns.get_loc('Balance')] = new['Balance'].to_numpy()
+            dates, accounts, matrix = build_balance_matrix(raw_df['Date'], raw_df['Account'].astype(object),
+                                                           raw_df['Balance'], fill=fill, freq=freq)
+            dataset.update(matrix_to_dataset(dates, accounts, matrix))
+            self.mark_dirty(self.current_client, dataset_name)
+            print(f"Updated {len(positions)} rows of {dataset_name} (rebuilt)")
+            return dataset, None
+        
+        raw_df.iloc[positions, raw_df.columns.get_loc('Balance')] = new['Balance'].to_numpy()
+        
+        # Re-reduce and re-fill each edited account on the dataset's calendar
+        grid = pd.to_datetime(dataset['dates']).to_numpy(dtype='datetime64[ns]')
+        changed = {}
+        for code in np.unique(raw_codes[positions]):
+            account = categories[code]
+            rows = np.flatnonzero(raw_codes == code)
+            builder = BalanceMatrixBuilder()
+            builder.add(raw_df['Date'].iloc[rows], raw_df['Account'].iloc[rows].astype(object),
+                        raw_df['Balance'].iloc[rows])
+            account_dates, _, account_matrix = builder.result()
+            
+            column = np.full((len(grid), 1), np.nan)
+            slots = np.searchsorted(grid, account_dates)
+            if (slots >= len(grid)).any() or (grid[np.minimum(slots, len(grid) - 1)] != account_dates).any():
+                return None  # raw data and dataset calendar are out of step
+            column[slots, 0] = account_matrix[:, 0]
+            column = fill_gaps([account], column, fill)[:, 0]
+            
+            old_column = np.asarray(dataset['account_data'][account], dtype=np.float64)
+            same = (old_column == column) | (np.isnan(old_column) & np.isnan(column))
+            if not same.all():
+                changed[account] = np.flatnonzero(~same)
+                dataset['account_data'][account] = column
+        
+        # Recompute the total on the changed days only
+        if changed:
+            days = np.unique(np.concatenate(list(changed.values())))
+            total = np.array(dataset['total_balance'], dtype=np.float64)
+            total[days] = np.nansum([np.asarray(dataset['account_data'][account], dtype=np.float64)[days]
+                                     for account in dataset['accounts']], axis=0)
+            dataset['total_balance'] = total
+        
+        self.mark_dirty(self.current_client, dataset_name)
+        print(f"Updated {len(positions)} rows of {dataset_name} ({sum(len(days) for days in changed.values())} balances changed)")
+        return dataset, changed
+    
+    def _set_fill_settings(self, dataset, freq, fill):
+        """Remember non-default calendar/fill settings on a daily dataset for later appends."""
+        if freq is not None:
+            dataset['freq'] = freq
+        if fill != 'ffill':
+            dataset['fill'] = fill
+    
+    def _read_daily_frame(self, data_source, date_col="Date", account_col="Account", balance_col="Balance"):
+        """
+        Read Date/Account/Balance rows from a file path, clipboard text or DataFrame.
+        
+        Returns:
+        - DataFrame with Date (datetime), Account and Balance (float) columns
+        """
         # Load the data based on the source type
         if isinstance(data_source, str):
             # Check if it's a file path or clipboard text
             if os.path.exists(data_source):
                 # It's a file path
                 if data_source.lower().endswith('.csv'):
-                    df = pd.read_csv(data_source)
+                    df = read_sniffed_csv(data_source)
                 elif data_source.lower().endswith(('.xlsx', '.xls')):
                     df = pd.read_excel(data_source)
                 else:
                     raise ValueError("Unsupported file type. Only CSV and Excel files are supported.")
             else:
                 # Assume it's clipboard text
-                try:
-                    df = pd.read_csv(io.StringIO(data_source), sep='\t')
-                except:
-                    # Try with comma separator
-                    df = pd.read_csv(io.StringIO(data_source), sep=',')
+                df = pd.read_csv(io.StringIO(data_source), sep=sniff_table(data_source)['delimiter'] or '\t')
         elif isinstance(data_source, pd.DataFrame):
-            # It's already a DataFrame
-            df = data_source
+            # It's already a DataFrame; only its three columns are copied, so the
+            # caller's frame (e.g. the one in the data editor) isn't converted in place
+            columns = [col for col in (date_col, account_col, balance_col) if col in data_source.columns]
+            df = data_source[columns].copy()
         else:
             raise ValueError("data_source must be a file path, clipboard text, or DataFrame")
             
@@ -477,45 +1135,50 @@ class FinancialDataManager:
         # Convert dates to datetime
         df["Date"] = pd.to_datetime(df["Date"])
         
-        # Ensure Balance is numeric
-        df["Balance"] = pd.to_numeric(df["Balance"], errors='coerce')
-        
-        # Sort by date
-        df = df.sort_values("Date")
+        # Ensure Balance is numeric (currency strings are parsed, unreadable values become NaN)
+        df["Balance"] = parse_money(df["Balance"], empty_value=np.nan)[0]
         
-        # Store the raw data
-        if 'raw_data' not in self.clients[self.current_client]:
-            self.clients[self.current_client]['raw_data'] = {}
-        
-        self.clients[self.current_client]['raw_data'][dataset_name] = df.to_dict(orient='records')
+        return df
+    
+    def _stream_daily_cash_balance_data(self, data_source, dataset_name, date_col,
+                                        account_col, balance_col, chunksize, freq=None, fill='ffill'):
+        """
+        Streaming version of load_daily_cash_balance_data for CSV files or text.
         
-        # Process the data for visualization
-        # Get unique dates and accounts
-        dates = df["Date"].unique()
-        accounts = df["Account"].unique()
+        Each chunk is reduced straight into the date x account matrix, so only
+        one chunk plus the output arrays are in memory at once. The raw data
+        kept for the dataset is the reduced one-row-per-account-per-day table.
+        """
+        if os.path.exists(data_source):
+            sample = _read_sample(data_source)
+            source = data_source
+        else:
+            sample = data_source
+            source = io.StringIO(data_source)
+        sep = sniff_table(sample)['delimiter'] or ','
         
-        # Create a pivot table: dates as index, accounts as columns
-        pivot_data = df.pivot_table(
-            index='Date', 
-            columns='Account', 
-            values='Balance',
-            aggfunc='sum'  # In case there are multiple entries for the same account on the same day
-        ).reset_index()
+        try:
+            builder = stream_csv_balances(source, chunksize=chunksize, date_col=date_col,
+                                          account_col=account_col, balance_col=balance_col, sep=sep,
+                                          parse_balance=lambda col: parse_money(col, empty_value=np.nan)[0])
+        except ValueError as e:
+            raise ValueError(f"Data must contain '{date_col}', '{account_col}' and '{balance_col}' columns: {e}")
         
-        # Calculate total balance across all accounts for each date
-        pivot_data['Total'] = pivot_data.iloc[:, 1:].sum(axis=1)
+        dates, accounts, matrix = builder.result()
+        dates, matrix = align_calendar(dates, matrix, freq)
+        matrix = fill_gaps(accounts, matrix, fill)
         
-        # Create the dataset for the chart
-        dataset = {
-            'dates': pivot_data['Date'],
-            'accounts': accounts,
-            'account_data': {account: pivot_data[account].values for account in accounts},
-            'total_balance': pivot_data['Total'].values,
-            'client_name': self.clients[self.current_client]['name']
-        }
+        # Store the raw data
+        if 'raw_data' not in self.clients[self.current_client]:
+            self.clients[self.current_client]['raw_data'] = {}
+        self.clients[self.current_client]['raw_data'][dataset_name] = builder.to_frame()
         
-        # Store the processed dataset
+        # Create and store the dataset for the chart
+        dataset = matrix_to_dataset(dates, accounts, matrix,
+                                    client_name=self.clients[self.current_client]['name'])
+        self._set_fill_settings(dataset, freq, fill)
         self.clients[self.current_client]['datasets'][dataset_name] = dataset
+        self.mark_dirty(self.current_client, dataset_name)
         
         return dataset
 
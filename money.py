@@ -0,0 +1,72 @@
+# money.py
+# Parses money amounts typed or pasted in any of the usual formats
+
+import numpy as np
+import pandas as pd
+
+# Cell values treated as "no amount" when parsing money columns
+EMPTY_MONEY_STRINGS = ['', 'nan', 'none', 'null', '-', '\u2013', '\u2014']
+
+def parse_money(values, empty_value=0.0):
+    """
+    Parse money amounts for a whole column (or table) at once.
+    
+    Understands thousands separators, currency symbols ($, €, £, ¥), negatives
+    written as (1,234.56) or 1,234.56-, and European formatting like €1.234,56.
+    A comma followed by exactly three-digit groups (1,234 or 1,234,567) is read
+    as a thousands separator; otherwise a comma after the last dot is read as
+    the decimal separator.
+    
+    Parameters:
+    - values: List, NumPy array, Series or DataFrame of cells (numbers pass through)
+    - empty_value: Value to use for empty cells ('', 'nan', '-', ...)
+    
+    Returns:
+    - Tuple (amounts, invalid): a float64 array shaped like the input and a
+      boolean mask of cells that couldn't be parsed (those are NaN in amounts)
+    """
+    if isinstance(values, (pd.Series, pd.DataFrame)):
+        cells = values.to_numpy()
+    else:
+        cells = np.asarray(values)
+    
+    # Already numeric: only the missing values need handling
+    if cells.dtype.kind in 'biuf':
+        amounts = cells.astype(np.float64)
+        amounts[np.isnan(amounts)] = empty_value
+        return amounts, np.zeros(cells.shape, dtype=bool)
+    
+    cells = cells.astype(object)
+    shape = cells.shape
+    flat = pd.Series(cells.ravel(), dtype=object)
+    
+    # Plain numbers don't need any cleaning
+    amounts = pd.to_numeric(flat, errors='coerce').to_numpy(dtype=np.float64, copy=True)
+    empty = flat.isna().to_numpy(copy=True)
+    needs_cleaning = np.isnan(amounts) & ~empty
+    
+    if needs_cleaning.any():
+        text = flat[needs_cleaning].astype(str).str.strip()
+        is_empty = text.str.lower().isin(EMPTY_MONEY_STRINGS).to_numpy()
+        
+        # Negatives written as (123.45) or 123.45-
+        negative = ((text.str.startswith('(') & text.str.endswith(')'))
+                    | (text.str.endswith('-') & (text.str.len() > 1))).to_numpy()
+        core = text.str.replace(r'^\((.*)\)$', r'\1', regex=True).str.replace(r'-$', '', regex=True)
+        core = core.str.replace(r"[\s$€£¥'\u00a0]|USD|EUR|GBP", '', regex=True)
+        
+        # Work out which separator is the decimal point
+        us_thousands = core.str.fullmatch(r'[+-]?\d{1,3}(,\d{3})+(\.\d*)?').to_numpy(dtype=bool)
+        decimal_comma = (core.str.rfind(',') > core.str.rfind('.')).to_numpy() & ~us_thousands
+        european = core.str.replace('.', '', regex=False).str.replace(',', '.', regex=False)
+        core = core.str.replace(',', '', regex=False).where(~decimal_comma, european)
+        
+        cleaned = pd.to_numeric(core, errors='coerce').to_numpy(dtype=np.float64)
+        cleaned = np.where(negative, -cleaned, cleaned)
+        cleaned[is_empty] = np.nan
+        amounts[needs_cleaning] = cleaned
+        empty[needs_cleaning] = is_empty
+    
+    invalid = np.isnan(amounts) & ~empty
+    amounts[empty] = empty_value
+    return amounts.reshape(shape), invalid.reshape(shape)
@@ -0,0 +1,65 @@
+# monthly_data.py
+# Helpers for monthly income/expense datasets (used by the stacked bar chart)
+
+import numpy as np
+
+# Label and color used for the categories merged by rollup_expense_categories
+OTHER_CATEGORY = 'Other'
+OTHER_COLOR = '#A9A9A9'
+
+def rollup_expense_categories(dataset, top_n, by='total', other_label=OTHER_CATEGORY,
+                              other_color=OTHER_COLOR):
+    """
+    Keep the top N expense categories of a monthly dataset and merge the rest
+    into a single "Other" category.
+    
+    Parameters:
+    - dataset: Monthly dataset (months, income_values, expense_data, ...)
+    - top_n: Number of categories to keep as they are
+    - by: Rank categories by their 'total' over all months or by the 'last' month
+    - other_label: Name of the merged category
+    - other_color: Bar color of the merged category
+    
+    Returns:
+    - A new dataset with at most top_n + 1 categories (the input when it is
+      already narrow enough); income and net income are unchanged
+    """
+    if by not in ('total', 'last'):
+        raise ValueError(f"by must be 'total' or 'last', not {by!r}")
+    
+    expense_data = dataset['expense_data']
+    categories = list(expense_data)
+    if top_n is None or len(categories) <= top_n + 1:
+        return dataset
+    
+    # One row per category, one column per month
+    values = np.array([expense_data[category] for category in categories],
+                      dtype=np.float64).reshape(len(categories), len(dataset['months']))
+    if values.shape[1] == 0:
+        return dataset
+    scores = values.sum(axis=1) if by == 'total' else values[:, -1]
+    
+    # Keep the top N (stable, so ties go to the earlier category) in their original order
+    keep = np.zeros(len(categories), dtype=bool)
+    keep[np.argsort(-scores, kind='stable')[:max(top_n, 0)]] = True
+    other_values = values[~keep].sum(axis=0)
+    
+    colors = dataset.get('expense_colors', {})
+    rolled_data = {}
+    rolled_colors = {}
+    for i in np.flatnonzero(keep):
+        category = categories[i]
+        rolled_data[category] = values[i].tolist()
+        rolled_colors[category] = colors.get(category, other_color)
+    
+    # An existing "Other" category absorbs the merged ones
+    if other_label in rolled_data:
+        rolled_data[other_label] = (np.array(rolled_data[other_label]) + other_values).tolist()
+    else:
+        rolled_data[other_label] = other_values.tolist()
+        rolled_colors[other_label] = other_color
+    
+    rolled = dict(dataset)
+    rolled['expense_data'] = rolled_data
+    rolled['expense_colors'] = rolled_colors
+    return rolled
@@ -0,0 +1,688 @@
+# storage.py
+# Storage backends for FinancialDataManager client data
+
+import pandas as pd
+import numpy as np
+import json
+import os
+import re
+import sqlite3
+from collections.abc import Mapping
+
+# Name of the index file kept next to the client JSON files
+MANIFEST_FILENAME = "_manifest.json"
+
+# Keys of a daily cash balance dataset that hold the bulk arrays
+DAILY_ARRAY_KEYS = ('dates', 'accounts', 'account_data', 'total_balance')
+
+class PandasJSONEncoder(json.JSONEncoder):
+    """JSON encoder that understands the pandas/numpy objects stored in datasets."""
+    
+    def default(self, obj):
+        # Handle pandas DataFrames (raw data) as a list of row records
+        if isinstance(obj, pd.DataFrame):
+            return obj.to_dict(orient='records')
+        
+        # Handle pandas Series and Index
+        if isinstance(obj, (pd.Series, pd.Index)):
+            return obj.tolist()
+        
+        # Handle pandas extension arrays (e.g. string or categorical columns)
+        if isinstance(obj, pd.api.extensions.ExtensionArray):
+            return obj.tolist()
+        
+        # Handle other mappings (e.g. the manager's RawDataDict) as plain dicts
+        if isinstance(obj, Mapping):
+            return dict(obj)
+        
+        # Handle pandas Timestamp
+        if isinstance(obj, pd.Timestamp):
+            return obj.isoformat()
+            
+        # Handle numpy arrays
+        if isinstance(obj, np.ndarray):
+            return obj.tolist()
+            
+        # Handle numpy scalar types (ints, floats, datetime64, bools)
+        if isinstance(obj, np.datetime64):
+            return pd.Timestamp(obj).isoformat()
+        if isinstance(obj, np.generic):
+            return obj.item()
+            
+        # Let the base class handle other types or raise TypeError
+        return super().default(obj)
+
+def _columnar_path(client_id, dataset_name):
+    """Relative path (inside the data directory) of a dataset's columnar side file."""
+    safe_name = re.sub(r'[^\w.-]', '_', str(dataset_name))
+    return os.path.join(client_id, f"{safe_name}.npz")
+
+def write_columnar_dataset(file_path, dataset=None, raw_df=None):
+    """
+    Write a daily cash balance dataset and/or its raw rows to an .npz file.
+    
+    Arrays are stored with their native types (datetime64 dates, float64
+    balances, account names as an index + integer codes) so reading them back
+    is a bulk array load rather than JSON parsing.
+    
+    Parameters:
+    - file_path: Destination .npz file
+    - dataset: Processed dataset with dates, accounts, account_data and total_balance
+    - raw_df: Raw DataFrame with Date, Account and Balance columns
+    """
+    arrays = {}
+    if dataset is not None:
+        accounts = [str(account) for account in dataset['accounts']]
+        n_dates = len(dataset['dates'])
+        arrays['dates'] = pd.to_datetime(pd.Series(dataset['dates'])).to_numpy(dtype='datetime64[ns]')
+        arrays['accounts'] = np.array(accounts, dtype=str)
+        if accounts:
+            arrays['balances'] = np.column_stack([
+                np.asarray(dataset['account_data'][account], dtype=np.float64)
+                for account in dataset['accounts']
+            ])
+        else:
+            arrays['balances'] = np.empty((n_dates, 0), dtype=np.float64)
+        arrays['total_balance'] = np.asarray(dataset['total_balance'], dtype=np.float64)
+    
+    if raw_df is not None:
+        account_codes, account_names = pd.factorize(raw_df['Account'].astype(str))
+        arrays['raw_dates'] = pd.to_datetime(raw_df['Date']).to_numpy(dtype='datetime64[ns]')
+        arrays['raw_account_codes'] = account_codes.astype(np.int32)
+        arrays['raw_account_names'] = np.array(list(account_names), dtype=str)
+        arrays['raw_balance'] = pd.to_numeric(raw_df['Balance'], errors='coerce').to_numpy(dtype=np.float64)
+    
+    # Write to a temp file first so an interrupted save never corrupts the old file
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    tmp_path = file_path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, file_path)
+
+def read_columnar_dataset(file_path):
+    """
+    Read an .npz file written by write_columnar_dataset.
+    
+    Returns:
+    - Tuple (dataset_arrays, raw_df); either may be None if it wasn't stored.
+      dataset_arrays has the dates/accounts/account_data/total_balance keys.
+    """
+    dataset_arrays = None
+    raw_df = None
+    with np.load(file_path, allow_pickle=False) as npz:
+        if 'dates' in npz.files:
+            accounts = npz['accounts'].tolist()
+            balances = npz['balances']
+            dataset_arrays = {
+                'dates': pd.Series(npz['dates'], name='Date'),
+                'accounts': accounts,
+                'account_data': {account: balances[:, i] for i, account in enumerate(accounts)},
+                'total_balance': npz['total_balance']
+            }
+        if 'raw_dates' in npz.files:
+            raw_df = pd.DataFrame({
+                'Date': npz['raw_dates'],
+                'Account': pd.Categorical.from_codes(npz['raw_account_codes'],
+                                                     categories=npz['raw_account_names'].tolist()),
+                'Balance': npz['raw_balance']
+            })
+    return dataset_arrays, raw_df
+
+def typed_raw_frame(df):
+    """Return the Date/Account/Balance columns with datetime64, category and float64 types."""
+    return pd.DataFrame({
+        'Date': pd.to_datetime(df['Date']),
+        'Account': df['Account'].astype('category'),
+        'Balance': pd.to_numeric(df['Balance'], errors='coerce').astype(np.float64)
+    }).reset_index(drop=True)
+
+
+def _date_strings(values):
+    """Convert dates to the ISO strings used as SQLite keys (sortable as text)."""
+    seconds = pd.to_datetime(pd.Series(values)).to_numpy(dtype='datetime64[s]')
+    return np.datetime_as_string(seconds, unit='s')
+
+class JSONFileStorage:
+    """
+    Stores each client as a JSON file in a directory, indexed by a manifest.
+    
+    The manifest (client id, name, dataset names, file size and mtime) lets
+    the manager list clients at startup without opening every client file.
+    With columnar=True, daily cash balance arrays and raw rows are written to
+    .npz side files referenced from the client JSON.
+    """
+    
+    def __init__(self, directory="client_data", columnar=False):
+        self.directory = directory
+        self.columnar = columnar
+        self.manifest = {}
+    
+    def index_clients(self):
+        """
+        Index the client data files in the directory.
+        
+        Reads the manifest and only scans client files that are new or changed
+        since it was written - for their name and dataset names, not their
+        data - so rebuilding a missing manifest doesn't load every client.
+        
+        Returns:
+        - Tuple (index, preloaded): index maps client_id -> {'name', 'datasets'};
+          preloaded is always empty here (bodies are loaded on first access)
+        """
+        if not os.path.exists(self.directory):
+            return {}, {}
+        
+        manifest = self._read_manifest()
+        seen = set()
+        refreshed = 0
+        
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                filename = entry.name
+                if not filename.endswith(".json") or filename == MANIFEST_FILENAME:
+                    continue
+                client_id = filename[:-5]  # Remove .json extension
+                seen.add(client_id)
+                try:
+                    stat = entry.stat()
+                    known = manifest.get(client_id)
+                    if (known and known.get('size') == stat.st_size
+                            and known.get('mtime') == stat.st_mtime_ns):
+                        # Unchanged since the manifest was written
+                        self.manifest[client_id] = known
+                        continue
+                    
+                    # New or modified file - scan its header to refresh its entry
+                    self.manifest[client_id] = self._manifest_entry(self._read_header(entry.path), filename, stat)
+                    refreshed += 1
+                except Exception as e:
+                    print(f"Error indexing client data from {filename}: {e}")
+        
+        if refreshed or set(manifest) != seen:
+            self.flush()
+        print(f"Indexed {len(self.manifest)} clients ({refreshed} refreshed from disk)")
+        return self.list_clients(), {}
+    
+    def list_clients(self):
+        """Return client_id -> {'name': ..., 'datasets': [...]} from the manifest."""
+        return {client_id: {'name': entry.get('name'), 'datasets': list(entry.get('datasets', []))}
+                for client_id, entry in self.manifest.items()}
+    
+    def client_path(self, client_id):
+        """Path of a client's JSON file, as recorded in the manifest."""
+        entry = self.manifest.get(client_id, {})
+        return os.path.join(self.directory, entry.get('file', f"{client_id}.json"))
+    
+    def load_client(self, client_id):
+        """Load a client body from disk."""
+        return self.read_client(self.client_path(client_id))
+    
+    def read_client(self, file_path):
+        """
+        Load a client body from a given file, without using or touching the
+        manifest (e.g. in batch workers that were handed the path).
+        """
+        with open(file_path, 'r') as f:
+            client_data = json.load(f)
+        print(f"Loaded client data from {file_path}")
+        return self._restore_client(client_data)
+    
+    def save_client(self, client_id, client_data, changed=(), rewrite_all=False):
+        """
+        Write a client to its JSON file (and side files in columnar mode).
+        
+        Parameters:
+        - client_id: Client to write
+        - client_data: The client dict
+        - changed: Names of datasets that changed since the last save
+        - rewrite_all: Rewrite every side file, not just the changed ones
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        payload = self._client_payload(client_id, client_data, changed, rewrite_all)
+        file_path = os.path.join(self.directory, f"{client_id}.json")
+        # Write to a temporary file first so a failed save leaves the old file intact
+        tmp_path = file_path + ".tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(payload, f, indent=4, cls=PandasJSONEncoder)
+            os.replace(tmp_path, file_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self.manifest[client_id] = self._manifest_entry(client_data, f"{client_id}.json", os.stat(file_path))
+        return file_path
+    
+    def flush(self):
+        """Write the manifest atomically so a crash never leaves a half-written index."""
+        manifest_path = os.path.join(self.directory, MANIFEST_FILENAME)
+        # Per-process temporary name, so two processes flushing at once can't
+        # write into (or replace the manifest with) each other's half-written file
+        tmp_path = f"{manifest_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump({'version': 1, 'clients': self.manifest}, f)
+            os.replace(tmp_path, manifest_path)
+        except Exception as e:
+            print(f"Error writing client manifest: {e}")
+    
+    def query_balances(self, client_id, dataset_name, accounts=None, start=None, end=None):
+        """JSON files have no index to query - returns None so the caller filters in memory."""
+        return None
+    
+    def _manifest_entry(self, client_data, filename, stat):
+        """Build the manifest entry for a client file."""
+        return {
+            'file': filename,
+            'name': client_data.get('name'),
+            'datasets': list(client_data.get('datasets', {}).keys()),
+            'size': stat.st_size,
+            'mtime': stat.st_mtime_ns
+        }
+    
+    def _read_header(self, file_path):
+        """
+        Read a client file's name and dataset names without loading its data.
+        
+        Client files are written with indent=4, so top-level keys start at four
+        spaces and dataset names at eight; the file is scanned line by line and
+        only those keys are kept. A file in any other layout is parsed in full
+        and everything but the header is dropped.
+        
+        Returns:
+        - Dict with 'name' and 'datasets' (dataset name -> None)
+        """
+        decoder = json.JSONDecoder()
+        name, datasets, in_datasets = None, None, False
+        with open(file_path, 'r') as f:
+            if f.readline().rstrip() == '{':
+                for line in f:
+                    if line.startswith('    "'):
+                        # Top-level key: "name": "...", or "datasets": {
+                        key, end = decoder.raw_decode(line, 4)
+                        value = line[end:].strip()[1:].strip().rstrip(',')
+                        if key == 'name':
+                            name = json.loads(value)
+                        elif key == 'datasets':
+                            datasets = {}
+                            in_datasets = value == '{'
+                    elif in_datasets and line.startswith('        "'):
+                        datasets[decoder.raw_decode(line, 8)[0]] = None
+                    elif in_datasets and line.rstrip().rstrip(',') == '    }':
+                        in_datasets = False
+                    if name is not None and datasets is not None and not in_datasets:
+                        break  # the rest is raw data and other keys
+        
+        if datasets is None or in_datasets:
+            with open(file_path, 'r') as f:
+                client_data = json.load(f)
+            return {'name': client_data.get('name'), 'datasets': dict.fromkeys(client_data.get('datasets', {}))}
+        return {'name': name, 'datasets': datasets}
+    
+    def _read_manifest(self):
+        """Read the manifest file, returning an empty index if it is missing or corrupt."""
+        manifest_path = os.path.join(self.directory, MANIFEST_FILENAME)
+        if not os.path.exists(manifest_path):
+            return {}
+        try:
+            with open(manifest_path, 'r') as f:
+                return json.load(f).get('clients', {})
+        except Exception as e:
+            print(f"Error reading client manifest, rebuilding it: {e}")
+            return {}
+    
+    def _restore_client(self, client_data):
+        """
+        Turn a client dict read from JSON back into its in-memory form.
+        
+        Columnar side-file references are read back as arrays, and daily cash
+        balance datasets stored inline as JSON lists get their dates and
+        balances converted back to datetime/float arrays.
+        """
+        raw_data = client_data.get('raw_data', {})
+        for dataset_name, raw in list(raw_data.items()):
+            try:
+                if isinstance(raw, dict) and '_columnar' in raw:
+                    _, raw_df = read_columnar_dataset(os.path.join(self.directory, raw['_columnar']))
+                    raw_data[dataset_name] = raw_df
+                elif isinstance(raw, list):
+                    raw_data[dataset_name] = typed_raw_frame(pd.DataFrame(raw, columns=['Date', 'Account', 'Balance']))
+            except Exception as e:
+                print(f"Error restoring raw data for {dataset_name}: {e}")
+        
+        for dataset_name, dataset in client_data.get('datasets', {}).items():
+            try:
+                if '_columnar' in dataset:
+                    arrays, _ = read_columnar_dataset(os.path.join(self.directory, dataset.pop('_columnar')))
+                    dataset.update(arrays)
+                elif 'dates' in dataset and isinstance(dataset['dates'], list):
+                    dataset['dates'] = pd.Series(pd.to_datetime(dataset['dates']), name='Date')
+                    dataset['account_data'] = {account: np.asarray(values, dtype=np.float64)
+                                               for account, values in dataset.get('account_data', {}).items()}
+                    dataset['total_balance'] = np.asarray(dataset.get('total_balance', []), dtype=np.float64)
+            except Exception as e:
+                print(f"Error restoring dataset {dataset_name}: {e}")
+        return client_data
+    
+    def _client_payload(self, client_id, client_data, changed, rewrite_all):
+        """
+        Build the dict that gets written to a client's JSON file.
+        
+        In columnar mode the bulk arrays of daily cash balance datasets and raw
+        data are written to .npz side files (only for changed datasets, unless
+        rewrite_all is set) and replaced by references in the JSON.
+        """
+        if not self.columnar:
+            return client_data
+        
+        raw_data = client_data.get('raw_data', {})
+        payload = dict(client_data)
+        payload['datasets'] = dict(client_data.get('datasets', {}))
+        payload['raw_data'] = dict(raw_data)
+        
+        names = set(raw_data) | {name for name, dataset in payload['datasets'].items() if 'dates' in dataset}
+        for dataset_name in names:
+            rel_path = _columnar_path(client_id, dataset_name)
+            file_path = os.path.join(self.directory, rel_path)
+            dataset = payload['datasets'].get(dataset_name)
+            if dataset is not None and 'dates' not in dataset:
+                dataset = None
+            raw_df = raw_data.get(dataset_name)
+            if raw_df is not None and not isinstance(raw_df, pd.DataFrame):
+                raw_df = typed_raw_frame(pd.DataFrame(raw_df))
+            
+            if rewrite_all or dataset_name in changed or not os.path.exists(file_path):
+                write_columnar_dataset(file_path, dataset, raw_df)
+            
+            if dataset is not None:
+                meta = {key: value for key, value in dataset.items() if key not in DAILY_ARRAY_KEYS}
+                meta['_columnar'] = rel_path
+                payload['datasets'][dataset_name] = meta
+            if raw_df is not None:
+                payload['raw_data'][dataset_name] = {'_columnar': rel_path}
+        
+        if not payload['raw_data']:
+            del payload['raw_data']
+        return payload
+
+class SQLiteStorage:
+    """
+    Stores all clients in a local SQLite database.
+    
+    Daily cash balances are kept one row per (client, dataset, account, date)
+    with indexes on those columns, so range queries such as "account X between
+    two dates" are answered by the database without loading the dataset.
+    Monthly income/expense datasets are stored as JSON in the datasets table.
+    """
+    
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS clients (
+        client_id TEXT PRIMARY KEY,
+        name TEXT,
+        extra TEXT
+    );
+    CREATE TABLE IF NOT EXISTS datasets (
+        client_id TEXT NOT NULL,
+        dataset_name TEXT NOT NULL,
+        position INTEGER,
+        kind TEXT NOT NULL,
+        meta TEXT,
+        PRIMARY KEY (client_id, dataset_name)
+    );
+    CREATE TABLE IF NOT EXISTS balances (
+        client_id TEXT NOT NULL,
+        dataset_name TEXT NOT NULL,
+        account TEXT NOT NULL,
+        date TEXT NOT NULL,
+        balance REAL
+    );
+    CREATE INDEX IF NOT EXISTS idx_balances_account_date
+        ON balances (client_id, dataset_name, account, date);
+    CREATE INDEX IF NOT EXISTS idx_balances_date
+        ON balances (client_id, dataset_name, date);
+    CREATE TABLE IF NOT EXISTS daily_totals (
+        client_id TEXT NOT NULL,
+        dataset_name TEXT NOT NULL,
+        date TEXT NOT NULL,
+        total REAL,
+        PRIMARY KEY (client_id, dataset_name, date)
+    );
+    CREATE TABLE IF NOT EXISTS raw_balances (
+        client_id TEXT NOT NULL,
+        dataset_name TEXT NOT NULL,
+        seq INTEGER NOT NULL,
+        date TEXT,
+        account TEXT,
+        balance REAL
+    );
+    CREATE INDEX IF NOT EXISTS idx_raw_balances
+        ON raw_balances (client_id, dataset_name, seq);
+    """
+    
+    def __init__(self, path=os.path.join("client_data", "clients.db")):
+        """
+        Parameters:
+        - path: SQLite database file (created if it doesn't exist)
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript(self.SCHEMA)
+    
+    def index_clients(self):
+        """Return (index, preloaded) like JSONFileStorage; nothing needs preloading here."""
+        index = self.list_clients()
+        print(f"Indexed {len(index)} clients from {self.path}")
+        return index, {}
+    
+    def list_clients(self):
+        """Return client_id -> {'name': ..., 'datasets': [...]} without loading any data."""
+        clients = {}
+        for client_id, name in self.conn.execute("SELECT client_id, name FROM clients"):
+            clients[client_id] = {'name': name, 'datasets': []}
+        rows = self.conn.execute("SELECT client_id, dataset_name FROM datasets ORDER BY client_id, position")
+        for client_id, dataset_name in rows:
+            if client_id in clients:
+                clients[client_id]['datasets'].append(dataset_name)
+        return clients
+    
+    def load_client(self, client_id):
+        """Load a client and all of its datasets from the database."""
+        row = self.conn.execute("SELECT name, extra FROM clients WHERE client_id = ?",
+                                (client_id,)).fetchone()
+        if row is None:
+            raise KeyError(client_id)
+        name, extra = row
+        client_data = json.loads(extra) if extra else {}
+        client_data['name'] = name
+        client_data['datasets'] = {}
+        
+        rows = self.conn.execute(
+            "SELECT dataset_name, kind, meta FROM datasets WHERE client_id = ? ORDER BY position",
+            (client_id,)).fetchall()
+        for dataset_name, kind, meta in rows:
+            dataset = json.loads(meta) if meta else {}
+            if kind == 'daily':
+                accounts = dataset.pop('_accounts', [])
+                dataset.update(self._load_daily_arrays(client_id, dataset_name, accounts))
+            client_data['datasets'][dataset_name] = dataset
+        
+        raw_names = [r[0] for r in self.conn.execute(
+            "SELECT DISTINCT dataset_name FROM raw_balances WHERE client_id = ?", (client_id,))]
+        if raw_names:
+            client_data['raw_data'] = {}
+            for dataset_name in raw_names:
+                rows = self.conn.execute(
+                    "SELECT date, account, balance FROM raw_balances "
+                    "WHERE client_id = ? AND dataset_name = ? ORDER BY seq",
+                    (client_id, dataset_name)).fetchall()
+                raw_df = pd.DataFrame(rows, columns=['Date', 'Account', 'Balance'])
+                client_data['raw_data'][dataset_name] = typed_raw_frame(raw_df)
+        
+        print(f"Loaded client data for {client_id} from {self.path}")
+        return client_data
+    
+    def save_client(self, client_id, client_data, changed=(), rewrite_all=False):
+        """
+        Write a client to the database in one transaction.
+        
+        Parameters:
+        - client_id: Client to write
+        - client_data: The client dict
+        - changed: Names of datasets that changed since the last save
+        - rewrite_all: Rewrite every dataset, not just the changed ones
+        """
+        datasets = client_data.get('datasets', {})
+        raw_data = client_data.get('raw_data', {})
+        extra = {key: value for key, value in client_data.items()
+                 if key not in ('name', 'datasets', 'raw_data')}
+        
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO clients (client_id, name, extra) VALUES (?, ?, ?)",
+                (client_id, client_data.get('name', client_id), json.dumps(extra, cls=PandasJSONEncoder)))
+            
+            stored = {r[0] for r in self.conn.execute(
+                "SELECT dataset_name FROM datasets WHERE client_id = ?", (client_id,))}
+            stored_raw = {r[0] for r in self.conn.execute(
+                "SELECT DISTINCT dataset_name FROM raw_balances WHERE client_id = ?", (client_id,))}
+            
+            # Drop datasets that no longer exist in memory
+            for dataset_name in stored - set(datasets):
+                self._delete_dataset(client_id, dataset_name)
+            for dataset_name in stored_raw - set(raw_data):
+                self.conn.execute("DELETE FROM raw_balances WHERE client_id = ? AND dataset_name = ?",
+                                  (client_id, dataset_name))
+            
+            for position, (dataset_name, dataset) in enumerate(datasets.items()):
+                if rewrite_all or dataset_name in changed or dataset_name not in stored:
+                    self._write_dataset(client_id, dataset_name, position, dataset)
+            
+            for dataset_name, raw_df in raw_data.items():
+                if rewrite_all or dataset_name in changed or dataset_name not in stored_raw:
+                    self._write_raw(client_id, dataset_name, raw_df)
+        return self.path
+    
+    def flush(self):
+        """Nothing to do - every save_client call commits its own transaction."""
+        pass
+    
+    def query_balances(self, client_id, dataset_name, accounts=None, start=None, end=None):
+        """
+        Query daily balances through the (client, dataset, account, date) index.
+        
+        Parameters:
+        - client_id, dataset_name: Dataset to query
+        - accounts: Optional account name or list of account names
+        - start, end: Optional inclusive date bounds (anything pandas can parse)
+        
+        Returns:
+        - DataFrame with Date, Account, Balance columns sorted by date, or None
+          if the dataset isn't a daily dataset stored in this database
+        """
+        row = self.conn.execute("SELECT kind FROM datasets WHERE client_id = ? AND dataset_name = ?",
+                                (client_id, dataset_name)).fetchone()
+        if row is None or row[0] != 'daily':
+            return None
+        
+        sql = "SELECT date, account, balance FROM balances WHERE client_id = ? AND dataset_name = ?"
+        params = [client_id, dataset_name]
+        if accounts is not None:
+            if isinstance(accounts, str):
+                accounts = [accounts]
+            accounts = [str(account) for account in accounts]
+            sql += f" AND account IN ({', '.join('?' * len(accounts))})"
+            params.extend(accounts)
+        if start is not None:
+            sql += " AND date >= ?"
+            params.append(_date_strings([start])[0])
+        if end is not None:
+            sql += " AND date <= ?"
+            params.append(_date_strings([end])[0])
+        sql += " ORDER BY date, account"
+        
+        rows = self.conn.execute(sql, params).fetchall()
+        result = pd.DataFrame(rows, columns=['Date', 'Account', 'Balance'])
+        result['Date'] = pd.to_datetime(result['Date'])
+        result['Balance'] = result['Balance'].astype(np.float64)
+        return result
+    
+    def _delete_dataset(self, client_id, dataset_name):
+        """Remove a dataset and its balance rows."""
+        for table in ('datasets', 'balances', 'daily_totals'):
+            self.conn.execute(f"DELETE FROM {table} WHERE client_id = ? AND dataset_name = ?",
+                              (client_id, dataset_name))
+    
+    def _write_dataset(self, client_id, dataset_name, position, dataset):
+        """Write one dataset; daily datasets go to the indexed balances table."""
+        self._delete_dataset(client_id, dataset_name)
+        
+        if 'dates' not in dataset:
+            # Monthly income/expense data is small - keep it as JSON
+            self.conn.execute(
+                "INSERT INTO datasets (client_id, dataset_name, position, kind, meta) VALUES (?, ?, ?, ?, ?)",
+                (client_id, dataset_name, position, 'monthly', json.dumps(dataset, cls=PandasJSONEncoder)))
+            return
+        
+        accounts = list(dataset['accounts'])
+        meta = {key: value for key, value in dataset.items() if key not in DAILY_ARRAY_KEYS}
+        meta['_accounts'] = [str(account) for account in accounts]
+        self.conn.execute(
+            "INSERT INTO datasets (client_id, dataset_name, position, kind, meta) VALUES (?, ?, ?, ?, ?)",
+            (client_id, dataset_name, position, 'daily', json.dumps(meta, cls=PandasJSONEncoder)))
+        
+        dates = _date_strings(dataset['dates'])
+        for account in accounts:
+            values = np.asarray(dataset['account_data'][account], dtype=np.float64)
+            present = ~np.isnan(values)
+            self.conn.executemany(
+                "INSERT INTO balances (client_id, dataset_name, account, date, balance) VALUES (?, ?, ?, ?, ?)",
+                ((client_id, dataset_name, str(account), d, v)
+                 for d, v in zip(dates[present].tolist(), values[present].tolist())))
+        
+        totals = np.asarray(dataset['total_balance'], dtype=np.float64)
+        self.conn.executemany(
+            "INSERT INTO daily_totals (client_id, dataset_name, date, total) VALUES (?, ?, ?, ?)",
+            ((client_id, dataset_name, d, t) for d, t in zip(dates.tolist(), totals.tolist())))
+    
+    def _write_raw(self, client_id, dataset_name, raw_df):
+        """Replace the raw rows stored for a dataset."""
+        self.conn.execute("DELETE FROM raw_balances WHERE client_id = ? AND dataset_name = ?",
+                          (client_id, dataset_name))
+        if not isinstance(raw_df, pd.DataFrame):
+            raw_df = typed_raw_frame(pd.DataFrame(raw_df))
+        dates = _date_strings(raw_df['Date'])
+        accounts = raw_df['Account'].astype(str).tolist()
+        balances = pd.to_numeric(raw_df['Balance'], errors='coerce').tolist()
+        self.conn.executemany(
+            "INSERT INTO raw_balances (client_id, dataset_name, seq, date, account, balance) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            ((client_id, dataset_name, seq, d, a, b)
+             for seq, (d, a, b) in enumerate(zip(dates.tolist(), accounts, balances))))
+    
+    def _load_daily_arrays(self, client_id, dataset_name, accounts):
+        """Rebuild the dates/account_data/total_balance arrays of a daily dataset."""
+        totals = self.conn.execute(
+            "SELECT date, total FROM daily_totals WHERE client_id = ? AND dataset_name = ? ORDER BY date",
+            (client_id, dataset_name)).fetchall()
+        date_keys = np.array([row[0] for row in totals], dtype=str)
+        total_balance = np.array([row[1] for row in totals], dtype=np.float64)
+        
+        rows = self.conn.execute(
+            "SELECT date, account, balance FROM balances WHERE client_id = ? AND dataset_name = ?",
+            (client_id, dataset_name)).fetchall()
+        balances = np.full((len(date_keys), len(accounts)), np.nan)
+        if rows:
+            row_dates, row_accounts, row_values = zip(*rows)
+            account_index = {account: i for i, account in enumerate(accounts)}
+            date_idx = np.searchsorted(date_keys, np.array(row_dates, dtype=str))
+            account_idx = np.array([account_index[account] for account in row_accounts])
+            balances[date_idx, account_idx] = np.array(row_values, dtype=np.float64)
+        
+        return {
+            'dates': pd.Series(pd.to_datetime(date_keys), name='Date'),
+            'accounts': list(accounts),
+            'account_data': {account: balances[:, i] for i, account in enumerate(accounts)},
+            'total_balance': total_balance
+        }
@@ -0,0 +1,168 @@
+# test_daily_cash_updates.py
+# Checks that the incremental daily cash balance paths (append, edited rows) give
+# the same dataset as loading all of the data again
+# (run with pytest, or directly: python test_daily_cash_updates.py)
+
+import tempfile
+import numpy as np
+import pandas as pd
+from data_loader import FinancialDataManager
+
+def make_manager():
+    data_mgr = FinancialDataManager(data_dir=tempfile.mkdtemp())
+    data_mgr.add_client("test", "Test")
+    data_mgr.current_client = "test"
+    return data_mgr
+
+def balance_rows(start, days, accounts=("Checking", "Savings", "Credit Card")):
+    """Daily rows for a few accounts, with some days missing for some accounts."""
+    rows = []
+    for i, day in enumerate(pd.date_range(start, periods=days)):
+        for j, account in enumerate(accounts):
+            if (i + j) % 4 == 3:
+                continue  # a gap, filled from the previous day
+            rows.append([day.strftime("%Y-%m-%d"), account, 1000.0 * (j + 1) + 25.5 * i - 300 * j])
+    return pd.DataFrame(rows, columns=["Date", "Account", "Balance"])
+
+def full_reload(df):
+    """The reference: the whole data loaded in one go."""
+    return make_manager().load_daily_cash_balance_data(df, "cash")
+
+def assert_same_dataset(actual, expected):
+    """Same days, accounts and balances (account order may differ)."""
+    assert pd.Series(actual['dates']).tolist() == pd.Series(expected['dates']).tolist()
+    assert sorted(actual['accounts']) == sorted(expected['accounts'])
+    for account in expected['accounts']:
+        np.testing.assert_allclose(actual['account_data'][account], expected['account_data'][account],
+                                   err_msg=account)
+    np.testing.assert_allclose(actual['total_balance'], expected['total_balance'])
+
+def test_append_after_last_day():
+    history = balance_rows("2024-01-01", 30)
+    new_days = balance_rows("2024-01-31", 5)
+    
+    data_mgr = make_manager()
+    data_mgr.load_daily_cash_balance_data(history, "cash")
+    dataset = data_mgr.append_daily_cash_balance_data(new_days, "cash")
+    
+    assert_same_dataset(dataset, full_reload(pd.concat([history, new_days], ignore_index=True)))
+
+def test_append_new_account():
+    history = balance_rows("2024-01-01", 10)
+    new_days = balance_rows("2024-01-11", 3, accounts=("Checking", "Brokerage"))
+    
+    data_mgr = make_manager()
+    data_mgr.load_daily_cash_balance_data(history, "cash")
+    dataset = data_mgr.append_daily_cash_balance_data(new_days, "cash")
+    
+    assert "Brokerage" in dataset['accounts']
+    assert_same_dataset(dataset, full_reload(pd.concat([history, new_days], ignore_index=True)))
+
+def test_append_corrects_existing_days():
+    history = balance_rows("2024-01-01", 20)
+    corrections = pd.DataFrame([["2024-01-05", "Checking", -750.0],
+                                ["2024-01-21", "Savings", 4321.0]],
+                               columns=["Date", "Account", "Balance"])
+    
+    data_mgr = make_manager()
+    data_mgr.load_daily_cash_balance_data(history, "cash")
+    dataset = data_mgr.append_daily_cash_balance_data(corrections, "cash")
+    
+    # A correction replaces the old balance of that account on that day
+    key = ["Date", "Account"]
+    replaced = history.merge(corrections[key], on=key, how="left", indicator=True)["_merge"] == "both"
+    merged = pd.concat([history[~replaced.to_numpy()], corrections], ignore_index=True)
+    assert_same_dataset(dataset, full_reload(merged))
+
+def test_repeated_appends():
+    """A run of one-day appends matches a full load, in memory and after saving."""
+    history = balance_rows("2024-01-01", 10)
+    data_mgr = make_manager()
+    data_mgr.load_daily_cash_balance_data(history, "cash")
+    
+    frames = [history]
+    for day in pd.date_range("2024-01-11", periods=6):
+        frames.append(balance_rows(day, 1))
+        dataset = data_mgr.append_daily_cash_balance_data(frames[-1], "cash")
+    
+    expected = full_reload(pd.concat(frames, ignore_index=True))
+    assert_same_dataset(dataset, expected)
+    assert len(data_mgr.clients["test"]["raw_data"]["cash"]) == sum(len(frame) for frame in frames)
+    
+    assert data_mgr.save_data()
+    reloaded = FinancialDataManager(data_dir=data_mgr.data_dir)
+    assert_same_dataset(reloaded.clients["test"]["datasets"]["cash"], expected)
+
+def test_update_edited_balances():
+    df = balance_rows("2024-01-01", 40)
+    edited = df.copy()
+    rows = [3, 17, 60]
+    edited.loc[rows, "Balance"] = [-5000.0, 0.0, 123456.78]
+    
+    data_mgr = make_manager()
+    data_mgr.load_daily_cash_balance_data(df, "cash")
+    dataset, changed = data_mgr.update_daily_cash_balances("cash", df.iloc[rows], edited.iloc[rows])
+    
+    assert changed is not None
+    assert set(changed) == set(df.loc[rows, "Account"])
+    assert_same_dataset(dataset, full_reload(edited))
+
+def test_update_with_duplicate_rows():
+    """Two rows for the same account and day are summed, before and after the edit."""
+    df = balance_rows("2024-01-01", 10)
+    df = pd.concat([df, pd.DataFrame([["2024-01-02", "Checking", 50.0]], columns=df.columns)],
+                   ignore_index=True)
+    edited = df.copy()
+    last = len(df) - 1
+    edited.loc[last, "Balance"] = 75.0
+    
+    data_mgr = make_manager()
+    data_mgr.load_daily_cash_balance_data(df, "cash")
+    dataset, changed = data_mgr.update_daily_cash_balances("cash", df.iloc[[last]], edited.iloc[[last]])
+    
+    assert changed is not None
+    assert_same_dataset(dataset, full_reload(edited))
+
+def test_update_moved_row_rebuilds():
+    df = balance_rows("2024-01-01", 10)
+    edited = df.copy()
+    edited.loc[4, "Date"] = "2024-01-09"
+    edited.loc[5, "Account"] = "Savings"
+    rows = [4, 5]
+    
+    data_mgr = make_manager()
+    data_mgr.load_daily_cash_balance_data(df, "cash")
+    dataset, changed = data_mgr.update_daily_cash_balances("cash", df.iloc[rows], edited.iloc[rows])
+    
+    assert changed is None  # rebuilt from the raw rows
+    assert_same_dataset(dataset, full_reload(edited))
+
+def test_update_after_append():
+    """Rows that were just appended can be edited, and appending still works afterwards."""
+    history = balance_rows("2024-01-01", 10)
+    new_days = balance_rows("2024-01-11", 3)
+    more_days = balance_rows("2024-01-14", 2)
+    
+    data_mgr = make_manager()
+    data_mgr.load_daily_cash_balance_data(history, "cash")
+    data_mgr.append_daily_cash_balance_data(new_days, "cash")
+    edited = new_days.copy()
+    edited.loc[1, "Balance"] = -42.0
+    assert data_mgr.update_daily_cash_balances("cash", new_days.iloc[[1]], edited.iloc[[1]]) is not None
+    dataset = data_mgr.append_daily_cash_balance_data(more_days, "cash")
+    
+    assert_same_dataset(dataset, full_reload(pd.concat([history, edited, more_days], ignore_index=True)))
+
+def test_update_unmatched_rows():
+    df = balance_rows("2024-01-01", 10)
+    stranger = pd.DataFrame([["2023-06-01", "Checking", 1.0]], columns=df.columns)
+    
+    data_mgr = make_manager()
+    data_mgr.load_daily_cash_balance_data(df, "cash")
+    assert data_mgr.update_daily_cash_balances("cash", stranger, stranger.assign(Balance=2.0)) is None
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name}: ok")
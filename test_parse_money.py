@@ -0,0 +1,89 @@
+# test_parse_money.py
+# Checks the money parser against the formats people paste from spreadsheets
+# (run with pytest, or directly: python test_parse_money.py)
+
+import numpy as np
+import pandas as pd
+from money import parse_money
+
+# Cell text -> expected amount (None means the cell should be flagged invalid)
+CASES = [
+    # Plain numbers
+    ("1234.56", 1234.56),
+    (" 42 ", 42.0),
+    ("+5", 5.0),
+    ("0.5", 0.5),
+    ("1e3", 1000.0),
+    # Thousands separators
+    ("1,234", 1234.0),
+    ("1,234.56", 1234.56),
+    ("1,234,567", 1234567.0),
+    ("1 234,56", 1234.56),
+    # Currency symbols
+    ("$1,234", 1234.0),
+    ("£ 99", 99.0),
+    ("¥1000", 1000.0),
+    # Negatives
+    ("-$5", -5.0),
+    ("$-5", -5.0),
+    ("(1,234.56)", -1234.56),
+    ("1,234.56-", -1234.56),
+    # European formatting (comma as the decimal separator)
+    ("€1.234,56", 1234.56),
+    ("1.234.567,89", 1234567.89),
+    ("12,5", 12.5),
+    # Empty cells
+    ("", 0.0),
+    ("-", 0.0),
+    ("nan", 0.0),
+    ("—", 0.0),
+    # Not amounts
+    ("abc", None),
+    ("5%", None),
+]
+
+def test_text_cells():
+    """Every format in CASES parses to its amount (or is flagged invalid)."""
+    amounts, invalid = parse_money([text for text, _ in CASES])
+    for (text, expected), amount, bad in zip(CASES, amounts, invalid):
+        if expected is None:
+            assert bad and np.isnan(amount), f"{text!r} should be invalid, got {amount}"
+        else:
+            assert not bad, f"{text!r} was flagged invalid"
+            assert amount == expected, f"{text!r} parsed as {amount}, expected {expected}"
+
+def test_empty_value():
+    """Empty cells get empty_value and aren't flagged; bad cells still are."""
+    amounts, invalid = parse_money(["", "-", None, "x"], empty_value=np.nan)
+    assert np.isnan(amounts).all()
+    assert invalid.tolist() == [False, False, False, True]
+
+def test_numeric_input_passes_through():
+    """Numeric arrays aren't cleaned, only their missing values replaced."""
+    amounts, invalid = parse_money(np.array([1.5, np.nan, -3.0]))
+    assert amounts.tolist() == [1.5, 0.0, -3.0]
+    assert not invalid.any()
+    
+    amounts, invalid = parse_money([7, 3])
+    assert amounts.dtype == np.float64 and amounts.tolist() == [7.0, 3.0]
+
+def test_mixed_objects():
+    """Numbers, None and NaN mixed in with text (as read from Excel)."""
+    amounts, invalid = parse_money([7, 3.5, None, np.nan, "$1,000"])
+    assert amounts.tolist() == [7.0, 3.5, 0.0, 0.0, 1000.0]
+    assert not invalid.any()
+
+def test_table_keeps_its_shape():
+    """A whole DataFrame is parsed at once and comes back with the same shape."""
+    table = pd.DataFrame({"Income": ["$1,000", "(50)"], "Rent": ["200", "oops"]})
+    amounts, invalid = parse_money(table)
+    assert amounts.shape == (2, 2)
+    assert amounts[0].tolist() == [1000.0, 200.0]
+    assert amounts[1, 0] == -50.0
+    assert invalid.tolist() == [[False, False], [False, True]]
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name}: ok")
@@ -0,0 +1,99 @@
+# test_sniff_table.py
+# Checks layout detection of pasted tables (delimiter, orientation, Type row, daily data)
+# (run with pytest, or directly: python test_sniff_table.py)
+
+import os
+import tempfile
+from data_loader import FinancialDataManager, read_sniffed_csv, sniff_table
+
+# (paste, delimiter, orientation, shape)
+CASES = [
+    # One month per row, with ordinary category names - some start like a month
+    ("Month\tIncome\tMarketing\tPayroll\nJan'24\t1000\t200\t300\nFeb'24\t1100\t250\t320\n",
+     '\t', 'rows', 'monthly'),
+    ("Month\tIncome\tDecor\tJunk\tOctane\nJan'24\t1000\t1\t2\t3\n",
+     '\t', 'rows', 'monthly'),
+    ("Month;Income;Rent;Food\nJan 2024;1000;200;300\n",
+     ';', 'rows', 'monthly'),
+    ("Month,Income,Marketing\nJan'24,1000,200\n",
+     ',', 'rows', 'monthly'),
+    # Months across the header
+    ("Category\tJan'24\tFeb'24\tMar'24\nIncome\t1000\t1100\t1200\n",
+     '\t', 'columns', 'monthly'),
+    ("Category\tJanuary 2024\tFebruary 2024\nIncome\t1000\t1100\n",
+     '\t', 'columns', 'monthly'),
+    ("Category,2024-01,2024-02,Total\nIncome,1000,1100,2100\n",
+     ',', 'columns', 'monthly'),
+    ("Category\tJan\tFeb\tTotal\nIncome\t1\t2\t3\n",
+     '\t', 'columns', 'monthly'),
+    # Daily balances
+    ("Date,Account,Balance\n2024-01-01,Checking,5000\n2024-01-01,Savings,100\n",
+     ',', 'rows', 'daily'),
+]
+
+def test_layouts():
+    for text, delimiter, orientation, shape in CASES:
+        fmt = sniff_table(text)
+        header = text.splitlines()[0]
+        assert fmt['delimiter'] == delimiter, f"{header!r}: delimiter {fmt['delimiter']!r}"
+        assert fmt['orientation'] == orientation, f"{header!r}: orientation {fmt['orientation']}"
+        assert fmt['shape'] == shape, f"{header!r}: shape {fmt['shape']}"
+
+def test_type_row():
+    fmt = sniff_table("Month\tSales\tRent\nType\tIncome\tExpense\nJan'24\t1000\t200\n")
+    assert fmt['has_type_row']
+    assert fmt['types'] == ['TYPE', 'INCOME', 'EXPENSE']
+    assert not sniff_table("Month\tSales\tRent\nJan'24\t1000\t200\n")['has_type_row']
+
+def test_empty_text():
+    fmt = sniff_table("\n\n")
+    assert fmt['delimiter'] is None and fmt['header'] == []
+
+def test_monthly_paste_with_month_like_categories():
+    """A category named like a month must not send the paste to the transposed loader."""
+    data_mgr = FinancialDataManager(data_dir=tempfile.mkdtemp())
+    data_mgr.add_client("test", "Test")
+    data_mgr.current_client = "test"
+    dataset = data_mgr.load_clipboard_data(
+        "Month\tIncome\tMarketing\tPayroll\nJan'24\t1000\t200\t300\nFeb'24\t1100\t250\t320\n", "pasted")
+    assert dataset['months'] == ["Jan'24", "Feb'24"]
+    assert list(dataset['income_values']) == [1000.0, 1100.0]
+    assert list(dataset['expense_data']) == ['Marketing', 'Payroll']
+
+def test_transposed_paste():
+    data_mgr = FinancialDataManager(data_dir=tempfile.mkdtemp())
+    data_mgr.add_client("test", "Test")
+    data_mgr.current_client = "test"
+    dataset = data_mgr.load_clipboard_data(
+        "Category\tJan'24\tFeb'24\nIncome\t1000\t1100\nRent\t200\t250\n", "pasted")
+    assert dataset['months'] == ["Jan'24", "Feb'24"]
+    assert list(dataset['expense_data']) == ['Rent']
+
+def write_file(name, text):
+    path = os.path.join(tempfile.mkdtemp(), name)
+    with open(path, "w", newline="") as f:
+        f.write(text)
+    return path
+
+def test_semicolon_csv_upload():
+    """Uploaded CSVs are read with the sniffed delimiter, not assumed to use commas."""
+    path = write_file("balances.csv", "Date;Account;Balance\n2024-01-01;Checking;1.234,56\n"
+                                      "2024-01-02;Checking;1.300,00\n2024-01-01;Savings;500\n")
+    df = read_sniffed_csv(path)
+    assert list(df.columns) == ["Date", "Account", "Balance"]
+    assert len(df) == 3
+    
+    data_mgr = FinancialDataManager(data_dir=tempfile.mkdtemp())
+    data_mgr.add_client("test", "Test")
+    data_mgr.current_client = "test"
+    dataset = data_mgr.load_daily_cash_balance_data(df, "cash")
+    assert list(dataset['account_data']['Checking']) == [1234.56, 1300.0]
+    
+    monthly = data_mgr.load_csv_data(write_file("pl.csv", "Month;Income;Rent\nJan'24;1000;200\n"), "pl")
+    assert monthly['months'] == ["Jan'24"] and list(monthly['expense_data']) == ['Rent']
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name}: ok")
@@ -0,0 +1,125 @@
+# test_storage_roundtrip.py
+# Saves clients with each storage backend (JSON, columnar JSON, SQLite) and
+# checks that loading them back gives the same data
+# (run with pytest, or directly: python test_storage_roundtrip.py)
+
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from data_loader import FinancialDataManager
+from storage import SQLiteStorage
+
+BACKENDS = ("json", "columnar", "sqlite")
+
+def open_manager(backend, directory):
+    """A data manager on the given backend, reading whatever is already saved there."""
+    if backend == "sqlite":
+        return FinancialDataManager(data_dir=directory, storage=SQLiteStorage(os.path.join(directory, "clients.db")))
+    return FinancialDataManager(data_dir=directory, columnar=(backend == "columnar"))
+
+def daily_rows():
+    rows = []
+    for i, day in enumerate(pd.date_range("2024-01-01", periods=15)):
+        rows.append([day.strftime("%Y-%m-%d"), "Checking", 1000.0 + 10.25 * i])
+        if i % 3:
+            rows.append([day.strftime("%Y-%m-%d"), "Credit Card", -200.0 - i])
+    return pd.DataFrame(rows, columns=["Date", "Account", "Balance"])
+
+def fill_client(data_mgr):
+    """A client with a monthly and a daily dataset."""
+    data_mgr.add_client("acme", "Acme Co")
+    data_mgr.current_client = "acme"
+    data_mgr.load_manual_data("monthly", ["Jan'24", "Feb'24"], [1000.0, 1100.5],
+                              {"Rent": [200.0, 200.0], "Food": [50.25, 60.0]},
+                              {"Rent": "#1f77b4", "Food": "#ff7f0e"})
+    data_mgr.load_daily_cash_balance_data(daily_rows(), "cash")
+
+def assert_same_client(actual, expected):
+    assert actual['name'] == expected['name']
+    assert list(actual['datasets']) == list(expected['datasets'])
+    
+    monthly, saved_monthly = actual['datasets']['monthly'], expected['datasets']['monthly']
+    for key in ('months', 'income_values', 'net_income_values', 'expense_colors'):
+        assert list(monthly[key]) == list(saved_monthly[key]), key
+    for category, values in saved_monthly['expense_data'].items():
+        assert list(monthly['expense_data'][category]) == list(values), category
+    
+    daily, saved_daily = actual['datasets']['cash'], expected['datasets']['cash']
+    assert pd.Series(daily['dates']).tolist() == pd.Series(saved_daily['dates']).tolist()
+    assert list(daily['accounts']) == list(saved_daily['accounts'])
+    for account in saved_daily['accounts']:
+        np.testing.assert_allclose(daily['account_data'][account], saved_daily['account_data'][account])
+    np.testing.assert_allclose(daily['total_balance'], saved_daily['total_balance'])
+    
+    raw, saved_raw = actual['raw_data']['cash'], expected['raw_data']['cash']
+    pd.testing.assert_frame_equal(raw.reset_index(drop=True), saved_raw.reset_index(drop=True),
+                                  check_dtype=False, check_categorical=False)
+
+def test_roundtrip():
+    for backend in BACKENDS:
+        directory = tempfile.mkdtemp()
+        data_mgr = open_manager(backend, directory)
+        fill_client(data_mgr)
+        assert data_mgr.save_data(), backend
+        
+        reloaded = open_manager(backend, directory)
+        assert "acme" in reloaded.list_clients(), backend
+        assert_same_client(reloaded.clients["acme"], data_mgr.clients["acme"])
+
+def test_incremental_save():
+    """Changing one dataset and saving again keeps the other one."""
+    for backend in BACKENDS:
+        directory = tempfile.mkdtemp()
+        data_mgr = open_manager(backend, directory)
+        fill_client(data_mgr)
+        data_mgr.save_data()
+        
+        more = daily_rows().assign(Balance=lambda df: df["Balance"] * 2)
+        data_mgr.load_daily_cash_balance_data(more, "cash")
+        assert data_mgr.is_dirty("acme")
+        data_mgr.save_data()
+        assert not data_mgr.is_dirty("acme")
+        
+        reloaded = open_manager(backend, directory)
+        assert_same_client(reloaded.clients["acme"], data_mgr.clients["acme"])
+
+def test_failed_save_keeps_saved_data():
+    """A dataset that can't be saved doesn't wipe out what was saved before."""
+    for backend in BACKENDS:
+        directory = tempfile.mkdtemp()
+        data_mgr = open_manager(backend, directory)
+        fill_client(data_mgr)
+        data_mgr.save_data()
+        
+        data_mgr.clients["acme"]["datasets"]["broken"] = {"months": [object()]}
+        data_mgr.mark_dirty("acme", "broken")
+        assert not data_mgr.save_data(), backend
+        assert data_mgr.is_dirty("acme"), backend
+        
+        reloaded = open_manager(backend, directory)
+        assert list(reloaded.list_clients()["acme"]["datasets"]) == ["monthly", "cash"], backend
+        assert list(reloaded.clients["acme"]["datasets"]) == ["monthly", "cash"], backend
+
+def test_index_without_manifest():
+    """Rebuilding a missing manifest lists the clients without loading them."""
+    for backend in ("json", "columnar"):
+        directory = tempfile.mkdtemp()
+        data_mgr = open_manager(backend, directory)
+        fill_client(data_mgr)
+        data_mgr.add_client("empty", "No Datasets")
+        data_mgr.save_data()
+        os.remove(os.path.join(directory, "_manifest.json"))
+        
+        reloaded = open_manager(backend, directory)
+        assert reloaded.list_clients() == {"acme": {"name": "Acme Co", "datasets": ["monthly", "cash"]},
+                                           "empty": {"name": "No Datasets", "datasets": []}}, backend
+        assert not reloaded.clients.is_loaded("acme"), backend
+        assert os.path.exists(os.path.join(directory, "_manifest.json")), backend
+        assert_same_client(reloaded.clients["acme"], data_mgr.clients["acme"])
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name}: ok")